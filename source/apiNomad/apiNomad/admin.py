@@ -35,6 +35,22 @@ class CustomUserAdmin(UserAdmin):
     inlines = (ProfileInline, )
 
 
+class JobAdmin(admin.ModelAdmin):
+    list_display = [
+        'name',
+        'status',
+        'attempts',
+        'run_at',
+        'is_created',
+    ]
+
+    list_filter = [
+        'status',
+        'name',
+    ]
+
+
+admin.site.register(models.Job, JobAdmin)
 admin.site.register(models.TemporaryToken)
 admin.site.register(models.ActionToken)
 admin.site.register(models.Profile)
@@ -1,14 +1,294 @@
+import math
+import threading
+import time
+from collections import OrderedDict, namedtuple
+
 from rest_framework import exceptions
 from rest_framework.authentication import TokenAuthentication
+from django.core import signing
+from django.core.cache import cache
 from django.utils import timezone
+from django.utils.functional import SimpleLazyObject, empty
 from django.conf import settings
 
-from apiNomad.models import TemporaryToken
+from apiNomad.models import TemporaryToken, User
+
+# Modes of REST_FRAMEWORK_TEMPORARY_TOKENS['MODE']
+MODE_DATABASE = 'database'
+MODE_SIGNED = 'signed'
+
+ACCESS_SALT = 'apiNomad.access'
+
+# Prefix of the revoked users in the shared cache
+DENY_PREFIX = 'access_token_denied:'
+
+# Prefix of the states of the users of the access tokens in the shared
+# cache, and these states
+USER_PREFIX = 'access_token_user:'
+USER_ACTIVE = 1
+USER_INACTIVE = 0
+USER_MISSING = -1
+
+
+class CachedToken(namedtuple('CachedToken',
+                             ['user_id', 'is_active', 'expires'])):
+    """
+    What the authentication needs to know of a token, without its user
+    """
+    pass
+
+
+class TokenCache(object):
+    """
+    Bounded LRU of the tokens authenticated by this process, each one kept
+    at most LOCAL_SECONDS. It holds the values of the fields of the user
+    of the token too, a request authenticated from it costs no query.
+
+    The entries are removed explicitly in this process, the other ones
+    see the change after LOCAL_SECONDS at most. There is no cache shared
+    by the processes: the ones of a deployment without shared cache
+    backend would keep a token deleted until it expires.
+    """
+
+    def __init__(self):
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] < time.monotonic():
+                del self.entries[key]
+                return None
+            self.entries.move_to_end(key)
+            return entry[1], entry[2]
+
+    def set(self, key, token, user_values, seconds, size):
+        with self.lock:
+            self.entries[key] = (
+                time.monotonic() + seconds,
+                token,
+                user_values
+            )
+            self.entries.move_to_end(key)
+            while len(self.entries) > size:
+                self.entries.popitem(last=False)
+
+    def delete(self, key):
+        with self.lock:
+            self.entries.pop(key, None)
+
+    def delete_user(self, user_id):
+        with self.lock:
+            for key in [key for key, entry in self.entries.items()
+                        if entry[1].user_id == user_id]:
+                del self.entries[key]
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+
+LOCAL_CACHE = TokenCache()
+
+
+def get_user_fields():
+    return [field.attname for field in User._meta.concrete_fields]
+
+
+def get_cache_config():
+    return settings.REST_FRAMEWORK_TEMPORARY_TOKENS.get('CACHE')
+
+
+def invalidate_token(key):
+    """
+    Remove a token from the cache, after it is deleted or expired
+    """
+    LOCAL_CACHE.delete(key)
+
+
+def invalidate_user_tokens(user_id):
+    """
+    Remove the tokens of a user from the cache, after a change of its
+    password or its deactivation
+    """
+    LOCAL_CACHE.delete_user(user_id)
+    invalidate_user_state(user_id)
+
+
+def invalidate_user_state(user_id):
+    """
+    Remove the state of a user from the shared cache, after it is saved
+    or deleted
+    """
+    cache.delete(USER_PREFIX + str(user_id))
+
+
+def get_user_state(user_id):
+    """
+    State of the user of an access token: USER_ACTIVE, USER_INACTIVE or
+    USER_MISSING, kept ACCESS_SECONDS in the shared cache
+    """
+    key = USER_PREFIX + str(user_id)
+    state = cache.get(key)
+    if state is None:
+        is_active = User.objects.filter(pk=user_id).values_list(
+            'is_active',
+            flat=True
+        ).first()
+        if is_active is None:
+            state = USER_MISSING
+        else:
+            state = USER_ACTIVE if is_active else USER_INACTIVE
+        cache.set(
+            key,
+            state,
+            settings.REST_FRAMEWORK_TEMPORARY_TOKENS['ACCESS_SECONDS']
+        )
+    return state
+
+
+def get_mode():
+    return settings.REST_FRAMEWORK_TEMPORARY_TOKENS.get('MODE', MODE_DATABASE)
+
+
+class AccessToken(namedtuple('AccessToken',
+                             ['key', 'user_id', 'issued', 'expires'])):
+    """
+    Signed access token of a request in the 'signed' mode, its dates are
+    timestamps
+    """
+    pass
+
+
+class DenyList(object):
+    """
+    Users whose access tokens issued until a date are revoked.
+
+    The entries are in the shared cache, for all the processes, and in
+    the memory of the process which revoked them. An entry is kept
+    ACCESS_SECONDS only, the tokens it revokes are expired after: the
+    list holds the users revoked during the last lifetime of the access
+    tokens.
+    """
+
+    def __init__(self):
+        self.users = {}
+        self.lock = threading.Lock()
+
+    def add(self, user_id, revoked, until):
+        with self.lock:
+            now = time.time()
+            for key in [key for key, entry in self.users.items()
+                        if entry[1] < now]:
+                del self.users[key]
+            self.users[user_id] = (revoked, until)
+
+        cache.set(
+            DENY_PREFIX + str(user_id),
+            revoked,
+            max(int(math.ceil(until - revoked)), 1)
+        )
+
+    def is_denied(self, token):
+        entry = self.users.get(token.user_id)
+        if entry is not None and token.issued <= entry[0]:
+            return True
+
+        revoked = cache.get(DENY_PREFIX + str(token.user_id))
+        return revoked is not None and token.issued <= revoked
+
+    def clear(self):
+        with self.lock:
+            self.users.clear()
+
+
+DENY_LIST = DenyList()
+
+
+def sign_access_token(user_id):
+    """
+    Access token of a user, valid ACCESS_SECONDS
+
+    :param user_id: id of the user
+    :return: token
+    """
+    issued = time.time()
+    return signing.dumps(
+        {
+            'u': user_id,
+            'i': issued,
+            'e': issued +
+            settings.REST_FRAMEWORK_TEMPORARY_TOKENS['ACCESS_SECONDS'],
+        },
+        salt=ACCESS_SALT,
+    )
+
+
+def revoke_access_tokens(user_id):
+    """
+    Revoke the access tokens issued until now to a user, after its logout,
+    the change of its password or its deactivation
+    """
+    now = time.time()
+    DENY_LIST.add(
+        user_id,
+        now,
+        now + settings.REST_FRAMEWORK_TEMPORARY_TOKENS['ACCESS_SECONDS']
+    )
+
+
+def load_token_user(user_id):
+    user = User.objects.filter(pk=user_id).first()
+    if user is None or not user.is_active:
+        # the user changed since the authentication of the request
+        raise exceptions.AuthenticationFailed('User inactive or deleted')
+    return user
+
+
+class SignedTokenUser(SimpleLazyObject):
+    """
+    User of a signed access token, read from the database only when more
+    than its id is needed (permissions, profile...)
+    """
+    is_anonymous = False
+
+    def __init__(self, user_id):
+        self.__dict__['_user_id'] = user_id
+        super(SignedTokenUser, self).__init__(
+            lambda: load_token_user(user_id)
+        )
+
+    @property
+    def id(self):
+        return self.__dict__['_user_id']
+
+    pk = id
+
+    @property
+    def is_authenticated(self):
+        # the state of the user is checked by the authentication, until
+        # the user is loaded
+        if self._wrapped is empty:
+            return True
+        return self._wrapped.is_active
+
+    def __bool__(self):
+        return True
 
 
 class TemporaryTokenAuthentication(TokenAuthentication):
     """
     Extends default token auth to handle temporary tokens.
+
+    With REST_FRAMEWORK_TEMPORARY_TOKENS['CACHE'] the tokens are kept in
+    the cache of the process: the requests of a token known by the
+    process cost no query until it must be renewed.
+
+    With REST_FRAMEWORK_TEMPORARY_TOKENS['MODE'] 'signed' the requests
+    carry signed access tokens instead, checked without any query.
     """
     models = TemporaryToken
 
@@ -16,8 +296,17 @@ class TemporaryTokenAuthentication(TokenAuthentication):
         """
         Attempt token authentication using the provided key.
         """
+        if get_mode() == MODE_SIGNED:
+            return self.authenticate_signed(key)
+
+        config = get_cache_config()
+        if config:
+            cached = self.get_cached(key, config)
+            if cached is not None:
+                return cached
+
         try:
-            token = self.models.objects.get(key=key)
+            token = self.models.objects.select_related('user').get(key=key)
         except self.models.DoesNotExist:
             raise exceptions.AuthenticationFailed('Invalid token')
 
@@ -28,11 +317,93 @@ class TemporaryTokenAuthentication(TokenAuthentication):
             raise exceptions.AuthenticationFailed('Token has expired')
 
         if settings.REST_FRAMEWORK_TEMPORARY_TOKENS['RENEW_ON_SUCCESS']:
-            # Reset the token expiration time on successful authentication
-            expires = timezone.now() + timezone.timedelta(
-                minutes=settings.REST_FRAMEWORK_TEMPORARY_TOKENS['MINUTES']
-            )
-            token.expires = expires
-            token.save()
+            self.renew(token)
+
+        if config:
+            self.set_cached(token, token.user, config)
 
         return token.user, token
+
+    def authenticate_signed(self, key):
+        """
+        Attempt authentication using a signed access token.
+        """
+        try:
+            payload = signing.loads(key, salt=ACCESS_SALT)
+        except signing.BadSignature:
+            raise exceptions.AuthenticationFailed('Invalid token')
+
+        token = AccessToken(key, payload['u'], payload['i'], payload['e'])
+
+        if token.expires <= time.time():
+            raise exceptions.AuthenticationFailed('Token has expired')
+
+        if DENY_LIST.is_denied(token):
+            raise exceptions.AuthenticationFailed('Token has been revoked')
+
+        if get_user_state(token.user_id) != USER_ACTIVE:
+            raise exceptions.AuthenticationFailed('User inactive or deleted')
+
+        return SignedTokenUser(token.user_id), token
+
+    def get_cached(self, key, config):
+        """
+        User and token of a key from the cache, None if the database must
+        be read: unknown token, or token to renew
+        """
+        cached = LOCAL_CACHE.get(key)
+        if cached is None:
+            return None
+        entry, user_values = cached
+
+        if not entry.is_active:
+            raise exceptions.AuthenticationFailed('User inactive or deleted')
+
+        if entry.expires <= timezone.now():
+            invalidate_token(key)
+            raise exceptions.AuthenticationFailed('Token has expired')
+
+        if settings.REST_FRAMEWORK_TEMPORARY_TOKENS['RENEW_ON_SUCCESS'] and \
+                self.must_renew(entry.expires):
+            return None
+
+        # each request gets its own user, built from the values kept by
+        # the process: nothing loaded on it is shared
+        user = User.from_db(User.objects.db, get_user_fields(), user_values)
+
+        token = self.models(key=key, user=user, expires=entry.expires)
+        return user, token
+
+    def set_cached(self, token, user, config):
+        LOCAL_CACHE.set(
+            token.key,
+            CachedToken(user.id, user.is_active, token.expires),
+            tuple(getattr(user, field) for field in get_user_fields()),
+            config['LOCAL_SECONDS'],
+            config['SIZE']
+        )
+
+    @staticmethod
+    def must_renew(expires):
+        config = settings.REST_FRAMEWORK_TEMPORARY_TOKENS
+        lifetime = timezone.timedelta(minutes=config['MINUTES'])
+
+        return expires - timezone.now() < lifetime * config['RENEW_THRESHOLD']
+
+    def renew(self, token):
+        """
+        Reset the token expiration time on successful authentication, only
+        when it is close to expire: the expiration date alone is updated,
+        not on each request.
+        """
+        if not self.must_renew(token.expires):
+            return
+
+        expires = timezone.now() + timezone.timedelta(
+            minutes=settings.REST_FRAMEWORK_TEMPORARY_TOKENS['MINUTES']
+        )
+        self.models.objects.filter(
+            pk=token.pk,
+            expires__lt=expires,
+        ).update(expires=expires)
+        token.expires = expires
@@ -0,0 +1,37 @@
+from django.conf import settings
+from django.core.checks import Error, register
+
+# Cache backends whose entries are seen by their process only
+LOCAL_CACHE_BACKENDS = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+
+@register()
+def check_signed_tokens_cache(app_configs, **kwargs):
+    """
+    The 'signed' mode of the temporary tokens keeps the revoked users and
+    the states of the users in the default cache: it must be shared by
+    all the processes, or a revocation is only seen by the process which
+    handled it.
+    """
+    config = settings.REST_FRAMEWORK_TEMPORARY_TOKENS
+    if config.get('MODE') != 'signed':
+        return []
+
+    backend = settings.CACHES['default']['BACKEND']
+    if backend not in LOCAL_CACHE_BACKENDS:
+        return []
+
+    return [
+        Error(
+            "REST_FRAMEWORK_TEMPORARY_TOKENS['MODE'] 'signed' needs a cache "
+            "shared by the processes, the default cache is {}.".format(
+                backend
+            ),
+            hint="Set CACHE_BACKEND and CACHE_LOCATION to a Redis or "
+                 "memcached server.",
+            id='apiNomad.E001',
+        )
+    ]
@@ -0,0 +1,138 @@
+"""
+Queue of the tasks run outside of the requests, stored in the database.
+
+A task is a function registered with `@task('name')` in the `tasks`
+module of an application. `enqueue('name', **arguments)` saves a Job the
+`run_worker` command runs later, or runs the task at once when
+JOBS['EAGER'] is set (development, tests).
+"""
+import json
+import logging
+import threading
+import traceback
+
+from django.conf import settings
+from django.db import connection
+from django.utils import timezone
+from django.utils.module_loading import autodiscover_modules
+
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+# Functions of the tasks, by name
+TASKS = {}
+
+
+def task(name):
+    """
+    Register a function as a task. Its arguments must be JSON
+    serializable.
+    """
+    def register(function):
+        TASKS[name] = function
+        return function
+    return register
+
+
+def discover_tasks():
+    """
+    Import the `tasks` module of all the applications
+    """
+    autodiscover_modules('tasks')
+
+
+def enqueue(name, **arguments):
+    """
+    Run a task outside of the request
+
+    :param name: name of the task
+    :param arguments: keyword arguments of the task
+    :return: Job, None if the task was run at once
+    """
+    if settings.JOBS['EAGER']:
+        discover_tasks()
+        TASKS[name](**arguments)
+        return None
+
+    return Job.objects.create(
+        name=name,
+        arguments=json.dumps(arguments),
+    )
+
+
+class Heartbeat(object):
+    """
+    Extend the reservation of a job while it runs, every third of the
+    visibility timeout: a job running longer than VISIBILITY_TIMEOUT is
+    not given to another worker as long as its worker is alive.
+    """
+
+    def __init__(self, job):
+        self.job = job
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *args):
+        self.stopped.set()
+        self.thread.join()
+
+    def run(self):
+        interval = settings.JOBS['VISIBILITY_TIMEOUT'] / 3
+        try:
+            while not self.stopped.wait(interval):
+                self.beat()
+        finally:
+            # the thread has its own connection
+            connection.close()
+
+    def beat(self):
+        """
+        Reserve the job for another VISIBILITY_TIMEOUT, unless it was
+        claimed again in the meantime
+        """
+        run_at = timezone.now() + timezone.timedelta(
+            seconds=settings.JOBS['VISIBILITY_TIMEOUT']
+        )
+        Job.objects.filter(
+            pk=self.job.pk,
+            status=Job.RUNNING,
+            attempts=self.job.attempts,
+        ).update(run_at=run_at)
+
+
+def run_job(job):
+    """
+    Run a job claimed by a worker. A job that fails is tried again after
+    RETRY_DELAY seconds, doubled at each attempt, until MAX_ATTEMPTS.
+
+    :param job: Job claimed
+    :return: True if the job is done
+    """
+    try:
+        with Heartbeat(job):
+            TASKS[job.name](**json.loads(job.arguments))
+    except Exception:
+        job.error = traceback.format_exc()
+
+        if job.attempts < settings.JOBS['MAX_ATTEMPTS']:
+            job.status = Job.PENDING
+            job.run_at = timezone.now() + timezone.timedelta(
+                seconds=settings.JOBS['RETRY_DELAY'] * 2 ** (job.attempts - 1)
+            )
+        else:
+            job.status = Job.FAILED
+
+        logger.warning('Job %s failed (attempt %s)', job, job.attempts)
+        job.save(update_fields=['status', 'run_at', 'error'])
+        return False
+
+    job.status = Job.DONE
+    job.run_at = timezone.now()
+    job.error = None
+    job.save(update_fields=['status', 'run_at', 'error'])
+    return True
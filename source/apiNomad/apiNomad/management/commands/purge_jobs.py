@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from apiNomad.models import Job
+
+
+class Command(BaseCommand):
+    help = 'Delete the jobs done more than JOBS[\'KEEP_DONE_DAYS\'] ago, ' \
+           'to run periodically (cron, scheduler).'
+
+    def handle(self, *args, **options):
+        self.stdout.write('{} jobs deleted'.format(Job.objects.purge()))
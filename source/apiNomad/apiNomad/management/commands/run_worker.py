@@ -0,0 +1,92 @@
+import multiprocessing
+import threading
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connection, connections
+
+from apiNomad import jobs
+from apiNomad.models import Job
+
+
+class Command(BaseCommand):
+    help = 'Run the jobs of the queue, in a pool of processes and threads.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--processes',
+            type=int,
+            default=settings.JOBS['PROCESSES'],
+            help='Number of processes.',
+        )
+        parser.add_argument(
+            '--threads',
+            type=int,
+            default=settings.JOBS['THREADS'],
+            help='Number of threads by process.',
+        )
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Stop once there is no job to run.',
+        )
+        parser.add_argument(
+            '--sleep',
+            type=float,
+            default=settings.JOBS['POLL_INTERVAL'],
+            help='Seconds to wait when there is no job to run.',
+        )
+
+    def handle(self, *args, **options):
+        jobs.discover_tasks()
+
+        if options['processes'] <= 1:
+            self.run_process(options)
+            return
+
+        # the processes must not share the connection of the parent
+        connections.close_all()
+
+        processes = [
+            multiprocessing.Process(target=self.run_process, args=(options,))
+            for i in range(options['processes'])
+        ]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join()
+
+    def run_process(self, options):
+        if options['threads'] <= 1:
+            self.run_thread(options)
+            return
+
+        threads = [
+            threading.Thread(target=self.run_thread, args=(options,))
+            for i in range(options['threads'])
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    def run_thread(self, options):
+        try:
+            while True:
+                job = Job.objects.claim()
+
+                if job is None:
+                    if options['once']:
+                        return
+                    time.sleep(options['sleep'])
+                    continue
+
+                if jobs.run_job(job):
+                    self.stdout.write('{} done'.format(job))
+                else:
+                    self.stderr.write('{} failed'.format(job))
+        finally:
+            # each thread has its own connection
+            if threading.current_thread() is not threading.main_thread():
+                connection.close()
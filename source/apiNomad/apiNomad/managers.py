@@ -1,22 +1,121 @@
-from django.db import models
+from django.conf import settings
+from django.db import connections, models, transaction
+from django.utils import timezone
 
 
 class ActionTokenManager(models.Manager):
     def filter(self, expired=None, *args, **kwargs):
-        filtered_token = super(
-            ActionTokenManager,
-            self
-        ).filter(*args, **kwargs)
+        """
+        Filter the tokens, on their expiration too with `expired`: the
+        condition is on the indexed expiration date, in the query.
+        """
+        if expired is True:
+            kwargs['expires__lte'] = timezone.now()
+        elif expired is False:
+            kwargs['expires__gt'] = timezone.now()
 
-        if expired is not None:
-            list_exclude = list()
+        return super(ActionTokenManager, self).filter(*args, **kwargs)
 
-            for token in filtered_token:
-                if token.expired != expired:
-                    list_exclude.append(token)
 
-            filtered_token = filtered_token.exclude(
-                pk__in=[token.pk for token in list_exclude]
+class JobQuerySet(models.QuerySet):
+    def available(self):
+        """
+        Jobs waiting for a worker, and jobs whose worker is lost
+        """
+        return self.filter(
+            status__in=[self.model.PENDING, self.model.RUNNING],
+            run_at__lte=timezone.now(),
+        ).order_by('run_at', 'id')
+
+    def claim(self):
+        """
+        Reserve the next available job for a worker, for the visibility
+        timeout. A job is never given to two workers: on PostgreSQL the
+        rows locked by other workers are skipped (SELECT ... FOR UPDATE
+        SKIP LOCKED), elsewhere the job is only taken if it wasn't changed
+        since it was read.
+
+        A job lost by its worker at its last attempt is failed instead.
+
+        :return: Job, None if there is nothing to do
+        """
+        reserved_until = timezone.now() + timezone.timedelta(
+            seconds=settings.JOBS['VISIBILITY_TIMEOUT']
+        )
+        features = connections[self.db].features
+
+        if features.has_select_for_update_skip_locked:
+            while True:
+                with transaction.atomic(using=self.db):
+                    job = self.available().select_for_update(
+                        skip_locked=True
+                    ).first()
+
+                    if job is None:
+                        return None
+
+                    if self.is_exhausted(job):
+                        job.status = self.model.FAILED
+                        job.error = self.model.LOST_ERROR
+                        job.save(update_fields=['status', 'error'])
+                        continue
+
+                    job.status = self.model.RUNNING
+                    job.run_at = reserved_until
+                    job.attempts += 1
+                    job.save(update_fields=['status', 'run_at', 'attempts'])
+
+                    return job
+
+        for job in self.available()[:10]:
+            unchanged = self.filter(
+                pk=job.pk,
+                status=job.status,
+                run_at=job.run_at,
             )
 
-        return filtered_token
+            if self.is_exhausted(job):
+                unchanged.update(
+                    status=self.model.FAILED,
+                    error=self.model.LOST_ERROR,
+                )
+                continue
+
+            claimed = unchanged.update(
+                status=self.model.RUNNING,
+                run_at=reserved_until,
+                attempts=models.F('attempts') + 1,
+            )
+
+            if claimed:
+                job.status = self.model.RUNNING
+                job.run_at = reserved_until
+                job.attempts += 1
+                return job
+
+        return None
+
+    def is_exhausted(self, job):
+        """
+        Job lost by its worker (still running after its reservation) which
+        has no attempt left
+        """
+        return job.status == self.model.RUNNING and \
+            job.attempts >= settings.JOBS['MAX_ATTEMPTS']
+
+    def purge(self):
+        """
+        Delete the jobs done more than KEEP_DONE_DAYS ago
+
+        :return: number of jobs deleted
+        """
+        deleted, rows = self.filter(
+            status=self.model.DONE,
+            run_at__lt=timezone.now() - timezone.timedelta(
+                days=settings.JOBS['KEEP_DONE_DAYS']
+            ),
+        ).delete()
+        return deleted
+
+
+JobManager = models.Manager.from_queryset(JobQuerySet)
@@ -0,0 +1,75 @@
+# Generated by Django 2.1.5 on 2026-10-18 10:12
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def move_tokens(apps, schema_editor):
+    """
+    Copy the tokens from the two tables of the old model to the new one,
+    then remove their rows from the table of authtoken.
+    """
+    OldTemporaryToken = apps.get_model('apiNomad', 'OldTemporaryToken')
+    TemporaryToken = apps.get_model('apiNomad', 'TemporaryToken')
+    Token = apps.get_model('authtoken', 'Token')
+
+    tokens = OldTemporaryToken.objects.values_list(
+        'token_ptr__key',
+        'token_ptr__user_id',
+        'token_ptr__created',
+        'expires',
+    )
+    keys = []
+    for key, user_id, created, expires in tokens:
+        keys.append(key)
+        TemporaryToken.objects.create(
+            key=key,
+            user_id=user_id,
+            expires=expires,
+        )
+        # created is set by auto_now_add on insert
+        TemporaryToken.objects.filter(key=key).update(created=created)
+
+    Token.objects.filter(key__in=keys).delete()
+
+
+def restore_tokens(apps, schema_editor):
+    OldTemporaryToken = apps.get_model('apiNomad', 'OldTemporaryToken')
+    TemporaryToken = apps.get_model('apiNomad', 'TemporaryToken')
+
+    for token in TemporaryToken.objects.all():
+        OldTemporaryToken.objects.create(
+            key=token.key,
+            user_id=token.user_id,
+            expires=token.expires,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('authtoken', '0002_auto_20160226_1747'),
+        ('apiNomad', '0007_job'),
+    ]
+
+    operations = [
+        migrations.RenameModel(
+            old_name='TemporaryToken',
+            new_name='OldTemporaryToken',
+        ),
+        migrations.CreateModel(
+            name='TemporaryToken',
+            fields=[
+                ('key', models.CharField(max_length=40, primary_key=True, serialize=False, verbose_name='Key')),
+                ('created', models.DateTimeField(auto_now_add=True, verbose_name='Creation date')),
+                ('expires', models.DateTimeField(blank=True, db_index=True, verbose_name='Expiration date')),
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='temporary_token', to=settings.AUTH_USER_MODEL, verbose_name='User')),
+            ],
+        ),
+        migrations.RunPython(move_tokens, restore_tokens),
+        migrations.DeleteModel(
+            name='OldTemporaryToken',
+        ),
+    ]
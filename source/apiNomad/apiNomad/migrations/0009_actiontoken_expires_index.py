@@ -0,0 +1,17 @@
+# Generated by Django 2.1.5 on 2026-10-18 10:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('apiNomad', '0008_flatten_temporarytoken'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='actiontoken',
+            index=models.Index(fields=['type', 'user', 'expires'], name='actiontoken_type_expires_idx'),
+        ),
+    ]
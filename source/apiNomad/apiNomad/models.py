@@ -9,9 +9,10 @@ from django.utils.translation import ugettext_lazy as _
 from django.utils import timezone
 from django.contrib.auth.models import Group
 
-from rest_framework.authtoken.models import Token
 from cuser.models import AbstractCUser
-from .managers import ActionTokenManager
+from .managers import ActionTokenManager, JobManager
+# the system checks of the app are registered with its models
+from . import checks  # noqa
 
 
 ACTIONS_TYPE = [
@@ -62,6 +63,14 @@ class ActionToken(models.Model):
 
     objects = ActionTokenManager()
 
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['type', 'user', 'expires'],
+                name='actiontoken_type_expires_idx',
+            ),
+        ]
+
     def save(self, *args, **kwargs):
         if not self.key:
             self.key = self.generate_key()
@@ -89,21 +98,54 @@ class ActionToken(models.Model):
         return self.key
 
 
-class TemporaryToken(Token):
-    """Subclass of Token to add an expiration time."""
+class TemporaryToken(models.Model):
+    """
+    Authentication token with an expiration time.
+
+    A single table: the authentication reads and the renewals of a token
+    touch one row.
+    """
+    key = models.CharField(
+        verbose_name=_("Key"),
+        max_length=40,
+        primary_key=True
+    )
+
+    user = models.OneToOneField(
+        settings.AUTH_USER_MODEL,
+        related_name='temporary_token',
+        on_delete=models.CASCADE,
+        verbose_name=_("User")
+    )
+
+    created = models.DateTimeField(
+        verbose_name=_("Creation date"),
+        auto_now_add=True
+    )
+
     expires = models.DateTimeField(
         verbose_name=_("Expiration date"),
         blank=True,
+        db_index=True,
     )
 
     def save(self, *args, **kwargs):
-        if not self.pk:
-            self.expires = timezone.now() + timezone.timedelta(
-                minutes=settings.REST_FRAMEWORK_TEMPORARY_TOKENS['MINUTES']
-            )
+        if not self.key:
+            self.key = self.generate_key()
+            if not self.expires:
+                self.expires = timezone.now() + timezone.timedelta(
+                    minutes=settings.REST_FRAMEWORK_TEMPORARY_TOKENS[
+                        'MINUTES'
+                    ]
+                )
 
         super(TemporaryToken, self).save(*args, **kwargs)
 
+    @staticmethod
+    def generate_key():
+        """Generate a new key"""
+        return binascii.hexlify(os.urandom(20)).decode()
+
     @property
     def expired(self):
         """Returns a boolean indicating token expiration."""
@@ -114,6 +156,9 @@ class TemporaryToken(Token):
         self.expires = timezone.now()
         self.save()
 
+    def __str__(self):
+        return self.key
+
 
 class User(AbstractCUser):
     date_updated = models.DateTimeField(
@@ -153,3 +198,80 @@ class Profile(models.Model):
 
     def __str__(self):
         return str(self.user)
+
+
+class Job(models.Model):
+    """
+    Task run outside of the requests by the `run_worker` command.
+
+    A job is claimed by a worker for VISIBILITY_TIMEOUT seconds (stored in
+    `run_at`), extended while it runs: a job still running after that is
+    considered lost and can be claimed again, until MAX_ATTEMPTS. A failed
+    job is tried again later, with a delay doubled at each attempt. The
+    jobs done are deleted after KEEP_DONE_DAYS by `purge_jobs`.
+    """
+    PENDING = 'P'
+    RUNNING = 'R'
+    DONE = 'D'
+    FAILED = 'F'
+
+    STATUSES = (
+        (PENDING, 'Pending'),
+        (RUNNING, 'Running'),
+        (DONE, 'Done'),
+        (FAILED, 'Failed'),
+    )
+
+    # error of a job lost by its worker at its last attempt
+    LOST_ERROR = 'Lost by its worker at its last attempt'
+
+    class Meta:
+        verbose_name_plural = 'Jobs'
+        ordering = ('run_at', 'id')
+        indexes = [
+            # jobs a worker can claim
+            models.Index(
+                fields=['status', 'run_at'],
+                name='job_status_run_at_idx',
+            ),
+        ]
+
+    name = models.CharField(
+        verbose_name="Task",
+        max_length=100,
+    )
+    # JSON of the keyword arguments of the task
+    arguments = models.TextField(
+        verbose_name="Arguments",
+        default='{}',
+    )
+    status = models.CharField(
+        verbose_name="Status",
+        max_length=1,
+        choices=STATUSES,
+        default=PENDING,
+    )
+    attempts = models.PositiveIntegerField(
+        verbose_name="Attempts",
+        default=0,
+    )
+    # date of the next attempt, end of the reservation while running, or
+    # end of the job once done
+    run_at = models.DateTimeField(
+        verbose_name="Run at",
+        default=timezone.now,
+    )
+    error = models.TextField(
+        verbose_name="Error",
+        blank=True,
+        null=True,
+    )
+    is_created = models.DateTimeField(
+        verbose_name="Cree le",
+        auto_now_add=True,
+    )
+
+    objects = JobManager()
+
+    def __str__(self):
+        return "{} - {}".format(self.name, self.id)
@@ -0,0 +1,323 @@
+import hashlib
+import json
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import CursorPagination, \
+    LimitOffsetPagination, _reverse_ordering
+from rest_framework.response import Response
+
+
+class EstimatedCountPagination(LimitOffsetPagination):
+    """
+    Limit/offset pagination that doesn't run an exact `COUNT(*)` on big
+    tables. When the number of rows is above the configured threshold,
+    the count returned is an estimation:
+     - on PostgreSQL, the number of rows planned for the query (from the
+       statistics of the database),
+     - on other databases, a count cached for a few minutes.
+
+    The client can always ask for an exact count with `?exact_count=true`.
+    """
+    count_estimated = False
+
+    def get_count_config(self):
+        return settings.REST_FRAMEWORK_ESTIMATED_COUNT
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.limit = self.get_limit(request)
+        if self.limit is None:
+            return None
+
+        self.offset = self.get_offset(request)
+        self.request = request
+        self.count = self.get_count(queryset)
+
+        if self.count > self.limit and self.template is not None:
+            self.display_page_controls = True
+
+        if not self.count_estimated:
+            if self.count == 0 or self.offset > self.count:
+                return []
+            return list(queryset[self.offset:self.offset + self.limit])
+
+        # With an estimated count we can't know if this page is the last
+        # one, so we get one more row to know if there is a next page.
+        results = list(queryset[self.offset:self.offset + self.limit + 1])
+
+        if len(results) > self.limit:
+            self.count = max(self.count, self.offset + len(results))
+        elif results:
+            # We reached the end of the list, the count is exact
+            self.count = self.offset + len(results)
+            self.count_estimated = False
+        else:
+            # The offset is past the end of the list, the rows before it
+            # are unknown
+            self.count = super(EstimatedCountPagination, self).get_count(
+                queryset
+            )
+            self.count_estimated = False
+
+        return results[:self.limit]
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('count', self.count),
+            ('count_estimated', self.count_estimated),
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+            ('results', data)
+        ]))
+
+    def get_count(self, queryset):
+        self.count_estimated = False
+
+        config = self.get_count_config()
+        exact_count = self.request.query_params.get(
+            config['EXACT_QUERY_PARAM'],
+            ''
+        ).lower() in ['true', '1']
+
+        if exact_count or not hasattr(queryset, 'query'):
+            return super(EstimatedCountPagination, self).get_count(queryset)
+
+        queryset = queryset.order_by()
+        use_planner = connections[queryset.db].vendor == 'postgresql'
+
+        if use_planner:
+            estimated_count = self.get_planner_count(queryset)
+        else:
+            estimated_count = cache.get(self.get_count_cache_key(queryset))
+
+        if estimated_count is not None and \
+                estimated_count >= config['THRESHOLD']:
+            self.count_estimated = True
+            return estimated_count
+
+        count = super(EstimatedCountPagination, self).get_count(queryset)
+
+        if not use_planner:
+            cache.set(
+                self.get_count_cache_key(queryset),
+                count,
+                config['CACHE_SECONDS']
+            )
+
+        return count
+
+    @staticmethod
+    def get_planner_count(queryset):
+        """
+        Number of rows the PostgreSQL planner expects for the queryset
+        """
+        sql, params = queryset.query.sql_with_params()
+
+        with connections[queryset.db].cursor() as cursor:
+            cursor.execute('EXPLAIN (FORMAT JSON) ' + sql, params)
+            plan = cursor.fetchone()[0]
+
+        # psycopg2 decodes json columns, other drivers may not
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+
+        return int(plan[0]['Plan']['Plan Rows'])
+
+    @staticmethod
+    def get_count_cache_key(queryset):
+        sql, params = queryset.query.sql_with_params()
+        query = '{0}:{1}'.format(sql, params).encode('utf-8')
+
+        return 'pagination_count:{0}'.format(
+            hashlib.md5(query).hexdigest()
+        )
+
+
+class KeysetCursorPagination(CursorPagination):
+    """
+    Cursor pagination on all the fields of the ordering. The cursor of
+    DRF holds the value of the first field only, and skips the rows of the
+    same value with an offset: many rows created at the same date are then
+    scanned, and rows inserted meanwhile can be skipped or repeated.
+
+    Here the position of a row is the tuple of its ordering values, the
+    ordering must end with a unique field (`id`): a page is the rows after
+    the tuple of the last row seen, `(a > x) OR (a = x AND b > y)`, without
+    any offset.
+    """
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, view)
+
+        self.cursor = self.decode_cursor(request)
+        if self.cursor is None:
+            (offset, reverse, current_position) = (0, False, None)
+        else:
+            (offset, reverse, current_position) = self.cursor
+
+        if reverse:
+            queryset = queryset.order_by(*_reverse_ordering(self.ordering))
+        else:
+            queryset = queryset.order_by(*self.ordering)
+
+        if current_position is not None:
+            queryset = queryset.filter(
+                self.get_position_filter(current_position, reverse)
+            )
+
+        # the offset of a cursor is 0 unless the page has no row
+        results = list(queryset[offset:offset + self.page_size + 1])
+        self.page = list(results[:self.page_size])
+
+        if len(results) > len(self.page):
+            has_following_position = True
+            following_position = self._get_position_from_instance(
+                results[-1],
+                self.ordering
+            )
+        else:
+            has_following_position = False
+            following_position = None
+
+        if reverse:
+            self.page = list(reversed(self.page))
+
+            self.has_next = (current_position is not None) or (offset > 0)
+            self.has_previous = has_following_position
+            if self.has_next:
+                self.next_position = current_position
+            if self.has_previous:
+                self.previous_position = following_position
+        else:
+            self.has_next = has_following_position
+            self.has_previous = (current_position is not None) or (offset > 0)
+            if self.has_next:
+                self.next_position = following_position
+            if self.has_previous:
+                self.previous_position = current_position
+
+        if (self.has_previous or self.has_next) and self.template is not None:
+            self.display_page_controls = True
+
+        return self.page
+
+    def get_position_filter(self, position, reverse):
+        """
+        Condition of the rows after a position in the direction of the
+        cursor
+        """
+        try:
+            values = json.loads(position)
+        except ValueError:
+            raise NotFound(self.invalid_cursor_message)
+        if not isinstance(values, list) or \
+                len(values) != len(self.ordering):
+            raise NotFound(self.invalid_cursor_message)
+
+        condition = Q()
+        equal = Q()
+        for order, value in zip(self.ordering, values):
+            field = order.lstrip('-')
+            if order.startswith('-') != reverse:
+                lookup = field + '__lt'
+            else:
+                lookup = field + '__gt'
+
+            condition |= equal & Q(**{lookup: value})
+            equal &= Q(**{field: value})
+
+        return condition
+
+    def _get_position_from_instance(self, instance, ordering):
+        values = []
+        for order in ordering:
+            field = order.lstrip('-')
+            if isinstance(instance, dict):
+                value = instance[field]
+            else:
+                value = getattr(instance, field)
+            values.append(str(value))
+        return json.dumps(values)
+
+
+class OptionalCursorPagination(EstimatedCountPagination):
+    """
+    Limit/offset pagination (with an estimated count on big tables) by
+    default. Clients that scroll through a large list can ask for a
+    cursor (keyset) pagination with `?pagination=cursor`: pages are then
+    fetched with a `WHERE` on the ordering fields of the last row seen
+    instead of an `OFFSET` and no count is done, so every page costs the
+    same as the first one.
+
+    The keyset is given by the `cursor_ordering` attribute of the view,
+    ending with a unique field, the primary key is used if the view
+    doesn't define it.
+    """
+    mode_query_param = 'pagination'
+    cursor_mode = 'cursor'
+    cursor_ordering = ('pk',)
+
+    cursor_paginator = None
+
+    def use_cursor(self, request):
+        return (
+            request.query_params.get(self.mode_query_param) ==
+            self.cursor_mode or
+            CursorPagination.cursor_query_param in request.query_params
+        )
+
+    def get_cursor_paginator(self, view):
+        paginator = KeysetCursorPagination()
+        paginator.ordering = getattr(
+            view,
+            'cursor_ordering',
+            self.cursor_ordering
+        )
+        paginator.page_size = self.default_limit
+        paginator.page_size_query_param = self.limit_query_param
+        paginator.max_page_size = self.max_limit
+        return paginator
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if self.use_cursor(request):
+            self.cursor_paginator = self.get_cursor_paginator(view)
+            return self.cursor_paginator.paginate_queryset(
+                queryset,
+                request,
+                view
+            )
+
+        return super(OptionalCursorPagination, self).paginate_queryset(
+            queryset,
+            request,
+            view
+        )
+
+    def get_paginated_response(self, data):
+        if self.cursor_paginator is not None:
+            return self.cursor_paginator.get_paginated_response(data)
+
+        return super(OptionalCursorPagination, self).get_paginated_response(
+            data
+        )
+
+    def get_results(self, data):
+        if self.cursor_paginator is not None:
+            return self.cursor_paginator.get_results(data)
+
+        return super(OptionalCursorPagination, self).get_results(data)
+
+    def to_html(self):
+        if self.cursor_paginator is not None:
+            return self.cursor_paginator.to_html()
+
+        return super(OptionalCursorPagination, self).to_html()
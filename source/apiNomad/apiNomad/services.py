@@ -2,14 +2,30 @@ from django.conf import settings
 
 from django.core.mail import send_mail
 
+from . import jobs
+
 
 def service_send_mail(emails, subject, plain_msg, msg_html):
     """
     Uses Anymail to send templated emails.
     Returns a list of email addresses to which emails failed to be delivered.
+
+    With JOBS['ASYNC_EMAIL'] the emails are sent by the worker, they are
+    all considered as sent.
     """
     results = []
     for email in emails:
+        if settings.JOBS['ASYNC_EMAIL']:
+            jobs.enqueue(
+                'apiNomad.send_mail',
+                email=email,
+                subject=str(subject),
+                plain_msg=plain_msg,
+                msg_html=msg_html,
+            )
+            results.append(email)
+            continue
+
         nb_sent_emails = send_mail(
             subject,
             plain_msg,
@@ -126,7 +126,7 @@ REST_FRAMEWORK = {
         'rest_framework.renderers.JSONRenderer',
     ),
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework.authentication.TokenAuthentication',
+        'apiNomad.authentication.TemporaryTokenAuthentication',
     ),
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.IsAuthenticated',
@@ -134,19 +134,84 @@ REST_FRAMEWORK = {
     'DEFAULT_FILTER_BACKENDS': (
         'django_filters.rest_framework.DjangoFilterBackend',
     ),
-    'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.'
-                                'LimitOffsetPagination',
+    'DEFAULT_PAGINATION_CLASS': 'apiNomad.pagination.'
+                                'OptionalCursorPagination',
     'PAGE_SIZE': 100,
 }
 
+# Estimated count of paginated lists
+
+REST_FRAMEWORK_ESTIMATED_COUNT = {
+    # Under this number of rows the count is always exact
+    'THRESHOLD': 10000,
+    # Lifetime of the counts cached when the database has no planner
+    # statistics we can use (SQLite)
+    'CACHE_SECONDS': 300,
+    'EXACT_QUERY_PARAM': 'exact_count',
+}
+
 # Temporary Token
 
+# Default cache. The cache of each process unless CACHE_BACKEND names a
+# cache shared by the processes (Redis, memcached), which the 'signed'
+# mode of the temporary tokens requires.
+CACHES = {
+    'default': {
+        'BACKEND': config(
+            'CACHE_BACKEND',
+            default='django.core.cache.backends.locmem.LocMemCache'
+        ),
+        'LOCATION': config('CACHE_LOCATION', default=''),
+    },
+}
+
 REST_FRAMEWORK_TEMPORARY_TOKENS = {
+    # 'database': the token of the database authenticates each request.
+    # 'signed': the token of the database is a refresh token, exchanged
+    # for signed access tokens checked without any query, the revoked
+    # users are kept in the default cache, which must be shared.
+    'MODE': config('TEMPORARY_TOKENS_MODE', default='database'),
+    # Lifetime of the signed access tokens
+    'ACCESS_SECONDS': 300,
     'MINUTES': 10,
     'RENEW_ON_SUCCESS': True,
+    # A token is renewed only when less than this fraction of its lifetime
+    # remains: at most one write every (1 - RENEW_THRESHOLD) * MINUTES
+    # for a client doing requests continuously
+    'RENEW_THRESHOLD': 0.5,
+    # Tokens kept by each process (SIZE tokens, LOCAL_SECONDS at most),
+    # None to read them from the database at each request. A token deleted
+    # or expired in a process is refused by the other ones after
+    # LOCAL_SECONDS.
+    'CACHE': {
+        'SIZE': 10000,
+        'LOCAL_SECONDS': 10,
+    },
     'USE_AUTHENTICATION_BACKENDS': False,
 }
 
+# Queue of the jobs run by the `run_worker` command
+
+JOBS = {
+    # Run the jobs at once in the requests, without worker
+    'EAGER': config('JOBS_EAGER', default=False, cast=bool),
+    'PROCESSES': 1,
+    'THREADS': 4,
+    # Seconds to wait when the queue is empty
+    'POLL_INTERVAL': 2,
+    # A job failed is tried again after RETRY_DELAY seconds, doubled at
+    # each attempt
+    'MAX_ATTEMPTS': 5,
+    'RETRY_DELAY': 30,
+    # Seconds a job is reserved for a worker, extended while it runs, it
+    # is given to another worker if its worker is lost
+    'VISIBILITY_TIMEOUT': 3600,
+    # Days the jobs done are kept, deleted by the `purge_jobs` command
+    'KEEP_DONE_DAYS': 7,
+    # Send the emails from the worker instead of the request
+    'ASYNC_EMAIL': False,
+}
+
 # Activation Token
 
 ACTIVATION_TOKENS = {
@@ -204,13 +269,26 @@ STATIC_ROOT = os.path.join(os.path.dirname(BASE_DIR), 'static')
 MEDIA_URL = 'media/'
 MEDIA_ROOT = os.path.join(os.path.dirname(BASE_DIR), 'media')
 
+# Delivery of the videos by the front server once Django has checked the
+# permissions: 'x-accel-redirect' (nginx) or 'x-sendfile' (Apache,
+# lighttpd). Without backend the files are sent with the wsgi.file_wrapper
+# of the server (os.sendfile with gunicorn).
+MEDIA_SENDFILE = {
+    'BACKEND': config('MEDIA_SENDFILE_BACKEND', default=None),
+    # internal location of MEDIA_ROOT in nginx, for X-Accel-Redirect
+    'URL': config('MEDIA_SENDFILE_URL', default='/protected-media/'),
+}
+
+# Signed URLs of the videos given by the API, in seconds. A URL stays the
+# same during LIFETIME and is valid for one to two LIFETIME.
+MEDIA_SIGNED_URLS = {
+    'LIFETIME': 3600,
+}
+
 # CORS Header Django Rest Framework
 
 CORS_ORIGIN_ALLOW_ALL = True
 DATA_UPLOAD_MAX_NUMBER_FIELDS = None
-FILE_UPLOAD_HANDLERS = [
-    'django.core.files.uploadhandler.TemporaryFileUploadHandler',
-]
 
 # These settings are not related to the core API functionality. Feel free to
 # edit them to your needs.
@@ -235,7 +313,49 @@ CONSTANT = {
         "WIDTH": 1280,
         "HEIGHT": 720,
         "SIZE": 783504130,
+        # Uploads by chunks: biggest chunk accepted and lifetime of an
+        # upload session
+        "CHUNK_SIZE": 67108864,
+        "UPLOAD_SESSION_HOURS": 24,
+        # Adaptive bitrate ladder, bitrates in kbit/s. A video is only
+        # transcoded to the heights not above its own.
+        "RENDITIONS": [
+            {"NAME": "1080p", "HEIGHT": 1080, "VIDEO_BITRATE": 5000,
+             "AUDIO_BITRATE": 192},
+            {"NAME": "720p", "HEIGHT": 720, "VIDEO_BITRATE": 2800,
+             "AUDIO_BITRATE": 128},
+            {"NAME": "480p", "HEIGHT": 480, "VIDEO_BITRATE": 1400,
+             "AUDIO_BITRATE": 128},
+            {"NAME": "240p", "HEIGHT": 240, "VIDEO_BITRATE": 400,
+             "AUDIO_BITRATE": 64},
+        ],
+        # Duration of the HLS segments, in seconds
+        "SEGMENT_DURATION": 6,
+        # Thumbnails of the scrub preview: one every INTERVAL seconds (more
+        # for long videos, MAX_THUMBNAILS at most), WIDTH pixels wide, in
+        # a sprite of COLUMNS thumbnails by row
+        "PREVIEWS": {
+            "INTERVAL": 5,
+            "MAX_THUMBNAILS": 100,
+            "WIDTH": 160,
+            "COLUMNS": 10,
+            "POSTER_HEIGHT": 720,
+        },
+        # Clips are copied from the keyframe before their start, without
+        # reencoding, when it is at most MAX_KEYFRAME_SHIFT seconds before.
+        # Otherwise they are reencoded to start exactly.
+        "CLIP": {
+            "MAX_KEYFRAME_SHIFT": 5,
+        },
     },
 }
 
 django_heroku.settings(locals())
+
+# The logs of the applications (jobs, reads of the videos) are written on
+# the console handler configured by django_heroku
+for logger_name in ['apiNomad', 'video']:
+    LOGGING['loggers'][logger_name] = {
+        'handlers': ['console'],
+        'level': config('LOG_LEVEL', default='INFO'),
+    }
@@ -1,9 +1,12 @@
 from django.apps import AppConfig
 from django.contrib.auth.models import Group
-from django.db.models.signals import post_migrate
+from django.db.models.signals import post_delete, post_migrate, post_save
 from django.dispatch import receiver
 
 from . import setup
+from .authentication import invalidate_token, invalidate_user_state, \
+    invalidate_user_tokens, revoke_access_tokens
+from .models import TemporaryToken, User
 
 
 # @receiver(post_migrate)
@@ -24,3 +27,43 @@ class OuziyaConfig(AppConfig):
 
     def ready(self):
         post_migrate.connect(my_callback, sender=self)
+
+
+@receiver(post_save, sender=TemporaryToken)
+@receiver(post_delete, sender=TemporaryToken)
+def signal_invalidate_token(sender, instance, **kwargs):
+    """
+    removes a token from the authentication caches when it is expired or
+    deleted (logout)
+    """
+    invalidate_token(instance.key)
+
+
+@receiver(post_delete, sender=TemporaryToken)
+def signal_revoke_access_tokens(sender, instance, **kwargs):
+    """
+    revokes the signed access tokens obtained with a refresh token when it
+    is deleted (logout, change of password, deletion of the user)
+    """
+    revoke_access_tokens(instance.user_id)
+
+
+@receiver(post_save, sender=User)
+def signal_invalidate_user_tokens(sender, instance, created, **kwargs):
+    """
+    removes the tokens of a user from the authentication caches when it is
+    saved: its password or its activation may have changed
+    """
+    if not created:
+        invalidate_user_tokens(instance.id)
+        if not instance.is_active:
+            revoke_access_tokens(instance.id)
+
+
+@receiver(post_delete, sender=User)
+def signal_invalidate_deleted_user(sender, instance, **kwargs):
+    """
+    refuses the access tokens of a user when it is deleted
+    """
+    invalidate_user_state(instance.id)
+    revoke_access_tokens(instance.id)
@@ -0,0 +1,21 @@
+from django.conf import settings
+from django.core.mail import send_mail
+
+from .exceptions import MailServiceError
+from .jobs import task
+
+
+@task('apiNomad.send_mail')
+def send_mail_task(email, subject, plain_msg, msg_html):
+    """
+    Send an email from the worker, the job is tried again if it fails
+    """
+    nb_sent_emails = send_mail(
+        subject,
+        plain_msg,
+        settings.DEFAULT_FROM_EMAIL,
+        [email],
+        html_message=msg_html,
+    )
+    if not nb_sent_emails:
+        raise MailServiceError('The email to {} was not sent.'.format(email))
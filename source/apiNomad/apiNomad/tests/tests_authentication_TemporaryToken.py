@@ -0,0 +1,450 @@
+import time
+from unittest import mock
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework.test import APIClient, APITestCase
+
+from apiNomad.authentication import DENY_LIST, LOCAL_CACHE, \
+    TemporaryTokenAuthentication, sign_access_token
+from apiNomad.checks import check_signed_tokens_cache
+from apiNomad.factories import UserFactory
+from apiNomad.models import TemporaryToken, User
+
+
+WITHOUT_CACHE = dict(settings.REST_FRAMEWORK_TEMPORARY_TOKENS, CACHE=None)
+SIGNED = dict(settings.REST_FRAMEWORK_TEMPORARY_TOKENS, MODE='signed')
+
+
+class TemporaryTokenAuthenticationTests(APITestCase):
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = UserFactory()
+        self.user.set_password('Test123!')
+        self.user.save()
+        self.token = TemporaryToken.objects.create(user=self.user)
+
+        LOCAL_CACHE.clear()
+        cache.clear()
+
+    def get_videos(self, token):
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + token.key)
+        return self.client.get(reverse('video:videos'))
+
+    def test_authenticate_with_token(self):
+        """
+        Ensure a temporary token authenticates the requests until it
+        expires.
+        """
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + self.token.key)
+
+        response = self.client.get(reverse('video:videos'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        self.token.expire()
+
+        response = self.client.get(reverse('video:videos'))
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    @override_settings(REST_FRAMEWORK_TEMPORARY_TOKENS=WITHOUT_CACHE)
+    def test_renew_close_to_expiry(self):
+        """
+        Ensure a token is renewed only when less than the threshold of its
+        lifetime remains, by updating its expiration date alone.
+        """
+        authentication = TemporaryTokenAuthentication()
+        expires = self.token.expires
+
+        with CaptureQueriesContext(connection) as queries:
+            user, token = authentication.authenticate_credentials(
+                self.token.key
+            )
+        self.assertEqual(token.expires, expires)
+        self.assertFalse(
+            any(query['sql'].startswith('UPDATE') for query in queries)
+        )
+
+        TemporaryToken.objects.filter(pk=self.token.pk).update(
+            expires=timezone.now() + timezone.timedelta(minutes=2)
+        )
+
+        with CaptureQueriesContext(connection) as queries:
+            user, token = authentication.authenticate_credentials(
+                self.token.key
+            )
+        updates = [query['sql'] for query in queries
+                   if query['sql'].startswith('UPDATE')]
+        self.assertEqual(len(updates), 1)
+        # only the expiration date is written
+        assignments = updates[0].split(' WHERE ')[0]
+        self.assertNotIn('"key"', assignments)
+        self.assertNotIn('"created"', assignments)
+        self.assertEqual(
+            TemporaryToken.objects.get(pk=self.token.pk).expires,
+            token.expires
+        )
+        self.assertGreater(token.expires, expires)
+
+    @override_settings(REST_FRAMEWORK_TEMPORARY_TOKENS=WITHOUT_CACHE)
+    def test_writes_per_thousand_requests(self):
+        """
+        Benchmark the writes of a client authenticating a request every
+        second: a token of 10 minutes renewed at half of its lifetime is
+        written once every 5 minutes, instead of at each request.
+        """
+        authentication = TemporaryTokenAuthentication()
+        start = timezone.now()
+        writes = 0
+
+        with mock.patch('django.utils.timezone.now') as mock_now:
+            for second in range(1000):
+                mock_now.return_value = start + timezone.timedelta(
+                    seconds=second
+                )
+                with CaptureQueriesContext(connection) as queries:
+                    authentication.authenticate_credentials(self.token.key)
+                writes += sum(
+                    query['sql'].startswith('UPDATE') for query in queries
+                )
+
+        self.assertLessEqual(
+            writes,
+            4,
+            '{} writes for 1000 requests'.format(writes)
+        )
+
+    def test_cached_token_without_query(self):
+        """
+        Ensure a token known by the process is authenticated without any
+        query, until it is kept LOCAL_SECONDS.
+        """
+        authentication = TemporaryTokenAuthentication()
+
+        with self.assertNumQueries(1):
+            authentication.authenticate_credentials(self.token.key)
+
+        with self.assertNumQueries(0):
+            user, token = authentication.authenticate_credentials(
+                self.token.key
+            )
+        self.assertEqual(user, self.user)
+        self.assertEqual(token.key, self.token.key)
+
+        later = time.monotonic() + settings.REST_FRAMEWORK_TEMPORARY_TOKENS[
+            'CACHE'
+        ]['LOCAL_SECONDS'] + 1
+        with mock.patch('time.monotonic', return_value=later), \
+                self.assertNumQueries(1):
+            user, token = authentication.authenticate_credentials(
+                self.token.key
+            )
+        self.assertEqual(user, self.user)
+
+    def test_cached_user_not_shared(self):
+        """
+        Ensure each request authenticated from the cache of the process
+        gets its own user, sharing nothing loaded on another one.
+        """
+        authentication = TemporaryTokenAuthentication()
+        authentication.authenticate_credentials(self.token.key)
+
+        first, token = authentication.authenticate_credentials(
+            self.token.key
+        )
+        second, token = authentication.authenticate_credentials(
+            self.token.key
+        )
+
+        self.assertEqual(first, self.user)
+        self.assertEqual(first.email, self.user.email)
+        self.assertFalse(first._state.adding)
+        self.assertIsNot(first, second)
+        self.assertIsNot(first._state, second._state)
+
+        first._state.fields_cache['profile'] = None
+        self.assertNotIn('profile', second._state.fields_cache)
+
+    def test_cache_is_bounded(self):
+        """
+        Ensure the process keeps the tokens used most recently only.
+        """
+        authentication = TemporaryTokenAuthentication()
+        tokens = [self.token] + [
+            TemporaryToken.objects.create(user=UserFactory())
+            for index in range(2)
+        ]
+        config = dict(
+            settings.REST_FRAMEWORK_TEMPORARY_TOKENS['CACHE'],
+            SIZE=2
+        )
+
+        with self.settings(REST_FRAMEWORK_TEMPORARY_TOKENS=dict(
+                settings.REST_FRAMEWORK_TEMPORARY_TOKENS, CACHE=config)):
+            for token in tokens:
+                authentication.authenticate_credentials(token.key)
+
+        self.assertIsNone(LOCAL_CACHE.get(tokens[0].key))
+        self.assertIsNotNone(LOCAL_CACHE.get(tokens[2].key))
+
+    def test_cache_invalidated_on_logout(self):
+        """
+        Ensure a token is refused once its user logged out.
+        """
+        self.assertEqual(
+            self.get_videos(self.token).status_code,
+            status.HTTP_200_OK
+        )
+
+        response = self.client.delete(reverse('token_api'))
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertFalse(TemporaryToken.objects.exists())
+
+        self.assertEqual(
+            self.get_videos(self.token).status_code,
+            status.HTTP_401_UNAUTHORIZED
+        )
+
+    def test_cache_invalidated_on_expiry(self):
+        """
+        Ensure a token is refused once it is expired.
+        """
+        self.get_videos(self.token)
+
+        self.token.expire()
+
+        self.assertEqual(
+            self.get_videos(self.token).status_code,
+            status.HTTP_401_UNAUTHORIZED
+        )
+
+    def test_cache_invalidated_on_deactivation(self):
+        """
+        Ensure a token is refused once its user is deactivated.
+        """
+        self.get_videos(self.token)
+
+        self.user.is_active = False
+        self.user.save()
+
+        self.assertEqual(
+            self.get_videos(self.token).status_code,
+            status.HTTP_401_UNAUTHORIZED
+        )
+
+
+@override_settings(REST_FRAMEWORK_TEMPORARY_TOKENS=SIGNED)
+class SignedTokenAuthenticationTests(APITestCase):
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = UserFactory()
+        self.user.set_password('Test123!')
+        self.user.save()
+
+        DENY_LIST.clear()
+        cache.clear()
+
+        response = self.client.post(
+            reverse('token_api'),
+            {
+                'login': self.user.email,
+                'password': 'Test123!'
+            },
+            format='json'
+        )
+        self.access = response.data['token']
+        self.refresh = response.data['refresh']
+
+    def get_videos(self, key):
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + key)
+        return self.client.get(reverse('video:videos'))
+
+    def test_obtain_access_and_refresh_tokens(self):
+        """
+        Ensure the authentication returns a signed access token and the
+        key of the token of the database as refresh token.
+        """
+        self.assertEqual(
+            TemporaryToken.objects.get(user=self.user).key,
+            self.refresh
+        )
+        self.assertNotEqual(self.access, self.refresh)
+
+        self.assertEqual(
+            self.get_videos(self.access).status_code,
+            status.HTTP_200_OK
+        )
+
+    def test_authenticate_without_query(self):
+        """
+        Ensure an access token is checked without any query once the
+        state of its user is cached, its user being read only when more
+        than its id is needed.
+        """
+        authentication = TemporaryTokenAuthentication()
+
+        with self.assertNumQueries(1):
+            authentication.authenticate_credentials(self.access)
+
+        with self.assertNumQueries(0):
+            user, token = authentication.authenticate_credentials(
+                self.access
+            )
+            self.assertTrue(user.is_authenticated)
+            self.assertEqual(user.id, self.user.id)
+            self.assertEqual(token.user_id, self.user.id)
+
+        with self.assertNumQueries(1):
+            self.assertEqual(user.email, self.user.email)
+
+    def test_refresh_token_is_not_an_access_token(self):
+        """
+        Ensure the refresh token and the altered tokens don't authenticate
+        the requests.
+        """
+        self.assertEqual(
+            self.get_videos(self.refresh).status_code,
+            status.HTTP_401_UNAUTHORIZED
+        )
+        self.assertEqual(
+            self.get_videos(self.access[:-1] + 'x').status_code,
+            status.HTTP_401_UNAUTHORIZED
+        )
+
+    def test_access_token_expired(self):
+        """
+        Ensure an access token is refused after its lifetime.
+        """
+        with self.settings(REST_FRAMEWORK_TEMPORARY_TOKENS=dict(
+                SIGNED, ACCESS_SECONDS=-1)):
+            access = sign_access_token(self.user.id)
+
+        self.assertEqual(
+            self.get_videos(access).status_code,
+            status.HTTP_401_UNAUTHORIZED
+        )
+
+    def test_revoked_on_logout(self):
+        """
+        Ensure the access and refresh tokens are refused once the user
+        logged out.
+        """
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + self.access)
+        response = self.client.delete(reverse('token_api'))
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertFalse(TemporaryToken.objects.exists())
+
+        self.assertEqual(
+            self.get_videos(self.access).status_code,
+            status.HTTP_401_UNAUTHORIZED
+        )
+
+        self.client.credentials()
+        response = self.client.post(
+            reverse('token_refresh'),
+            {'refresh': self.refresh},
+            format='json'
+        )
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_revoked_on_deactivation(self):
+        """
+        Ensure the access tokens are refused once their user is
+        deactivated.
+        """
+        self.user.is_active = False
+        self.user.save()
+
+        self.assertEqual(
+            self.get_videos(self.access).status_code,
+            status.HTTP_401_UNAUTHORIZED
+        )
+
+    def test_revoked_in_other_processes(self):
+        """
+        Ensure a revocation is seen by the processes which didn't handle
+        it, through the shared cache.
+        """
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + self.access)
+        response = self.client.delete(reverse('token_api'))
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+
+        # another process has no entry in its memory
+        DENY_LIST.clear()
+
+        self.assertEqual(
+            self.get_videos(self.access).status_code,
+            status.HTTP_401_UNAUTHORIZED
+        )
+
+    def test_user_deleted(self):
+        """
+        Ensure the access tokens of a deleted or inactive user don't
+        authenticate the requests, even if their revocation is missed.
+        """
+        authentication = TemporaryTokenAuthentication()
+
+        # deactivated without the signals
+        User.objects.filter(pk=self.user.pk).update(is_active=False)
+        DENY_LIST.clear()
+        cache.clear()
+
+        with self.assertRaises(AuthenticationFailed):
+            authentication.authenticate_credentials(self.access)
+        self.assertEqual(
+            self.get_videos(self.access).status_code,
+            status.HTTP_401_UNAUTHORIZED
+        )
+
+    def test_user_changed_after_authentication(self):
+        """
+        Ensure a user deactivated after the authentication of a request
+        is refused when it is read.
+        """
+        self.assertEqual(
+            self.get_videos(self.access).status_code,
+            status.HTTP_200_OK
+        )
+
+        # the state of the user in the cache is out of date
+        User.objects.filter(pk=self.user.pk).update(is_active=False)
+
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + self.access)
+        response = self.client.get(
+            reverse('video:videos'),
+            {'param': 'mine'}
+        )
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_deny_list_is_compact(self):
+        """
+        Ensure the deny list keeps the revocations only while the tokens
+        they revoke can be valid.
+        """
+        DENY_LIST.add(1, 0, 1)
+        DENY_LIST.add(2, 0, 2)
+
+        self.user.is_active = False
+        self.user.save()
+
+        self.assertEqual(list(DENY_LIST.users), [self.user.id])
+
+    def test_check_shared_cache(self):
+        """
+        Ensure the 'signed' mode is refused with a cache of each process.
+        """
+        errors = check_signed_tokens_cache(None)
+        self.assertEqual([error.id for error in errors], ['apiNomad.E001'])
+
+        with self.settings(CACHES={'default': {
+                'BACKEND': 'django.core.cache.backends.memcached.'
+                           'MemcachedCache',
+                'LOCATION': '127.0.0.1:11211'}}):
+            self.assertEqual(check_signed_tokens_cache(None), [])
@@ -60,3 +60,43 @@ class ActionTokenTests(APITestCase):
 
         # The token is expired because we ask for
         self.assertEquals(True, token.expired)
+
+    def test_filter_expired(self):
+        """
+        Ensure the tokens are filtered on their expiration in a single
+        query
+        """
+        token = ActionToken.objects.create(
+            user=self.user,
+            type='password_change',
+        )
+        expired_token = ActionToken.objects.create(
+            user=self.user,
+            type='password_change',
+        )
+        expired_token.expire()
+
+        with self.assertNumQueries(1):
+            self.assertEqual(
+                list(ActionToken.objects.filter(
+                    user=self.user,
+                    type='password_change',
+                    expired=False,
+                )),
+                [token]
+            )
+
+        with self.assertNumQueries(1):
+            self.assertEqual(
+                list(ActionToken.objects.filter(
+                    user=self.user,
+                    type='password_change',
+                    expired=True,
+                )),
+                [expired_token]
+            )
+
+        self.assertEqual(
+            ActionToken.objects.filter(user=self.user).count(),
+            2
+        )
@@ -0,0 +1,179 @@
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+from django.test import TestCase
+from django.test.utils import override_settings
+from django.utils import timezone
+
+from apiNomad import jobs
+from apiNomad.models import Job
+
+
+class JobTests(TestCase):
+
+    def setUp(self):
+        self.calls = []
+
+        @jobs.task('tests.record')
+        def record(value):
+            self.calls.append(value)
+
+        @jobs.task('tests.fail')
+        def fail():
+            raise ValueError('Failure')
+
+        self.addCleanup(jobs.TASKS.pop, 'tests.record')
+        self.addCleanup(jobs.TASKS.pop, 'tests.fail')
+
+    def run_worker(self):
+        call_command(
+            'run_worker',
+            once=True,
+            threads=1,
+            stdout=StringIO(),
+            stderr=StringIO(),
+        )
+
+    def test_enqueue_and_run(self):
+        """
+        Ensure a job is run by the worker with its arguments.
+        """
+        job = jobs.enqueue('tests.record', value=42)
+
+        self.assertEqual(self.calls, [])
+
+        self.run_worker()
+
+        job.refresh_from_db()
+        self.assertEqual(self.calls, [42])
+        self.assertEqual(job.status, Job.DONE)
+        self.assertEqual(job.attempts, 1)
+
+    @override_settings(JOBS=dict(jobs.settings.JOBS, EAGER=True))
+    def test_enqueue_eager(self):
+        """
+        Ensure a job is run at once in eager mode.
+        """
+        self.assertIsNone(jobs.enqueue('tests.record', value=42))
+
+        self.assertEqual(self.calls, [42])
+        self.assertEqual(Job.objects.count(), 0)
+
+    def test_claim_once(self):
+        """
+        Ensure a job is given to only one worker.
+        """
+        job = jobs.enqueue('tests.record', value=42)
+
+        self.assertEqual(Job.objects.claim(), job)
+        self.assertIsNone(Job.objects.claim())
+
+    def test_claim_lost_job(self):
+        """
+        Ensure a job is given to another worker after the visibility
+        timeout.
+        """
+        job = jobs.enqueue('tests.record', value=42)
+        Job.objects.claim()
+
+        later = timezone.now() + timezone.timedelta(
+            seconds=jobs.settings.JOBS['VISIBILITY_TIMEOUT'] + 1
+        )
+        with mock.patch('django.utils.timezone.now') as mock_now:
+            mock_now.return_value = later
+            claimed = Job.objects.claim()
+
+        self.assertEqual(claimed, job)
+        self.assertEqual(claimed.attempts, 2)
+
+    def test_claim_lost_job_at_last_attempt(self):
+        """
+        Ensure a job lost by its worker at its last attempt is failed
+        instead of being run again.
+        """
+        job = jobs.enqueue('tests.record', value=42)
+        Job.objects.filter(pk=job.pk).update(
+            status=Job.RUNNING,
+            attempts=jobs.settings.JOBS['MAX_ATTEMPTS'],
+        )
+        other = jobs.enqueue('tests.record', value=43)
+
+        self.assertEqual(Job.objects.claim(), other)
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.FAILED)
+        self.assertEqual(job.error, Job.LOST_ERROR)
+
+    def test_heartbeat(self):
+        """
+        Ensure a job running longer than the visibility timeout is not
+        given to another worker.
+        """
+        job = jobs.enqueue('tests.record', value=42)
+        claimed = Job.objects.claim()
+
+        later = timezone.now() + timezone.timedelta(
+            seconds=jobs.settings.JOBS['VISIBILITY_TIMEOUT'] - 1
+        )
+        with mock.patch('django.utils.timezone.now') as mock_now:
+            mock_now.return_value = later
+            jobs.Heartbeat(claimed).beat()
+
+        with mock.patch('django.utils.timezone.now') as mock_now:
+            mock_now.return_value = later + timezone.timedelta(seconds=2)
+            self.assertIsNone(Job.objects.claim())
+
+        job.refresh_from_db()
+        self.assertEqual(job.attempts, 1)
+
+    def test_purge_done_jobs(self):
+        """
+        Ensure the jobs done are deleted after KEEP_DONE_DAYS.
+        """
+        done = jobs.enqueue('tests.record', value=42)
+        self.run_worker()
+        pending = jobs.enqueue('tests.record', value=43)
+
+        later = timezone.now() + timezone.timedelta(
+            days=jobs.settings.JOBS['KEEP_DONE_DAYS'],
+            seconds=1
+        )
+        with mock.patch('django.utils.timezone.now') as mock_now:
+            mock_now.return_value = later
+            call_command('purge_jobs', stdout=StringIO())
+
+        self.assertFalse(Job.objects.filter(pk=done.pk).exists())
+        self.assertTrue(Job.objects.filter(pk=pending.pk).exists())
+
+    def test_retry_with_backoff(self):
+        """
+        Ensure a job failed is tried again later, with a longer delay at
+        each attempt, until the maximum number of attempts.
+        """
+        job = jobs.enqueue('tests.fail')
+        delay = jobs.settings.JOBS['RETRY_DELAY']
+        now = timezone.now()
+
+        for attempt in range(1, jobs.settings.JOBS['MAX_ATTEMPTS']):
+            with mock.patch('django.utils.timezone.now') as mock_now:
+                mock_now.return_value = now
+                self.run_worker()
+
+            job.refresh_from_db()
+            self.assertEqual(job.status, Job.PENDING)
+            self.assertEqual(job.attempts, attempt)
+            self.assertEqual(
+                job.run_at,
+                now + timezone.timedelta(seconds=delay * 2 ** (attempt - 1))
+            )
+            self.assertTrue('ValueError: Failure' in job.error)
+
+            now = job.run_at
+
+        with mock.patch('django.utils.timezone.now') as mock_now:
+            mock_now.return_value = now
+            self.run_worker()
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.FAILED)
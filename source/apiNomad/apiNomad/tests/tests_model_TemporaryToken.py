@@ -59,3 +59,17 @@ class TemporaryTokenTests(APITestCase):
 
         # The token is expired because we ask for
         self.assertEquals(True, token.expired)
+
+    def test_create_single_row(self):
+        """
+        Ensure that a token is created with a key and an expiration date
+        in a single query
+        """
+        with self.assertNumQueries(1):
+            token = TemporaryToken.objects.create(
+                user=self.user
+            )
+
+        self.assertEqual(len(token.key), 40)
+        self.assertFalse(token.expired)
+        self.assertEqual(self.user.temporary_token, token)
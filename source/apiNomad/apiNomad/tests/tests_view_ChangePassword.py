@@ -6,7 +6,7 @@ from rest_framework.test import APIClient, APITestCase
 from django.urls import reverse
 
 from apiNomad.factories import UserFactory
-from apiNomad.models import ActionToken, User
+from apiNomad.models import ActionToken, TemporaryToken, User
 
 
 class ChangePasswordTests(APITestCase):
@@ -28,6 +28,7 @@ class ChangePasswordTests(APITestCase):
         """
         Ensure we can change a password with a valid token and a good password
         """
+        TemporaryToken.objects.create(user=self.user)
         data = {
             'token': self.token.key,
             'new_password': 'dWqq!Kld3#9dw'
@@ -55,6 +56,9 @@ class ChangePasswordTests(APITestCase):
 
         self.assertTrue(len(tokens) == 0)
 
+        # the sessions opened with the old password are closed
+        self.assertFalse(TemporaryToken.objects.filter(user=self.user))
+
     def test_change_password_with_bad_token(self):
         """
         Ensure we can't change a password with an invalid token
@@ -0,0 +1,106 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.test.utils import override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient, APITestCase
+
+from apiNomad.authentication import DENY_LIST
+from apiNomad.factories import UserFactory
+from apiNomad.models import TemporaryToken
+
+
+SIGNED = dict(settings.REST_FRAMEWORK_TEMPORARY_TOKENS, MODE='signed')
+
+
+@override_settings(REST_FRAMEWORK_TEMPORARY_TOKENS=SIGNED)
+class RefreshTemporaryAuthTokenTests(APITestCase):
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = UserFactory()
+        self.user.set_password('Test123!')
+        self.user.save()
+        self.token = TemporaryToken.objects.create(user=self.user)
+        self.url = reverse('token_refresh')
+
+        DENY_LIST.clear()
+        cache.clear()
+
+    def test_refresh(self):
+        """
+        Ensure a refresh token gives a new access token.
+        """
+        response = self.client.post(
+            self.url,
+            {'refresh': self.token.key},
+            format='json'
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['refresh'], self.token.key)
+
+        self.client.credentials(
+            HTTP_AUTHORIZATION='Token ' + response.data['token']
+        )
+        response = self.client.get(reverse('video:videos'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_refresh_without_token(self):
+        """
+        Ensure the refresh token is required.
+        """
+        response = self.client.post(self.url, {}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_refresh_invalid_token(self):
+        """
+        Ensure an unknown refresh token is refused.
+        """
+        response = self.client.post(
+            self.url,
+            {'refresh': 'invalid'},
+            format='json'
+        )
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_refresh_expired_token(self):
+        """
+        Ensure an expired refresh token is refused.
+        """
+        self.token.expire()
+
+        response = self.client.post(
+            self.url,
+            {'refresh': self.token.key},
+            format='json'
+        )
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_refresh_inactive_user(self):
+        """
+        Ensure the refresh token of an inactive user is refused.
+        """
+        self.user.is_active = False
+        self.user.save()
+
+        response = self.client.post(
+            self.url,
+            {'refresh': self.token.key},
+            format='json'
+        )
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    @override_settings(REST_FRAMEWORK_TEMPORARY_TOKENS=dict(
+        SIGNED,
+        MODE='database'
+    ))
+    def test_refresh_database_mode(self):
+        """
+        Ensure there is no refresh when the tokens are in the database.
+        """
+        response = self.client.post(
+            self.url,
+            {'refresh': self.token.key},
+            format='json'
+        )
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
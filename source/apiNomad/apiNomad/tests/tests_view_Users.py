@@ -453,6 +453,32 @@ class UsersTests(APITestCase):
 
         self.assertEqual(response.status_code, status.HTTP_200_OK)
 
+    def test_list_users_with_cursor(self):
+        """
+        Ensure we can list all users with a cursor pagination.
+        """
+        self.client.force_authenticate(user=self.admin)
+
+        response = self.client.get(
+            reverse('users'),
+            {'pagination': 'cursor', 'limit': 1},
+        )
+        content = json.loads(response.content)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertFalse('count' in content.keys())
+        self.assertEqual(content['previous'], None)
+        self.assertEqual(len(content['results']), 1)
+        self.assertEqual(content['results'][0]['id'], self.user.id)
+
+        response = self.client.get(content['next'])
+        content = json.loads(response.content)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(content['next'], None)
+        self.assertEqual(len(content['results']), 1)
+        self.assertEqual(content['results'][0]['id'], self.admin.id)
+
     def test_list_users_without_authenticate(self):
         """
         Ensure we can't list users without authentication.
@@ -20,8 +20,10 @@ from django.contrib.auth.views import LoginView
 from django.contrib.staticfiles.urls import staticfiles_urlpatterns
 from django.views.static import serve
 
-from .views import (ObtainTemporaryAuthToken, Users, UsersId, UsersActivation,
-                    ResetPassword, ChangePassword)
+from .views import (ObtainTemporaryAuthToken, RefreshTemporaryAuthToken,
+                    Users, UsersId, UsersActivation, ResetPassword,
+                    ChangePassword)
+from . import signals
 
 from cuser.forms import AuthenticationForm
 
@@ -37,6 +39,11 @@ urlpatterns = [
         ObtainTemporaryAuthToken.as_view(),
         name='token_api'
     ),
+    url(
+        r'^authentication/refresh$',
+        RefreshTemporaryAuthToken.as_view(),
+        name='token_refresh'
+    ),
     # Forgot password
     url(
         r'^reset_password$',
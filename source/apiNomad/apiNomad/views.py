@@ -12,6 +12,9 @@ from rest_framework.response import Response
 from rest_framework.views import APIView
 
 from . import serializers, services
+from .authentication import AccessToken, MODE_SIGNED, \
+    TemporaryTokenAuthentication, get_mode, revoke_access_tokens, \
+    sign_access_token
 from .models import TemporaryToken, ActionToken, User
 from django.template.loader import render_to_string
 
@@ -69,7 +72,14 @@ class ObtainTemporaryAuthToken(ObtainAuthToken):
                 token = TemporaryToken.objects.create(
                     user=user, expires=expires)
 
-            if token:
+            if token and get_mode() == MODE_SIGNED:
+                # the token of the database is the refresh token
+                data = {
+                    'token': sign_access_token(user.id),
+                    'refresh': token.key,
+                }
+                return Response(data)
+            elif token:
                 data = {'token': token.key}
                 return Response(data)
             else:
@@ -81,6 +91,70 @@ class ObtainTemporaryAuthToken(ObtainAuthToken):
 
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+    def delete(self, request):
+        """
+        Delete the token of the request (logout).
+        """
+        if request.auth is None:
+            error = _("Could not authenticate user.")
+            return Response(
+                {'error': error},
+                status=status.HTTP_401_UNAUTHORIZED
+            )
+
+        if isinstance(request.auth, AccessToken):
+            TemporaryToken.objects.filter(
+                user_id=request.auth.user_id
+            ).delete()
+            revoke_access_tokens(request.auth.user_id)
+        else:
+            TemporaryToken.objects.filter(key=request.auth.key).delete()
+
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+class RefreshTemporaryAuthToken(APIView):
+    """
+    post:
+    Exchange a refresh token for a new signed access token, when the
+    temporary tokens are signed.
+    """
+    authentication_classes = ()
+    permission_classes = ()
+
+    def post(self, request):
+        if get_mode() != MODE_SIGNED:
+            content = {
+                'detail': _("Not found."),
+            }
+            return Response(content, status=status.HTTP_404_NOT_FOUND)
+
+        key = request.data.get('refresh')
+        if not key:
+            content = {
+                'refresh': _("This field is required."),
+            }
+            return Response(content, status=status.HTTP_400_BAD_REQUEST)
+
+        token = TemporaryToken.objects.select_related('user').filter(
+            key=key
+        ).first()
+        if token is None or token.expired or not token.user.is_active:
+            error = _("Invalid or expired refresh token.")
+            return Response(
+                {'error': error},
+                status=status.HTTP_401_UNAUTHORIZED
+            )
+
+        if settings.REST_FRAMEWORK_TEMPORARY_TOKENS['RENEW_ON_SUCCESS']:
+            TemporaryTokenAuthentication().renew(token)
+
+        data = {
+            'token': sign_access_token(token.user_id),
+            'refresh': token.key,
+        }
+        return Response(data)
+
 
 class Users(generics.ListCreateAPIView):
     """
@@ -91,6 +165,7 @@ class Users(generics.ListCreateAPIView):
     Create a new user.
     """
     serializer_class = serializers.UserBasicSerializer
+    cursor_ordering = ('date_joined', 'id')
 
     def get_queryset(self):
         return User.objects.all()
@@ -313,13 +388,11 @@ class ResetPassword(APIView):
             return Response(content, status=status.HTTP_400_BAD_REQUEST)
 
         # remove old tokens to change password
-        tokens = ActionToken.objects.filter(
+        ActionToken.objects.filter(
             type='password_change',
             user=user,
-        )
-
-        for token in tokens:
-            token.expire()
+            expired=False,
+        ).update(expires=timezone.now())
 
         # create the new token
         token = ActionToken.objects.create(
@@ -397,6 +470,9 @@ class ChangePassword(APIView):
             user.set_password(new_password)
             user.save()
 
+            # the sessions opened with the old password are closed
+            TemporaryToken.objects.filter(user=user).delete()
+
             # We expire the token used
             tokens[0].expire()
 
@@ -18,6 +18,7 @@ class Addresses(generics.ListCreateAPIView):
     Create a new Address.
     """
     serializer_class = serializers.AddressBasicSerializer
+    cursor_ordering = ('id',)
 
     def get_queryset(self):
         return Address.objects.filter()
@@ -2,5 +2,41 @@ from django.contrib import admin
 
 from . import models
 
-admin.site.register(models.Video)
+
+class RenditionInline(admin.TabularInline):
+    model = models.Rendition
+    extra = 0
+    readonly_fields = [
+        'name',
+        'width',
+        'height',
+        'status',
+        'error',
+    ]
+    fields = readonly_fields
+
+
+class VideoAdmin(admin.ModelAdmin):
+    list_display = [
+        'title',
+        'owner',
+        'state',
+        'is_created',
+    ]
+
+    list_filter = [
+        'state',
+    ]
+
+    # state is computed from is_deleted / is_actived when saving
+    readonly_fields = [
+        'state',
+    ]
+
+    inlines = [
+        RenditionInline,
+    ]
+
+
+admin.site.register(models.Video, VideoAdmin)
 admin.site.register(models.Genre)
@@ -0,0 +1,864 @@
+"""
+Read the informations of MP4 and WebM videos from their container
+headers, without decoding anything and without starting a process.
+
+Only the boxes (MP4) or elements (WebM) describing the tracks are read,
+the media data itself is skipped with a seek. Files this module can't
+understand raise a ContainerError so the caller can fallback on ffprobe.
+"""
+import math
+import os
+import struct
+from array import array
+from collections import namedtuple
+
+MP4 = 'mp4'
+WEBM = 'webm'
+
+# Names given by ffprobe to the codecs, to store the same values
+# whatever the tool used to read the video
+MP4_CODECS = {
+    'avc1': 'h264',
+    'avc3': 'h264',
+    'hvc1': 'hevc',
+    'hev1': 'hevc',
+    'vp08': 'vp8',
+    'vp09': 'vp9',
+    'av01': 'av1',
+    'mp4v': 'mpeg4',
+    'mp4a': 'aac',
+    'ac-3': 'ac3',
+    'ec-3': 'eac3',
+    'Opus': 'opus',
+}
+WEBM_CODECS = {
+    'V_VP8': 'vp8',
+    'V_VP9': 'vp9',
+    'V_AV1': 'av1',
+    'A_VORBIS': 'vorbis',
+    'A_OPUS': 'opus',
+}
+
+
+class ContainerError(Exception):
+    """
+    Raised when a file is not a MP4 or a WebM this module can read.
+    """
+    pass
+
+
+def sniff_container(header):
+    """
+    Give the container of a file from its first bytes.
+
+    :param header: first bytes of the file (12 bytes at least)
+    :return: MP4, WEBM or None if the container is not supported
+    """
+    if len(header) >= 8 and header[4:8] == b'ftyp':
+        return MP4
+    if header[:4] == b'\x1a\x45\xdf\xa3':
+        return WEBM
+    return None
+
+
+def parse_container(path):
+    """
+    Read the informations of the video track of a MP4 or WebM file.
+
+    :param path: path of the file
+    :return: dict with width, height, duration (seconds), num_frame,
+             codec, fps and rotation (degrees) of the video track, and
+             has_audio
+    """
+    return _read_container(path, parse_mp4, parse_webm)
+
+
+def _read_container(path, parse_mp4_file, parse_webm_file):
+    """
+    Read a file with the parser of its container
+    """
+    with open(path, 'rb') as file:
+        container = sniff_container(file.read(12))
+        file.seek(0)
+
+        try:
+            if container == MP4:
+                return parse_mp4_file(file)
+            if container == WEBM:
+                return parse_webm_file(file)
+        except (struct.error, IndexError, ValueError, EOFError) as e:
+            raise ContainerError('Malformed {0} file: {1}'.format(
+                container,
+                e
+            ))
+
+    raise ContainerError('Unsupported container')
+
+
+def _file_size(file):
+    return os.fstat(file.fileno()).st_size
+
+
+# MP4 (ISO base media file format)
+
+def _read_boxes(data, start=0, end=None):
+    """
+    Iterate over the boxes contained in a buffer.
+
+    :return: generator of (type, payload start, payload end)
+    """
+    end = len(data) if end is None else end
+    position = start
+
+    while position + 8 <= end:
+        size, box_type = struct.unpack_from('>I4s', data, position)
+        header = 8
+        if size == 1:
+            size = struct.unpack_from('>Q', data, position + 8)[0]
+            header = 16
+        elif size == 0:
+            size = end - position
+        if size < header or position + size > end:
+            raise ContainerError('Invalid size of box {0}'.format(box_type))
+
+        yield box_type, position + header, position + size
+        position += size
+
+
+def _find_box(data, path, start=0, end=None):
+    """
+    Get the payload boundaries of the first box matching a path such as
+    [b'mdia', b'minf', b'stbl'], or None
+    """
+    for box_type, box_start, box_end in _read_boxes(data, start, end):
+        if box_type == path[0]:
+            if len(path) == 1:
+                return box_start, box_end
+            return _find_box(data, path[1:], box_start, box_end)
+    return None
+
+
+def _walk_boxes(file):
+    """
+    Walk the top level boxes of the file, skipping their content.
+
+    :return: generator of (type, position, header size, size), the file
+             is at the start of the payload of the box
+    """
+    file_size = _file_size(file)
+    position = 0
+
+    while position + 8 <= file_size:
+        file.seek(position)
+        size, box_type = struct.unpack('>I4s', file.read(8))
+        header = 8
+        if size == 1:
+            size = struct.unpack('>Q', file.read(8))[0]
+            header = 16
+        elif size == 0:
+            size = file_size - position
+        if size < header:
+            raise ContainerError('Invalid size of box {0}'.format(box_type))
+
+        yield box_type, position, header, size
+
+        position += size
+
+
+def _read_moov(file):
+    """
+    Return the content of the `moov` box, the media data is skipped.
+    """
+    for box_type, position, header, size in _walk_boxes(file):
+        if box_type == b'moov':
+            return file.read(size - header)
+
+    raise ContainerError('No moov box found')
+
+
+def _is_mp4_faststart(file):
+    for box_type, position, header, size in _walk_boxes(file):
+        if box_type == b'moov':
+            return True
+        if box_type == b'mdat':
+            return False
+
+    raise ContainerError('No moov box found')
+
+
+def is_faststart(path):
+    """
+    Tell if a video can be played while it is downloaded: the `moov` box
+    of a MP4 must come before its media data. A WebM always can.
+
+    :param path: path of the file
+    :return: bool
+    """
+    return _read_container(path, _is_mp4_faststart, lambda file: True)
+
+
+def _parse_media_header(data, start):
+    """
+    Give the timescale and the duration of a `mvhd` or `mdhd` box
+    """
+    version = data[start]
+    if version == 1:
+        timescale, duration = struct.unpack_from('>IQ', data, start + 20)
+    else:
+        timescale, duration = struct.unpack_from('>II', data, start + 12)
+    return timescale, duration
+
+
+def _parse_tkhd(data, start):
+    version = data[start]
+    offset = start + (88 if version == 1 else 76)
+    width, height = struct.unpack_from('>II', data, offset)
+
+    # the display matrix comes before the size, its first coefficients
+    # give the rotation the same way ffprobe reads it
+    a, b = struct.unpack_from('>ii', data, offset - 36)
+    rotation = int(round(math.degrees(math.atan2(b, a)))) % 360
+
+    return width >> 16, height >> 16, rotation
+
+
+def _parse_stsd(data, start, track_type):
+    """
+    Give the format of the first sample description and, for a video
+    track, its coded dimensions.
+    """
+    entries = struct.unpack_from('>I', data, start + 4)[0]
+    if entries == 0:
+        return None, None, None
+
+    entry = start + 8
+    sample_format = data[entry + 4:entry + 8].decode('latin-1')
+    if track_type != 'vide':
+        return sample_format, None, None
+
+    # VisualSampleEntry: SampleEntry header (16 bytes) then 16 bytes of
+    # pre_defined/reserved fields before width and height
+    width, height = struct.unpack_from('>HH', data, entry + 32)
+    return sample_format, width, height
+
+
+def _parse_stts(data, start):
+    entries = struct.unpack_from('>I', data, start + 4)[0]
+    table = struct.unpack_from('>{0}I'.format(entries * 2), data, start + 8)
+    return list(zip(table[0::2], table[1::2]))
+
+
+def _parse_trak(data, start, end):
+    track = {}
+
+    tkhd = _find_box(data, [b'tkhd'], start, end)
+    if tkhd:
+        track['width'], track['height'], track['rotation'] = _parse_tkhd(
+            data,
+            tkhd[0]
+        )
+
+    mdia = _find_box(data, [b'mdia'], start, end)
+    if mdia is None:
+        return track
+
+    hdlr = _find_box(data, [b'hdlr'], *mdia)
+    if hdlr:
+        track['type'] = data[hdlr[0] + 8:hdlr[0] + 12].decode('latin-1')
+
+    mdhd = _find_box(data, [b'mdhd'], *mdia)
+    if mdhd:
+        track['timescale'], track['duration'] = _parse_media_header(
+            data,
+            mdhd[0]
+        )
+
+    stbl = _find_box(data, [b'minf', b'stbl'], *mdia)
+    if stbl is None:
+        return track
+
+    stsd = _find_box(data, [b'stsd'], *stbl)
+    if stsd:
+        sample_format, width, height = _parse_stsd(
+            data,
+            stsd[0],
+            track.get('type')
+        )
+        track['format'] = sample_format
+        if width and height:
+            track['width'], track['height'] = width, height
+
+    stts = _find_box(data, [b'stts'], *stbl)
+    if stts:
+        track['stts'] = _parse_stts(data, stts[0])
+
+    track['stbl'] = stbl
+
+    return track
+
+
+def _parse_traks(moov):
+    return [
+        _parse_trak(moov, start, end)
+        for box_type, start, end in _read_boxes(moov)
+        if box_type == b'trak'
+    ]
+
+
+def _parse_video_trak(moov, tracks=None):
+    if tracks is None:
+        tracks = _parse_traks(moov)
+    video = next(
+        (track for track in tracks if track.get('type') == 'vide'),
+        None
+    )
+    if video is None or not video.get('timescale'):
+        raise ContainerError('No video track found')
+
+    return video
+
+
+def _parse_mp4_keyframes(file):
+    data = _read_moov(file)
+    video = _parse_video_trak(data)
+    stbl = video.get('stbl')
+    if stbl is None:
+        raise ContainerError('No sample table found')
+
+    # decoding time of each sample
+    times = array('q')
+    time = 0
+    for count, delta in video.get('stts', []):
+        for i in range(count):
+            times.append(time)
+            time += delta
+
+    # composition offsets, to give the presentation time of the samples
+    box = _find_box(data, [b'ctts'], *stbl)
+    if box is not None:
+        entries = struct.unpack_from('>I', data, box[0] + 4)[0]
+        version = data[box[0]]
+        table = struct.unpack_from(
+            '>{0}{1}'.format(entries * 2, 'i' if version else 'I'),
+            data,
+            box[0] + 8
+        )
+        sample = 0
+        first_offset = table[1] if entries else 0
+        for count, offset in zip(table[0::2], table[1::2]):
+            for i in range(count):
+                if sample < len(times):
+                    times[sample] += offset - first_offset
+                sample += 1
+
+    # size of each sample
+    box = _find_box(data, [b'stsz'], *stbl)
+    if box is None:
+        raise ContainerError('No stsz box found')
+    sample_size, entries = struct.unpack_from('>II', data, box[0] + 4)
+    if sample_size:
+        sizes = [sample_size] * len(times)
+    else:
+        sizes = struct.unpack_from(
+            '>{0}I'.format(entries),
+            data,
+            box[0] + 12
+        )
+
+    # offset of each chunk and number of samples by chunk
+    box = _find_box(data, [b'stco'], *stbl)
+    chunk_format = 'I'
+    if box is None:
+        box = _find_box(data, [b'co64'], *stbl)
+        chunk_format = 'Q'
+    if box is None:
+        raise ContainerError('No stco or co64 box found')
+    entries = struct.unpack_from('>I', data, box[0] + 4)[0]
+    chunks = struct.unpack_from(
+        '>{0}{1}'.format(entries, chunk_format),
+        data,
+        box[0] + 8
+    )
+
+    box = _find_box(data, [b'stsc'], *stbl)
+    if box is None:
+        raise ContainerError('No stsc box found')
+    entries = struct.unpack_from('>I', data, box[0] + 4)[0]
+    runs = struct.unpack_from('>{0}I'.format(entries * 3), data, box[0] + 8)
+    first_chunks = runs[0::3]
+    samples_per_chunk = runs[1::3]
+
+    offsets = array('Q')
+    run = 0
+    for chunk, chunk_offset in enumerate(chunks, 1):
+        while run + 1 < len(first_chunks) and \
+                first_chunks[run + 1] <= chunk:
+            run += 1
+        for i in range(samples_per_chunk[run]):
+            if len(offsets) >= len(sizes):
+                break
+            offsets.append(chunk_offset)
+            chunk_offset += sizes[len(offsets) - 1]
+
+    # sync samples, numbered from 1. Without stss all the samples are
+    # keyframes
+    box = _find_box(data, [b'stss'], *stbl)
+    if box is None:
+        sync_samples = range(1, len(offsets) + 1)
+    else:
+        entries = struct.unpack_from('>I', data, box[0] + 4)[0]
+        sync_samples = struct.unpack_from(
+            '>{0}I'.format(entries),
+            data,
+            box[0] + 8
+        )
+
+    timescale = video['timescale']
+    return [
+        (times[sample - 1] / timescale, offsets[sample - 1])
+        for sample in sync_samples
+        if sample <= min(len(times), len(offsets))
+    ]
+
+
+def parse_mp4(file):
+    moov = _read_moov(file)
+    tracks = _parse_traks(moov)
+    video = _parse_video_trak(moov, tracks)
+
+    duration = video['duration'] / video['timescale']
+    num_frame = sum(count for count, delta in video.get('stts', []))
+
+    return {
+        'container': MP4,
+        'width': video.get('width', 0),
+        'height': video.get('height', 0),
+        'duration': duration,
+        'num_frame': num_frame,
+        'codec': MP4_CODECS.get(video.get('format'), video.get('format')),
+        'fps': num_frame / duration if duration else 0,
+        'has_audio': any(track.get('type') == 'soun' for track in tracks),
+        'rotation': video.get('rotation', 0),
+    }
+
+
+# WebM (Matroska / EBML)
+
+EBML_HEADER = 0x1A45DFA3
+EBML_DOCTYPE = 0x4282
+SEGMENT = 0x18538067
+SEEK_HEAD = 0x114D9B74
+SEEK = 0x4DBB
+SEEK_ID = 0x53AB
+SEEK_POSITION = 0x53AC
+INFO = 0x1549A966
+TIMECODE_SCALE = 0x2AD7B1
+DURATION = 0x4489
+TRACKS = 0x1654AE6B
+TRACK_ENTRY = 0xAE
+TRACK_NUMBER = 0xD7
+TRACK_TYPE = 0x83
+CODEC_ID = 0x86
+DEFAULT_DURATION = 0x23E383
+TRACK_VIDEO = 0xE0
+PIXEL_WIDTH = 0xB0
+PIXEL_HEIGHT = 0xBA
+CLUSTER = 0x1F43B675
+CLUSTER_TIMECODE = 0xE7
+SIMPLE_BLOCK = 0xA3
+BLOCK_GROUP = 0xA0
+BLOCK = 0xA1
+CUES = 0x1C53BB6B
+CUE_POINT = 0xBB
+CUE_TIME = 0xB3
+CUE_TRACK_POSITIONS = 0xB7
+CUE_TRACK = 0xF7
+CUE_CLUSTER_POSITION = 0xF1
+CHAPTERS = 0x1043A770
+TAGS = 0x1254C367
+ATTACHMENTS = 0x1941A469
+
+# Elements of a segment, they end a cluster of unknown size
+SEGMENT_CHILDREN = (SEEK_HEAD, INFO, TRACKS, CLUSTER, CUES, CHAPTERS,
+                    TAGS, ATTACHMENTS)
+
+TRACK_TYPE_VIDEO = 1
+TRACK_TYPE_AUDIO = 2
+
+
+class Element(namedtuple('Element', ['id', 'start', 'data_start', 'end'])):
+    """
+    An EBML element of the file, `end` is None when its size is unknown
+    (files recorded live).
+    """
+    @property
+    def size(self):
+        return self.end - self.data_start
+
+
+def _read_vint(file, keep_marker):
+    first = file.read(1)
+    if not first:
+        raise EOFError()
+    first = first[0]
+
+    length = 1
+    mask = 0x80
+    while length <= 8 and not first & mask:
+        mask >>= 1
+        length += 1
+    if length > 8:
+        raise ContainerError('Invalid EBML variable size integer')
+
+    value = first if keep_marker else first & (mask - 1)
+    all_ones = first & (mask - 1) == mask - 1
+    for byte in file.read(length - 1):
+        value = (value << 8) | byte
+        all_ones = all_ones and byte == 0xFF
+
+    if not keep_marker and all_ones:
+        return None
+    return value
+
+
+def _read_element(file, position):
+    file.seek(position)
+    element_id = _read_vint(file, keep_marker=True)
+    size = _read_vint(file, keep_marker=False)
+    data_start = file.tell()
+    end = None if size is None else data_start + size
+    return Element(element_id, position, data_start, end)
+
+
+def _read_uint(file, element):
+    file.seek(element.data_start)
+    return int.from_bytes(file.read(element.size), 'big')
+
+
+def _read_float(file, element):
+    file.seek(element.data_start)
+    if element.size == 4:
+        return struct.unpack('>f', file.read(4))[0]
+    if element.size == 8:
+        return struct.unpack('>d', file.read(8))[0]
+    raise ContainerError('Invalid EBML float size')
+
+
+def _read_string(file, element):
+    file.seek(element.data_start)
+    data = file.read(element.size)
+    return data.rstrip(b'\x00').decode('utf-8', 'replace')
+
+
+def _iter_children(file, parent):
+    """
+    Iterate over the elements contained in a parent element. A child of
+    unknown size ends the iteration after being returned.
+    """
+    position = parent.data_start
+    while parent.end is None or position < parent.end:
+        try:
+            element = _read_element(file, position)
+        except EOFError:
+            return
+
+        yield element
+
+        if element.end is None:
+            return
+        position = element.end
+
+
+def _parse_webm_info(file, info_element):
+    info = {'timecode_scale': 1000000}
+    for element in _iter_children(file, info_element):
+        if element.id == TIMECODE_SCALE:
+            info['timecode_scale'] = _read_uint(file, element)
+        elif element.id == DURATION:
+            info['duration'] = _read_float(file, element)
+    return info
+
+
+def _parse_webm_tracks(file, tracks_element):
+    tracks = []
+    for entry in _iter_children(file, tracks_element):
+        if entry.id != TRACK_ENTRY:
+            continue
+
+        track = {}
+        for element in _iter_children(file, entry):
+            if element.id == TRACK_NUMBER:
+                track['number'] = _read_uint(file, element)
+            elif element.id == TRACK_TYPE:
+                track['type'] = _read_uint(file, element)
+            elif element.id == CODEC_ID:
+                track['codec'] = _read_string(file, element)
+            elif element.id == DEFAULT_DURATION:
+                track['default_duration'] = _read_uint(file, element)
+            elif element.id == TRACK_VIDEO:
+                for video_element in _iter_children(file, element):
+                    if video_element.id == PIXEL_WIDTH:
+                        track['width'] = _read_uint(file, video_element)
+                    elif video_element.id == PIXEL_HEIGHT:
+                        track['height'] = _read_uint(file, video_element)
+        tracks.append(track)
+    return tracks
+
+
+def _parse_webm_seek_head(file, seek_head):
+    seeks = {}
+    for seek in _iter_children(file, seek_head):
+        if seek.id != SEEK:
+            continue
+        seek_id = None
+        seek_position = None
+        for element in _iter_children(file, seek):
+            if element.id == SEEK_ID:
+                seek_id = _read_uint(file, element)
+            elif element.id == SEEK_POSITION:
+                seek_position = _read_uint(file, element)
+        if seek_id is not None and seek_position is not None:
+            seeks[seek_id] = seek_position
+    return seeks
+
+
+def _read_block_header(file, block):
+    file.seek(block.data_start)
+    track = _read_vint(file, keep_marker=False)
+    timecode, flags = struct.unpack('>hB', file.read(3))
+    return track, timecode, flags
+
+
+def _iter_webm_blocks(file, segment, position):
+    """
+    Walk the clusters from a position of the segment, reading only the
+    header of each block.
+
+    :return: generator of (track number, timecode, keyframe, position of
+             the cluster) of the blocks
+    """
+    while segment.end is None or position < segment.end:
+        try:
+            cluster = _read_element(file, position)
+        except EOFError:
+            return
+
+        if cluster.id != CLUSTER:
+            if cluster.end is None:
+                return
+            position = cluster.end
+            continue
+
+        timecode = 0
+        position = cluster.end
+        children = _iter_children(file, cluster)
+
+        for element in children:
+            if cluster.end is None and element.id in SEGMENT_CHILDREN:
+                # the next element of the segment ends a cluster of
+                # unknown size
+                position = element.start
+                break
+            if element.id == CLUSTER_TIMECODE:
+                timecode = _read_uint(file, element)
+            elif element.id == SIMPLE_BLOCK:
+                track, relative, flags = _read_block_header(file, element)
+                yield track, timecode + relative, bool(flags & 0x80), \
+                    cluster.start
+            elif element.id == BLOCK_GROUP:
+                for block in _iter_children(file, element):
+                    if block.id == BLOCK:
+                        track, relative, flags = _read_block_header(
+                            file,
+                            block
+                        )
+                        yield track, timecode + relative, False, \
+                            cluster.start
+            elif cluster.end is None and element.end is not None:
+                position = element.end
+
+        if position is None:
+            return
+
+
+def _parse_webm_headers(file):
+    """
+    Read the headers of a WebM file
+
+    :return: tuple (segment, info, video track, seeks, position of the
+             first cluster)
+    """
+    header = _read_element(file, 0)
+    if header.id != EBML_HEADER or header.end is None:
+        raise ContainerError('No EBML header found')
+
+    doctype = None
+    for element in _iter_children(file, header):
+        if element.id == EBML_DOCTYPE:
+            doctype = _read_string(file, element)
+    if doctype not in ['webm', 'matroska']:
+        raise ContainerError('Unsupported EBML document type')
+
+    segment = _read_element(file, header.end)
+    if segment.id != SEGMENT:
+        raise ContainerError('No segment found')
+
+    info = None
+    tracks = None
+    seeks = {}
+    first_cluster = None
+
+    for element in _iter_children(file, segment):
+        if element.id == SEEK_HEAD:
+            seeks = _parse_webm_seek_head(file, element)
+        elif element.id == INFO:
+            info = _parse_webm_info(file, element)
+        elif element.id == TRACKS:
+            tracks = _parse_webm_tracks(file, element)
+        elif element.id == CLUSTER:
+            # the media data starts, Info and Tracks written after the
+            # clusters are found with the SeekHead
+            first_cluster = element.start
+            break
+
+    if info is None and INFO in seeks:
+        element = _read_element(file, segment.data_start + seeks[INFO])
+        if element.id == INFO and element.end is not None:
+            info = _parse_webm_info(file, element)
+    if tracks is None and TRACKS in seeks:
+        element = _read_element(file, segment.data_start + seeks[TRACKS])
+        if element.id == TRACKS and element.end is not None:
+            tracks = _parse_webm_tracks(file, element)
+    if info is None or not tracks:
+        raise ContainerError('No Info or Tracks element found')
+
+    video = next(
+        (track for track in tracks if track.get('type') == TRACK_TYPE_VIDEO),
+        None
+    )
+    if video is None:
+        raise ContainerError('No video track found')
+    video['has_audio'] = any(
+        track.get('type') == TRACK_TYPE_AUDIO for track in tracks
+    )
+
+    return segment, info, video, seeks, first_cluster
+
+
+def parse_webm(file):
+    segment, info, video, seeks, first_cluster = _parse_webm_headers(file)
+
+    timecode_scale = info['timecode_scale']
+    duration = info.get('duration')
+    num_frame = None
+
+    if duration is not None and video.get('default_duration'):
+        num_frame = int(round(
+            duration * timecode_scale / video['default_duration']
+        ))
+
+    if num_frame is None and first_cluster is not None:
+        # Without these headers (videos recorded live) the clusters are
+        # walked, only the headers of the blocks are read.
+        num_frame = 0
+        last_timecode = 0
+        for track, timecode, keyframe, cluster in _iter_webm_blocks(
+                file, segment, first_cluster):
+            if track == video.get('number'):
+                num_frame += 1
+                last_timecode = max(last_timecode, timecode)
+        if duration is None and num_frame > 1:
+            # the last frame is displayed as long as the others
+            duration = last_timecode * num_frame / (num_frame - 1)
+
+    if duration is None:
+        raise ContainerError('Duration of the video not found')
+
+    if video.get('default_duration'):
+        fps = 1000000000.0 / video['default_duration']
+    elif duration:
+        fps = (num_frame or 0) * 1000000000.0 / (duration * timecode_scale)
+    else:
+        fps = 0
+
+    return {
+        'container': WEBM,
+        'width': video.get('width', 0),
+        'height': video.get('height', 0),
+        'duration': duration * timecode_scale / 1000000000.0,
+        'num_frame': num_frame or 0,
+        'codec': WEBM_CODECS.get(video.get('codec'), video.get('codec')),
+        'fps': fps,
+        'has_audio': video['has_audio'],
+        'rotation': 0,
+    }
+
+
+def _parse_webm_cues(file, cues_element, video):
+    keyframes = []
+    for cue_point in _iter_children(file, cues_element):
+        if cue_point.id != CUE_POINT:
+            continue
+
+        time = None
+        position = None
+        for element in _iter_children(file, cue_point):
+            if element.id == CUE_TIME:
+                time = _read_uint(file, element)
+            elif element.id == CUE_TRACK_POSITIONS and position is None:
+                track = None
+                cluster = None
+                for child in _iter_children(file, element):
+                    if child.id == CUE_TRACK:
+                        track = _read_uint(file, child)
+                    elif child.id == CUE_CLUSTER_POSITION:
+                        cluster = _read_uint(file, child)
+                if track == video.get('number'):
+                    position = cluster
+        if time is not None and position is not None:
+            keyframes.append((time, position))
+    return keyframes
+
+
+def _parse_webm_keyframes(file):
+    """
+    Keyframes of the video track of a WebM file, from its Cues when they
+    list the video track, else from the headers of the blocks.
+
+    The offset of a keyframe is the one of its cluster: a WebM can only be
+    read from the start of a cluster.
+    """
+    segment, info, video, seeks, first_cluster = _parse_webm_headers(file)
+    scale = info['timecode_scale'] / 1000000000.0
+
+    cues = []
+    if CUES in seeks:
+        element = _read_element(file, segment.data_start + seeks[CUES])
+        if element.id == CUES and element.end is not None:
+            cues = _parse_webm_cues(file, element, video)
+    if cues:
+        return sorted(
+            (time * scale, segment.data_start + position)
+            for time, position in cues
+        )
+
+    if first_cluster is None:
+        raise ContainerError('No cluster found')
+
+    keyframes = []
+    for track, timecode, keyframe, cluster in _iter_webm_blocks(
+            file, segment, first_cluster):
+        if track == video.get('number') and keyframe:
+            keyframes.append((timecode * scale, cluster))
+    return sorted(keyframes)
+
+
+def parse_keyframes(path):
+    """
+    Keyframes of the video track of a MP4 or WebM file, a player or a cut
+    without reencoding can only start from one of them.
+
+    :param path: path of the file
+    :return: list of (time in seconds, byte offset) sorted by time
+    """
+    return _read_container(path, _parse_mp4_keyframes, _parse_webm_keyframes)
@@ -0,0 +1,48 @@
+import django_filters
+
+from . import models
+
+
+class VideoFilter(django_filters.FilterSet):
+    """
+    Filters of the list of the videos, on the indexed informations read
+    from their files
+    """
+    min_duration = django_filters.NumberFilter(
+        field_name='duration',
+        lookup_expr='gte',
+    )
+    max_duration = django_filters.NumberFilter(
+        field_name='duration',
+        lookup_expr='lte',
+    )
+    min_width = django_filters.NumberFilter(
+        field_name='width',
+        lookup_expr='gte',
+    )
+    max_width = django_filters.NumberFilter(
+        field_name='width',
+        lookup_expr='lte',
+    )
+    min_height = django_filters.NumberFilter(
+        field_name='height',
+        lookup_expr='gte',
+    )
+    max_height = django_filters.NumberFilter(
+        field_name='height',
+        lookup_expr='lte',
+    )
+    codec = django_filters.CharFilter(
+        field_name='codec',
+    )
+    has_audio = django_filters.BooleanFilter(
+        field_name='has_audio',
+    )
+    # id of a genre, filtered on the join table without loading it
+    genre = django_filters.NumberFilter(
+        field_name='genres',
+    )
+
+    class Meta:
+        model = models.Video
+        fields = []
@@ -1,7 +1,30 @@
+import logging
+import math
 import os
+import shutil
+import tempfile
+from collections import Counter
+
 from django.conf import settings
 import ffmpeg
 
+from apiNomad import jobs
+from . import containers, models, uploads
+
+logger = logging.getLogger(__name__)
+
+# Number of videos read since the start of the process, by method
+# ('container' for the native parser, 'ffprobe'), logged at each read.
+# An upload must be read only once.
+PROBE_METRICS = Counter()
+
+# Codecs of the clips that can't be copied from a keyframe, by container
+CLIP_CODECS = {
+    'mp4': {'vcodec': 'libx264', 'preset': 'veryfast', 'acodec': 'aac'},
+    'webm': {'vcodec': 'libvpx-vp9', 'deadline': 'realtime',
+             'acodec': 'libopus'},
+}
+
 
 def checkVideoUpload(infos_video):
 
@@ -13,10 +36,113 @@ def checkVideoUpload(infos_video):
 
 
 def getInformationsVideo(videoTemporyUpload):
+    """
+    Read the informations of an uploaded video from the headers of its
+    container, ffprobe is only started for the files the native parser
+    can't read.
+
+    The result is kept on the uploaded file, the video is read only once
+    however many times it is validated.
+
+    :param videoTemporyUpload: file uploaded
+    :return: dict with width, height, duration, num_frame, codec and size
+             of the video, empty if the file is not a video
+    """
+    infos_video = getattr(videoTemporyUpload, 'infos_video', None)
+    if infos_video is not None:
+        return infos_video
+
+    infos_video = readInformationsVideo(
+        videoTemporyUpload.temporary_file_path()
+    )
+
+    if infos_video:
+        infos_video['size'] = videoTemporyUpload.size
+
+    videoTemporyUpload.infos_video = infos_video
+
+    return infos_video
+
+
+def readInformationsVideo(path):
+    """
+    Read the informations of a video file from the headers of its
+    container, else with ffprobe
+
+    :param path: path of the video
+    :return: dict with width, height, duration, num_frame and codec of
+             the video, empty if the file is not a video
+    """
+    try:
+        infos_video = containers.parse_container(path)
+        method = 'container'
+    except containers.ContainerError:
+        infos_video = probeVideo(path)
+        method = 'ffprobe'
+
+    PROBE_METRICS[method] += 1
+    logger.info(
+        'Video %s read by %s (process total: %s by container, %s by '
+        'ffprobe)',
+        path,
+        method,
+        PROBE_METRICS['container'],
+        PROBE_METRICS['ffprobe'],
+    )
+
+    return infos_video
+
+
+def setInformationsVideo(video, infos_video):
+    """
+    Copy the informations read from a file on its video, the bitrate is
+    the one of the whole file
+
+    :param video: Video instance, not saved
+    :param infos_video: dict of readInformationsVideo, with the size
+    :return: nothing
+    """
+    video.width = infos_video['width']
+    video.height = infos_video['height']
+    video.size = infos_video['size']
+    video.duration = infos_video['duration']
+    video.num_frame = infos_video.get('num_frame') or 0
+    video.codec = infos_video.get('codec') or ''
+    video.fps = infos_video.get('fps') or 0
+    video.has_audio = bool(infos_video.get('has_audio'))
+    video.rotation = infos_video.get('rotation') or 0
+    video.bitrate = int(video.size * 8 / video.duration) \
+        if video.duration else 0
+
+
+def getInformationsVideoSaved(video):
+    """
+    Informations of a video already saved, read from the database
+
+    :param video: Video instance
+    :return: dict with the same keys than getInformationsVideo
+    """
+    return {
+        'width': video.width,
+        'height': video.height,
+        'duration': video.duration,
+        'size': video.size,
+    }
+
+
+def probeVideo(path):
+    """
+    Read the informations of a video with ffprobe
+
+    :param path: path of the video
+    :return: dict with width, height, duration, num_frame, codec, fps,
+             has_audio and rotation of the video, empty if the file is
+             not a video
+    """
     infos_video = {}
 
     try:
-        probe = ffmpeg.probe(videoTemporyUpload.temporary_file_path())
+        probe = ffmpeg.probe(path)
     except ffmpeg.Error as e:
         return infos_video
         # print(e.stderr, file=sys.stderr)
@@ -34,13 +160,292 @@ def getInformationsVideo(videoTemporyUpload):
 
     infos_video['width'] = int(video_stream['width'])
     infos_video['height'] = int(video_stream['height'])
-    infos_video['duration'] = float(video_stream['duration'])
-    infos_video['num_frame'] = int(video_stream['nb_frames'])
-    infos_video['size'] = videoTemporyUpload.size
+    # WebM files only give the duration of the whole file
+    infos_video['duration'] = float(
+        video_stream.get('duration', probe['format'].get('duration', 0))
+    )
+    infos_video['num_frame'] = int(video_stream.get('nb_frames', 0))
+    infos_video['codec'] = video_stream.get('codec_name')
+
+    numerator, _, denominator = video_stream.get(
+        'avg_frame_rate',
+        '0/0'
+    ).partition('/')
+    try:
+        infos_video['fps'] = float(numerator) / float(denominator or 1)
+    except (ValueError, ZeroDivisionError):
+        infos_video['fps'] = 0
+
+    infos_video['has_audio'] = any(
+        stream['codec_type'] == 'audio' for stream in probe['streams']
+    )
+
+    # older ffprobe give a tag, newer ones the display matrix side data
+    rotation = video_stream.get('tags', {}).get('rotate')
+    for side_data in video_stream.get('side_data_list', []):
+        if 'rotation' in side_data:
+            rotation = -int(side_data['rotation'])
+    infos_video['rotation'] = int(rotation or 0) % 360
 
     return infos_video
 
 
+def probeKeyframes(path):
+    """
+    Read the keyframes of a video with ffprobe, from the flags of its
+    packets: nothing is decoded
+
+    :param path: path of the video
+    :return: list of (time in seconds, byte offset) sorted by time
+    """
+    try:
+        probe = ffmpeg.probe(
+            path,
+            select_streams='v:0',
+            show_entries='packet=pts_time,dts_time,pos,flags',
+        )
+    except ffmpeg.Error:
+        return []
+
+    keyframes = []
+    for packet in probe.get('packets', []):
+        time = packet.get('pts_time', packet.get('dts_time'))
+        if not packet.get('flags', '').startswith('K') or \
+                time in (None, 'N/A') or packet.get('pos') in (None, 'N/A'):
+            continue
+        keyframes.append((float(time), int(packet['pos'])))
+
+    return sorted(keyframes)
+
+
+def getKeyframes(path):
+    """
+    Keyframes of a video, from the index of its container, ffprobe is
+    only started for the files the native parser can't read
+
+    :param path: path of the video
+    :return: list of (time in seconds, byte offset) sorted by time
+    """
+    try:
+        return containers.parse_keyframes(path)
+    except containers.ContainerError:
+        return probeKeyframes(path)
+
+
+def indexKeyframes(video):
+    """
+    Save the keyframes of a video
+
+    :param video: Video instance
+    :return: KeyframeIndex instance
+    """
+    index = models.KeyframeIndex(video=video)
+    index.set_keyframes(getKeyframes(video.is_path_file))
+    index.save()
+
+    # the videos of the same content uploaded meanwhile use it too
+    for video_id in models.Video.objects.filter(
+            media_source=video.id
+    ).values_list('id', flat=True):
+        copyKeyframeIndex(index, video_id)
+
+    return index
+
+
+def copyKeyframeIndex(index, video_id):
+    """
+    Save a keyframe index for another video of the same content
+
+    :param index: KeyframeIndex instance
+    :param video_id: id of the video
+    :return: KeyframeIndex instance
+    """
+    copy = models.KeyframeIndex(
+        video_id=video_id,
+        count=index.count,
+        times=index.times,
+        offsets=index.offsets,
+    )
+    copy.save()
+
+    return copy
+
+
+def makeContentTemporaryFile(ext):
+    """
+    Temporary file written next to the content store, to be moved in it
+    atomically
+
+    :param ext: extension of the file
+    :return: path of the file
+    """
+    folder = os.path.join(settings.MEDIA_ROOT, models.CONTENT_PATH)
+    os.makedirs(folder, exist_ok=True)
+
+    descriptor, path = tempfile.mkstemp(suffix='.' + ext, dir=folder)
+    os.close(descriptor)
+
+    return path
+
+
+def storeContent(temporary_path, ext):
+    """
+    Move a file in the content store, named by its content
+
+    :param temporary_path: path of a file made by makeContentTemporaryFile
+    :param ext: extension of the file
+    :return: tuple (path relative to the media folder, sha256)
+    """
+    sha256 = uploads.hash_file(temporary_path)
+    name = models.content_path(sha256, ext)
+    path = os.path.join(settings.MEDIA_ROOT, name)
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    os.replace(temporary_path, path)
+
+    return name, sha256
+
+
+def faststartVideo(video):
+    """
+    Move the moov box of a MP4 before its media data, by copying its
+    streams, so it can be played while it is downloaded. The new file is
+    stored by its content and replaces the old one for all the videos
+    using it.
+
+    :param video: Video instance
+    :return: True if the file was remuxed, raise ffmpeg.Error on failure
+    """
+    old_name = video.file.name
+    old_path = video.is_path_file
+
+    try:
+        if containers.is_faststart(old_path):
+            models.Video.objects.filter(file=old_name).update(
+                is_faststart=True
+            )
+            return False
+    except containers.ContainerError:
+        # not a MP4 the parser can read, it is left as it is
+        return False
+
+    ext = os.path.splitext(old_name)[1][1:].lower()
+    temporary_path = makeContentTemporaryFile(ext)
+
+    try:
+        (
+            ffmpeg
+            .input(old_path)
+            .output(
+                temporary_path,
+                c='copy',
+                map=0,
+                movflags='+faststart',
+            )
+            .overwrite_output()
+            .run(capture_stdout=True, capture_stderr=True)
+        )
+
+        name, sha256 = storeContent(temporary_path, ext)
+    finally:
+        if os.path.exists(temporary_path):
+            os.remove(temporary_path)
+
+    models.Video.objects.filter(file=old_name).update(
+        file=name,
+        sha256=sha256,
+        size=os.path.getsize(os.path.join(settings.MEDIA_ROOT, name)),
+        is_faststart=True,
+    )
+    if name != old_name:
+        os.remove(old_path)
+
+    video.file = name
+    video.sha256 = sha256
+    video.is_faststart = True
+
+    return True
+
+
+def getClipStart(video, start):
+    """
+    Keyframe a clip starting at a time can be copied from
+
+    :param video: Video instance the clip is cut from
+    :param start: seconds
+    :return: time of the keyframe in seconds, None if the clip must be
+             reencoded
+    """
+    index = models.KeyframeIndex.objects.filter(video=video).first()
+    if index is None:
+        index = indexKeyframes(video)
+
+    keyframe = index.find(start)
+    if keyframe is None or start - keyframe[0] > \
+            settings.CONSTANT['VIDEO']['CLIP']['MAX_KEYFRAME_SHIFT']:
+        return None
+
+    return keyframe[0]
+
+
+def makeClip(clip, video, start, end):
+    """
+    Cut the file of a clip from its video, by copying the streams from a
+    keyframe when possible, then store it by its content and save the
+    informations read from it
+
+    :param clip: Video instance of the clip, without file
+    :param video: Video instance the clip is cut from
+    :param start: seconds
+    :param end: seconds
+    :return: nothing, raise ffmpeg.Error on failure
+    """
+    ext = os.path.splitext(video.file.name)[1][1:].lower()
+    temporary_path = makeContentTemporaryFile(ext)
+
+    try:
+        keyframe = getClipStart(video, start)
+        if keyframe is not None:
+            output = {
+                'c': 'copy',
+                'avoid_negative_ts': 'make_zero',
+            }
+            start = keyframe
+        else:
+            output = dict(CLIP_CODECS[ext])
+        if ext == 'mp4':
+            output['movflags'] = '+faststart'
+
+        (
+            ffmpeg
+            .input(video.is_path_file, ss=start)
+            .output(temporary_path, t=end - start, **output)
+            .overwrite_output()
+            .run(capture_stdout=True, capture_stderr=True)
+        )
+
+        name, sha256 = storeContent(temporary_path, ext)
+    finally:
+        if os.path.exists(temporary_path):
+            os.remove(temporary_path)
+    path = os.path.join(settings.MEDIA_ROOT, name)
+
+    infos_video = readInformationsVideo(path)
+    if not infos_video:
+        if not models.Video.objects.filter(file=name).exists():
+            os.remove(path)
+        raise ValueError('The clip {} is not a video'.format(clip.id))
+
+    infos_video['size'] = os.path.getsize(path)
+
+    clip.file = name
+    clip.sha256 = sha256
+    setInformationsVideo(clip, infos_video)
+    clip.save()
+
+    processNewVideo(clip)
+
+
 def deleteEmptyRepository(path):
     """
     delete all empty folders from the media folder
@@ -72,3 +477,323 @@ def deleteEmptyRepository(path):
             list_elts = os.listdir(new_path)
             if len(list_elts) == 0:
                 os.rmdir(new_path)
+
+
+def getRenditionLadder(width, height):
+    """
+    Renditions of the ladder for a video, from the highest: a video is
+    never upscaled
+
+    :param width: width of the video
+    :param height: height of the video
+    :return: list of dict with name, width, height, video_bitrate and
+             audio_bitrate of each rendition
+    """
+    ladder = []
+    for rung in settings.CONSTANT['VIDEO']['RENDITIONS']:
+        if rung['HEIGHT'] > height:
+            continue
+
+        ladder.append({
+            'name': rung['NAME'],
+            # same aspect ratio, the encoder needs even dimensions
+            'width': int(round(width * rung['HEIGHT'] / height / 2)) * 2,
+            'height': rung['HEIGHT'],
+            'video_bitrate': rung['VIDEO_BITRATE'],
+            'audio_bitrate': rung['AUDIO_BITRATE'],
+        })
+
+    return ladder
+
+
+def createRenditions(video):
+    """
+    Add the renditions of a new video, they are transcoded by the worker
+
+    :param video: Video instance
+    :return: list of Rendition
+    """
+    renditions = []
+    for rung in getRenditionLadder(video.width, video.height):
+        rendition = models.Rendition.objects.create(video=video, **rung)
+        jobs.enqueue('video.transcode_rendition', rendition_id=rendition.id)
+        renditions.append(rendition)
+
+    return renditions
+
+
+def transcodeRendition(rendition):
+    """
+    Cut a video in HLS segments at the resolution of a rendition. The
+    keyframes are forced at the start of each segment so the players can
+    switch between the renditions at any segment.
+
+    :param rendition: Rendition instance
+    :return: nothing, raise ffmpeg.Error on failure
+    """
+    folder = os.path.join(settings.MEDIA_ROOT, rendition.path)
+    os.makedirs(folder, exist_ok=True)
+
+    segment_duration = settings.CONSTANT['VIDEO']['SEGMENT_DURATION']
+
+    (
+        ffmpeg
+        .input(rendition.video.is_path_file)
+        .output(
+            os.path.join(folder, 'index.m3u8'),
+            format='hls',
+            vf='scale={}:{}'.format(rendition.width, rendition.height),
+            vcodec='libx264',
+            preset='veryfast',
+            video_bitrate='{}k'.format(rendition.video_bitrate),
+            maxrate='{}k'.format(rendition.video_bitrate),
+            bufsize='{}k'.format(rendition.video_bitrate * 2),
+            force_key_frames='expr:gte(t,n_forced*{})'.format(
+                segment_duration
+            ),
+            acodec='aac',
+            audio_bitrate='{}k'.format(rendition.audio_bitrate),
+            hls_time=segment_duration,
+            hls_playlist_type='vod',
+            hls_segment_filename=os.path.join(folder, 'segment_%05d.ts'),
+        )
+        .overwrite_output()
+        .run(capture_stdout=True, capture_stderr=True)
+    )
+
+
+def writeMasterPlaylist(video):
+    """
+    Write the HLS master playlist of the renditions ready of a video. The
+    file is replaced at once, a player never reads it half written.
+
+    :param video: Video instance
+    :return: nothing
+    """
+    renditions = video.renditions.filter(status=models.Rendition.READY)
+
+    lines = ['#EXTM3U', '#EXT-X-VERSION:3']
+    for rendition in renditions:
+        lines.append(
+            '#EXT-X-STREAM-INF:BANDWIDTH={},RESOLUTION={}x{}'.format(
+                rendition.bandwidth,
+                rendition.width,
+                rendition.height,
+            )
+        )
+        lines.append('{}/index.m3u8'.format(rendition.name))
+
+    folder = os.path.join(settings.MEDIA_ROOT, video.renditions_path)
+    os.makedirs(folder, exist_ok=True)
+
+    path = os.path.join(folder, 'master.m3u8')
+    with open(path + '.tmp', 'w') as file:
+        file.write('\n'.join(lines) + '\n')
+    os.replace(path + '.tmp', path)
+
+
+def processNewVideo(video):
+    """
+    Queue the jobs making the files of a new video: its faststart version
+    first, which replaces its file, then its renditions, its previews and
+    the index of its keyframes, all read from the new file
+
+    :param video: Video instance
+    :return: nothing
+    """
+    jobs.enqueue('video.faststart', video_id=video.id)
+
+
+def processFaststartVideo(video):
+    """
+    Queue the jobs making the files of a video read from its faststart
+    version. The renditions already created by a run interrupted are not
+    created again.
+
+    :param video: Video instance
+    :return: nothing
+    """
+    if not video.renditions.exists():
+        createRenditions(video)
+
+        # the videos of the same content uploaded meanwhile share them
+        for copy in models.Video.objects.filter(media_source=video.id):
+            shareProcessedFiles(copy, video)
+    jobs.enqueue('video.make_previews', video_id=video.id)
+    jobs.enqueue('video.index_keyframes', video_id=video.id)
+
+
+def shareProcessedFiles(video, source):
+    """
+    Give a new video the renditions, previews and keyframes of a video of
+    the same content, instead of making them again. The ones still being
+    made are updated for both videos by the jobs of the source.
+
+    :param video: Video instance, saved, with media_source set
+    :param source: Video instance of the same content
+    :return: nothing
+    """
+    models.Rendition.objects.bulk_create([
+        models.Rendition(
+            video=video,
+            name=rendition.name,
+            width=rendition.width,
+            height=rendition.height,
+            video_bitrate=rendition.video_bitrate,
+            audio_bitrate=rendition.audio_bitrate,
+            status=rendition.status,
+            error=rendition.error,
+        )
+        for rendition in source.renditions.all()
+    ])
+
+    index = models.KeyframeIndex.objects.filter(video=source).first()
+    if index is not None:
+        copyKeyframeIndex(index, video.id)
+
+
+def getPreviewsLayout(video):
+    """
+    Thumbnails of the scrub preview of a video, in a sprite
+
+    :param video: Video instance
+    :return: dict with interval (seconds), count, width, height of the
+             thumbnails, and columns, rows of the sprite
+    """
+    config = settings.CONSTANT['VIDEO']['PREVIEWS']
+
+    interval = max(
+        config['INTERVAL'],
+        video.duration / config['MAX_THUMBNAILS']
+    )
+    count = max(int(math.ceil(video.duration / interval)), 1)
+    columns = min(count, config['COLUMNS'])
+
+    return {
+        'interval': interval,
+        'count': count,
+        'width': config['WIDTH'],
+        # same aspect ratio, the encoder needs even dimensions
+        'height': int(round(
+            config['WIDTH'] * video.height / video.width / 2
+        )) * 2,
+        'columns': columns,
+        'rows': int(math.ceil(count / columns)),
+    }
+
+
+def formatVttTime(seconds):
+    """
+    :param seconds: time in seconds
+    :return: time of a WebVTT cue, HH:MM:SS.mmm
+    """
+    milliseconds = int(round(seconds * 1000))
+    return '{:02d}:{:02d}:{:02d}.{:03d}'.format(
+        milliseconds // 3600000,
+        milliseconds // 60000 % 60,
+        milliseconds // 1000 % 60,
+        milliseconds % 1000,
+    )
+
+
+def writeThumbnailsVtt(path, layout, duration):
+    """
+    Write the WebVTT index of the thumbnails of a sprite: each cue gives
+    the part of the sprite to show for a time range
+
+    :param path: path of the WebVTT file
+    :param layout: dict returned by getPreviewsLayout
+    :param duration: duration of the video
+    :return: nothing
+    """
+    lines = ['WEBVTT', '']
+    for index in range(layout['count']):
+        start = index * layout['interval']
+        end = min(start + layout['interval'], duration)
+
+        lines.append('{} --> {}'.format(
+            formatVttTime(start),
+            formatVttTime(end)
+        ))
+        lines.append('sprite.jpg#xywh={},{},{},{}'.format(
+            index % layout['columns'] * layout['width'],
+            index // layout['columns'] * layout['height'],
+            layout['width'],
+            layout['height'],
+        ))
+        lines.append('')
+
+    with open(path, 'w') as file:
+        file.write('\n'.join(lines))
+
+
+def makePreviews(video):
+    """
+    Make the previews of a video in its folder: a poster, a sprite of
+    thumbnails at a fixed interval and the WebVTT index of the sprite
+
+    :param video: Video instance
+    :return: nothing, raise ffmpeg.Error on failure
+    """
+    folder = os.path.join(settings.MEDIA_ROOT, video.renditions_path)
+    os.makedirs(folder, exist_ok=True)
+
+    config = settings.CONSTANT['VIDEO']['PREVIEWS']
+
+    # a frame at a tenth of the video, the first ones are often black
+    (
+        ffmpeg
+        .input(video.is_path_file, ss=video.duration / 10)
+        .output(
+            os.path.join(folder, 'poster.jpg'),
+            vframes=1,
+            vf='scale=-2:{}'.format(
+                min(video.height, config['POSTER_HEIGHT'])
+            ),
+        )
+        .overwrite_output()
+        .run(capture_stdout=True, capture_stderr=True)
+    )
+
+    layout = getPreviewsLayout(video)
+
+    (
+        ffmpeg
+        .input(video.is_path_file)
+        # a frame every interval, from the first one (the fps filter
+        # gives nothing for videos shorter than the interval)
+        .filter(
+            'select',
+            'isnan(prev_selected_t)+gte(t-prev_selected_t,{})'.format(
+                layout['interval']
+            )
+        )
+        .filter('scale', layout['width'], layout['height'])
+        .filter('tile', '{}x{}'.format(layout['columns'], layout['rows']))
+        .output(os.path.join(folder, 'sprite.jpg'), vframes=1)
+        .overwrite_output()
+        .run(capture_stdout=True, capture_stderr=True)
+    )
+
+    writeThumbnailsVtt(
+        os.path.join(folder, 'thumbnails.vtt'),
+        layout,
+        video.duration
+    )
+
+
+def deleteRenditions(video_id):
+    """
+    delete the folder of the renditions of a video
+
+    :param video_id: id of the video
+    :return: nothing
+    """
+    shutil.rmtree(
+        os.path.join(
+            settings.MEDIA_ROOT,
+            models.RENDITIONS_PATH,
+            str(video_id)
+        ),
+        ignore_errors=True
+    )
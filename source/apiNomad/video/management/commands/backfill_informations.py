@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+
+from apiNomad import jobs
+
+
+class Command(BaseCommand):
+    help = 'Queue the reading of the codec, frame rate, audio and ' \
+           'bitrate of the videos saved before they were stored, run by ' \
+           'the worker by batches.'
+
+    def handle(self, *args, **options):
+        jobs.enqueue('video.backfill_informations')
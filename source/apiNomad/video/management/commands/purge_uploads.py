@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from video.tasks import purge_uploads
+
+
+class Command(BaseCommand):
+    help = 'Delete the expired upload sessions and their files, to run ' \
+           'periodically (cron, scheduler).'
+
+    def handle(self, *args, **options):
+        purge_uploads()
@@ -0,0 +1,54 @@
+from django.conf import settings
+from django.db import models
+from django.utils import timezone
+
+
+class VideoQuerySet(models.QuerySet):
+    def for_serializer(self):
+        """
+        Load in a fixed number of queries all the relations rendered by
+        VideoBasicSerializer (owner with its profile and groups, genres,
+        renditions)
+        """
+        return self.select_related(
+            'owner',
+            'owner__profile',
+        ).prefetch_related(
+            'owner__groups',
+            'genres',
+            'renditions',
+        )
+
+    def ready(self):
+        """
+        Videos with a file: the clips are listed once they are cut
+        """
+        return self.exclude(file='')
+
+    def sharing_file(self, video):
+        """
+        Other videos stored in the same file than the video, found with
+        the index on the hash of their content
+        """
+        return self.filter(
+            sha256=video.sha256,
+            file=video.file.name,
+        ).exclude(pk=video.pk)
+
+
+VideoManager = models.Manager.from_queryset(VideoQuerySet)
+
+
+class UploadSessionQuerySet(models.QuerySet):
+    def expired(self):
+        """
+        Sessions not completed in UPLOAD_SESSION_HOURS
+        """
+        return self.filter(
+            is_created__lte=timezone.now() - timezone.timedelta(
+                hours=settings.CONSTANT['VIDEO']['UPLOAD_SESSION_HOURS']
+            )
+        )
+
+
+UploadSessionManager = models.Manager.from_queryset(UploadSessionQuerySet)
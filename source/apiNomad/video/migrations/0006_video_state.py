@@ -0,0 +1,26 @@
+# Generated by Django 2.1.5 on 2026-10-18 09:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('video', '0005_auto_20190330_0019'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='video',
+            name='state',
+            field=models.CharField(choices=[('I', 'Inactive'), ('A', 'Active'), ('D', 'Deleted')], default='I', max_length=1, verbose_name='State'),
+        ),
+        migrations.AddIndex(
+            model_name='video',
+            index=models.Index(fields=['owner', 'state', 'is_created'], name='video_owner_state_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='video',
+            index=models.Index(fields=['state', 'is_created'], name='video_state_created_idx'),
+        ),
+    ]
@@ -0,0 +1,54 @@
+from django.db import migrations, transaction
+from django.db.models import F, Max
+
+# Number of videos updated by transaction. Each batch is committed on its
+# own so the table is never locked for the whole backfill, and a batch
+# only updates rows whose state is not already right so the migration
+# can be run again after an interruption.
+BATCH_SIZE = 1000
+
+
+def backfill_video_state(apps, schema_editor):
+    Video = apps.get_model('video', 'Video')
+    db_alias = schema_editor.connection.alias
+
+    last_pk = Video.objects.using(db_alias).aggregate(
+        last_pk=Max('pk')
+    )['last_pk'] or 0
+
+    for start in range(0, last_pk, BATCH_SIZE):
+        batch = Video.objects.using(db_alias).filter(
+            pk__gt=start,
+            pk__lte=start + BATCH_SIZE,
+        )
+
+        with transaction.atomic(using=db_alias):
+            batch.filter(
+                is_deleted__gte=F('is_created'),
+            ).exclude(state='D').update(state='D')
+
+            batch.filter(
+                is_deleted__lt=F('is_created'),
+                is_actived__gte=F('is_created'),
+            ).exclude(state='A').update(state='A')
+
+            batch.filter(
+                is_deleted__lt=F('is_created'),
+                is_actived__lt=F('is_created'),
+            ).exclude(state='I').update(state='I')
+
+
+class Migration(migrations.Migration):
+    atomic = False
+
+    dependencies = [
+        ('video', '0006_video_state'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            backfill_video_state,
+            migrations.RunPython.noop,
+            atomic=False,
+        ),
+    ]
@@ -0,0 +1,48 @@
+# Generated by Django 2.1.5 on 2026-10-18 09:17
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import uuid
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('video', '0007_video_state_backfill'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UploadChunk',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('start', models.PositiveIntegerField(verbose_name='start')),
+                ('end', models.PositiveIntegerField(verbose_name='end')),
+            ],
+            options={
+                'verbose_name_plural': 'Upload chunks',
+                'ordering': ('start',),
+            },
+        ),
+        migrations.CreateModel(
+            name='UploadSession',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('filename', models.CharField(max_length=255, verbose_name='File name')),
+                ('size', models.PositiveIntegerField(verbose_name='size')),
+                ('is_created', models.DateTimeField(auto_now_add=True, verbose_name='Cree le')),
+                ('owner', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL, verbose_name='Owner')),
+            ],
+            options={
+                'verbose_name_plural': 'Upload sessions',
+                'ordering': ('is_created',),
+            },
+        ),
+        migrations.AddField(
+            model_name='uploadchunk',
+            name='session',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='chunks', to='video.UploadSession'),
+        ),
+    ]
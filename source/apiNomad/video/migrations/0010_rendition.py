@@ -0,0 +1,41 @@
+# Generated by Django 2.1.5 on 2026-10-18 09:31
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('video', '0009_video_sha256'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Rendition',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=16, verbose_name='Name')),
+                ('width', models.PositiveIntegerField(verbose_name='width')),
+                ('height', models.PositiveIntegerField(verbose_name='height')),
+                ('video_bitrate', models.PositiveIntegerField(verbose_name='video bitrate')),
+                ('audio_bitrate', models.PositiveIntegerField(verbose_name='audio bitrate')),
+                ('status', models.CharField(choices=[('P', 'Pending'), ('R', 'Processing'), ('D', 'Ready'), ('F', 'Failed')], default='P', max_length=1, verbose_name='Status')),
+                ('error', models.TextField(blank=True, null=True, verbose_name='Error')),
+                ('is_created', models.DateTimeField(auto_now_add=True, verbose_name='Cree le')),
+            ],
+            options={
+                'verbose_name_plural': 'Renditions',
+                'ordering': ('-height',),
+            },
+        ),
+        migrations.AddField(
+            model_name='rendition',
+            name='video',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='renditions', to='video.Video', verbose_name='Video'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='rendition',
+            unique_together={('video', 'name')},
+        ),
+    ]
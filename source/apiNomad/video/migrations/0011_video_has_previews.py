@@ -0,0 +1,18 @@
+# Generated by Django 2.1.5 on 2026-10-18 09:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('video', '0010_rendition'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='video',
+            name='has_previews',
+            field=models.BooleanField(default=False, verbose_name='Previews'),
+        ),
+    ]
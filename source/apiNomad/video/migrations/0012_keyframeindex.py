@@ -0,0 +1,27 @@
+# Generated by Django 2.1.5 on 2026-10-18 09:47
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('video', '0011_video_has_previews'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='KeyframeIndex',
+            fields=[
+                ('video', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='keyframe_index', serialize=False, to='video.Video', verbose_name='Video')),
+                ('count', models.PositiveIntegerField(default=0, verbose_name='Number of keyframes')),
+                ('times', models.BinaryField(verbose_name='Times')),
+                ('offsets', models.BinaryField(verbose_name='Offsets')),
+                ('is_created', models.DateTimeField(auto_now_add=True, verbose_name='Cree le')),
+            ],
+            options={
+                'verbose_name_plural': 'Keyframe indexes',
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 2.1.5 on 2026-10-18 09:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('video', '0012_keyframeindex'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='video',
+            name='is_faststart',
+            field=models.BooleanField(default=False, verbose_name='Faststart'),
+        ),
+    ]
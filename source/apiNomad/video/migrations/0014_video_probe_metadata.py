@@ -0,0 +1,59 @@
+# Generated by Django 2.1.5 on 2026-10-18 09:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('video', '0013_video_is_faststart'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='video',
+            name='bitrate',
+            field=models.PositiveIntegerField(default=0, verbose_name='bitrate'),
+        ),
+        migrations.AddField(
+            model_name='video',
+            name='codec',
+            field=models.CharField(blank=True, default='', max_length=16, verbose_name='codec'),
+        ),
+        migrations.AddField(
+            model_name='video',
+            name='fps',
+            field=models.FloatField(default=0, verbose_name='frames per second'),
+        ),
+        migrations.AddField(
+            model_name='video',
+            name='has_audio',
+            field=models.BooleanField(default=False, verbose_name='audio'),
+        ),
+        migrations.AddField(
+            model_name='video',
+            name='num_frame',
+            field=models.PositiveIntegerField(default=0, verbose_name='number of frames'),
+        ),
+        migrations.AddField(
+            model_name='video',
+            name='rotation',
+            field=models.PositiveSmallIntegerField(default=0, verbose_name='rotation'),
+        ),
+        migrations.AddIndex(
+            model_name='video',
+            index=models.Index(fields=['state', 'duration'], name='video_state_duration_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='video',
+            index=models.Index(fields=['state', 'width'], name='video_state_width_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='video',
+            index=models.Index(fields=['state', 'height'], name='video_state_height_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='video',
+            index=models.Index(fields=['state', 'codec'], name='video_state_codec_idx'),
+        ),
+    ]
@@ -0,0 +1,50 @@
+# Generated by Django 2.1.5 on 2026-10-18 10:39
+
+from django.db import migrations, models, transaction
+from django.db.models import F, Max
+
+# Number of videos updated by transaction, each batch is committed on its
+# own so the table is never locked for the whole backfill
+BATCH_SIZE = 1000
+
+
+def copy_sha256(apps, schema_editor):
+    """
+    The SHA-256 of the contents uploaded before is the one of their file,
+    the contents already remuxed are found by it
+    """
+    Video = apps.get_model('video', 'Video')
+    db_alias = schema_editor.connection.alias
+
+    last_pk = Video.objects.using(db_alias).aggregate(
+        last_pk=Max('pk')
+    )['last_pk'] or 0
+
+    for start in range(0, last_pk, BATCH_SIZE):
+        with transaction.atomic(using=db_alias):
+            Video.objects.using(db_alias).filter(
+                pk__gt=start,
+                pk__lte=start + BATCH_SIZE,
+                source_sha256__isnull=True,
+            ).update(source_sha256=F('sha256'))
+
+
+class Migration(migrations.Migration):
+    atomic = False
+
+    dependencies = [
+        ('video', '0014_video_probe_metadata'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='video',
+            name='source_sha256',
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=64, null=True, verbose_name='SHA-256 of the upload'),
+        ),
+        migrations.RunPython(
+            copy_sha256,
+            migrations.RunPython.noop,
+            atomic=False,
+        ),
+    ]
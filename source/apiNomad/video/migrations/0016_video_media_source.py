@@ -0,0 +1,18 @@
+# Generated by Django 2.1.5 on 2026-10-18 10:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('video', '0015_video_source_sha256'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='video',
+            name='media_source',
+            field=models.PositiveIntegerField(blank=True, db_index=True, editable=False, null=True, verbose_name='Media source'),
+        ),
+    ]
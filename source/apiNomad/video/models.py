@@ -1,17 +1,22 @@
+import bisect
 import datetime
 import os
 import random
 import time
 import string
+import sys
+from array import array
 
 from django.core.validators import FileExtensionValidator
 from django.db import models
 from django.utils.deconstruct import deconstructible
 from django.conf import settings
+from django.utils import timezone
 import pytz
 
 from uuid import uuid4
 from apiNomad.models import User
+from .managers import UploadSessionManager, VideoManager
 
 
 class Genre(models.Model):
@@ -34,6 +39,31 @@ class Genre(models.Model):
         return self.label
 
 
+# Folder of the videos stored by the SHA-256 of their content
+CONTENT_PATH = 'uploads/videos/sha256'
+
+# Folder of the files made from the videos (renditions, previews), a
+# sub-folder by video
+RENDITIONS_PATH = 'uploads/renditions'
+
+
+def content_path(sha256, ext):
+    """
+    Path of a file stored by its content, split in two levels of folders
+    to keep the folders small
+
+    :param sha256: hex digest of the content
+    :param ext: extension of the file
+    :return: path relative to the media folder
+    """
+    return os.path.join(
+        CONTENT_PATH,
+        sha256[:2],
+        sha256[2:4],
+        '{}.{}'.format(sha256, ext.lower())
+    )
+
+
 @deconstructible
 class PathAndRename(object):
     def __init__(self, sub_path):
@@ -41,6 +71,13 @@ class PathAndRename(object):
 
     def __call__(self, instance, filename):
         ext = filename.split('.')[-1]
+
+        # a file with a known content is named by it, the same content
+        # always has the same path
+        sha256 = getattr(instance, 'sha256', None)
+        if sha256:
+            return content_path(sha256, ext)
+
         f_name = '-'.join(
             filename.replace(
                 ext,
@@ -65,15 +102,53 @@ class PathAndRename(object):
 
 
 class Video(models.Model):
+    INACTIVE = 'I'
+    ACTIVE = 'A'
+    DELETED = 'D'
+
+    STATES = (
+        (INACTIVE, 'Inactive'),
+        (ACTIVE, 'Active'),
+        (DELETED, 'Deleted'),
+    )
+
     class Meta:
         verbose_name_plural = 'Videos'
         ordering = ('is_created',)
+        indexes = [
+            models.Index(
+                fields=['owner', 'state', 'is_created'],
+                name='video_owner_state_idx',
+            ),
+            models.Index(
+                fields=['state', 'is_created'],
+                name='video_state_created_idx',
+            ),
+            models.Index(
+                fields=['state', 'duration'],
+                name='video_state_duration_idx',
+            ),
+            models.Index(
+                fields=['state', 'width'],
+                name='video_state_width_idx',
+            ),
+            models.Index(
+                fields=['state', 'height'],
+                name='video_state_height_idx',
+            ),
+            models.Index(
+                fields=['state', 'codec'],
+                name='video_state_codec_idx',
+            ),
+        ]
 
     owner = models.ForeignKey(
         User,
         on_delete=models.CASCADE,
         verbose_name="Owners",
     )
+    # the informations of the file VideoFilter filters on are indexed
+    # after the state, which the lists of the videos filter on first
     duration = models.FloatField(
         verbose_name='duration',
     )
@@ -90,6 +165,34 @@ class Video(models.Model):
     size = models.PositiveIntegerField(
         verbose_name='size',
     )
+    num_frame = models.PositiveIntegerField(
+        verbose_name='number of frames',
+        default=0,
+    )
+    codec = models.CharField(
+        verbose_name='codec',
+        max_length=16,
+        blank=True,
+        default='',
+    )
+    # bit/s of the whole file
+    bitrate = models.PositiveIntegerField(
+        verbose_name='bitrate',
+        default=0,
+    )
+    fps = models.FloatField(
+        verbose_name='frames per second',
+        default=0,
+    )
+    has_audio = models.BooleanField(
+        verbose_name='audio',
+        default=False,
+    )
+    # degrees clockwise the players turn the video to display it
+    rotation = models.PositiveSmallIntegerField(
+        verbose_name='rotation',
+        default=0,
+    )
     title = models.CharField(
         verbose_name="Title",
         max_length=255,
@@ -108,6 +211,35 @@ class Video(models.Model):
             )
         ]
     )
+    # several videos of the same content share the same file
+    sha256 = models.CharField(
+        verbose_name="SHA-256",
+        max_length=64,
+        blank=True,
+        null=True,
+        db_index=True,
+        editable=False,
+    )
+    # SHA-256 of the content uploaded, to find it again once the file is
+    # remuxed (faststart) and its SHA-256 changed
+    source_sha256 = models.CharField(
+        verbose_name="SHA-256 of the upload",
+        max_length=64,
+        blank=True,
+        null=True,
+        db_index=True,
+        editable=False,
+    )
+    # id of the video of the same content uploaded before, whose
+    # renditions, previews and keyframes this one uses instead of making
+    # them again
+    media_source = models.PositiveIntegerField(
+        verbose_name="Media source",
+        blank=True,
+        null=True,
+        db_index=True,
+        editable=False,
+    )
     description = models.TextField(
         verbose_name="Description",
         blank=True,
@@ -129,23 +261,303 @@ class Video(models.Model):
             1990, 1, 1, 0, 0, 0, 127325, tzinfo=pytz.UTC
         ),
     )
+    # the moov box of the MP4 is before the media data, the video can be
+    # played while it is downloaded
+    is_faststart = models.BooleanField(
+        verbose_name="Faststart",
+        default=False,
+    )
+    # poster, thumbnails sprite and its WebVTT index are made
+    has_previews = models.BooleanField(
+        verbose_name="Previews",
+        default=False,
+    )
+    # state is derived from is_deleted / is_actived on every save,
+    # it is stored to let the database filter and index on it
+    state = models.CharField(
+        verbose_name="State",
+        max_length=1,
+        choices=STATES,
+        default=INACTIVE,
+    )
+
+    objects = VideoManager()
 
     def __str__(self):
         return "{} - {}".format(self.title, self.is_created)
 
+    def save(self, *args, **kwargs):
+        self.state = self.compute_state()
+        super(Video, self).save(*args, **kwargs)
+
+    def compute_state(self):
+        """
+        the video is deleted if is_deleted is after its creation, else
+        it is enable if is_actived is after its creation
+        """
+        # is_created is only set by the database on the first save
+        is_created = self.is_created or timezone.now()
+
+        if self.is_deleted >= is_created:
+            return self.DELETED
+        if self.is_actived >= is_created:
+            return self.ACTIVE
+        return self.INACTIVE
+
     @property
     def is_active(self):
         """
         the video is enable if not deleted and she is actived
         """
-        if not self.is_delete:
-            return self.is_actived >= self.is_created
-        return False
+        return self.state == self.ACTIVE
 
     @property
     def is_delete(self):
-        return self.is_deleted >= self.is_created
+        return self.state == self.DELETED
 
     @property
     def is_path_file(self):
         return settings.MEDIA_ROOT + '/' + self.file.name
+
+    @property
+    def renditions_path(self):
+        """
+        folder of the renditions, of their master playlist and of the
+        previews, relative to the media folder. The videos of the same
+        content share the folder of the first one.
+        """
+        return '{}/{}/'.format(
+            RENDITIONS_PATH,
+            self.media_source or self.id
+        )
+
+
+class Rendition(models.Model):
+    """
+    Version of a video at a resolution of the ladder, cut in HLS segments
+    by a job of the worker.
+    """
+    PENDING = 'P'
+    PROCESSING = 'R'
+    READY = 'D'
+    FAILED = 'F'
+
+    STATUSES = (
+        (PENDING, 'Pending'),
+        (PROCESSING, 'Processing'),
+        (READY, 'Ready'),
+        (FAILED, 'Failed'),
+    )
+
+    class Meta:
+        verbose_name_plural = 'Renditions'
+        ordering = ('-height',)
+        unique_together = (('video', 'name'),)
+
+    video = models.ForeignKey(
+        Video,
+        on_delete=models.CASCADE,
+        verbose_name="Video",
+        related_name="renditions",
+    )
+    name = models.CharField(
+        verbose_name="Name",
+        max_length=16,
+    )
+    width = models.PositiveIntegerField(
+        verbose_name='width',
+    )
+    height = models.PositiveIntegerField(
+        verbose_name='height',
+    )
+    # kbit/s
+    video_bitrate = models.PositiveIntegerField(
+        verbose_name='video bitrate',
+    )
+    audio_bitrate = models.PositiveIntegerField(
+        verbose_name='audio bitrate',
+    )
+    status = models.CharField(
+        verbose_name="Status",
+        max_length=1,
+        choices=STATUSES,
+        default=PENDING,
+    )
+    error = models.TextField(
+        verbose_name="Error",
+        blank=True,
+        null=True,
+    )
+    is_created = models.DateTimeField(
+        verbose_name="Cree le",
+        auto_now_add=True,
+    )
+
+    def __str__(self):
+        return "{} - {}".format(self.video_id, self.name)
+
+    @property
+    def path(self):
+        """
+        folder of the segments, relative to the media folder
+        """
+        return '{}{}/'.format(self.video.renditions_path, self.name)
+
+    @property
+    def bandwidth(self):
+        """
+        bits/s announced in the master playlist
+        """
+        return (self.video_bitrate + self.audio_bitrate) * 1000
+
+
+class KeyframeIndex(models.Model):
+    """
+    Times and byte offsets of the keyframes of a video, read once from its
+    container. They are stored as packed arrays of little endian doubles
+    and unsigned 64 bits integers: 16 bytes by keyframe, loaded without
+    parsing anything.
+    """
+    class Meta:
+        verbose_name_plural = 'Keyframe indexes'
+
+    video = models.OneToOneField(
+        Video,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        verbose_name="Video",
+        related_name="keyframe_index",
+    )
+    count = models.PositiveIntegerField(
+        verbose_name="Number of keyframes",
+        default=0,
+    )
+    times = models.BinaryField(
+        verbose_name="Times",
+    )
+    offsets = models.BinaryField(
+        verbose_name="Offsets",
+    )
+    is_created = models.DateTimeField(
+        verbose_name="Cree le",
+        auto_now_add=True,
+    )
+
+    def __str__(self):
+        return "{} - {} keyframes".format(self.video_id, self.count)
+
+    @staticmethod
+    def pack(typecode, values):
+        data = array(typecode, values)
+        if sys.byteorder == 'big':
+            data.byteswap()
+        return data.tobytes()
+
+    @staticmethod
+    def unpack(typecode, data):
+        values = array(typecode)
+        values.frombytes(bytes(data))
+        if sys.byteorder == 'big':
+            values.byteswap()
+        return values
+
+    def set_keyframes(self, keyframes):
+        """
+        :param keyframes: list of (time in seconds, byte offset) sorted
+                          by time
+        """
+        self.count = len(keyframes)
+        self.times = self.pack('d', [time for time, offset in keyframes])
+        self.offsets = self.pack('Q', [offset for time, offset in keyframes])
+
+    def find(self, time):
+        """
+        Last keyframe at or before a time, the first one before the start
+        of the video
+
+        :return: (time in seconds, byte offset), None without keyframes
+        """
+        if not self.count:
+            return None
+
+        times = self.unpack('d', self.times)
+        index = max(bisect.bisect_right(times, time) - 1, 0)
+        return times[index], self.unpack('Q', self.offsets)[index]
+
+
+class UploadSession(models.Model):
+    """
+    Upload of a video sent by chunks. The chunks are written at their
+    place in a single file which becomes the video when the upload is
+    complete, the session is then deleted.
+    """
+    class Meta:
+        verbose_name_plural = 'Upload sessions'
+        ordering = ('is_created',)
+
+    id = models.UUIDField(
+        primary_key=True,
+        default=uuid4,
+        editable=False,
+    )
+    owner = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        verbose_name="Owner",
+    )
+    filename = models.CharField(
+        verbose_name="File name",
+        max_length=255,
+    )
+    size = models.PositiveIntegerField(
+        verbose_name='size',
+    )
+    is_created = models.DateTimeField(
+        verbose_name="Cree le",
+        auto_now_add=True,
+    )
+
+    objects = UploadSessionManager()
+
+    def __str__(self):
+        return "{} - {}".format(self.filename, self.is_created)
+
+    @property
+    def path_file(self):
+        return os.path.join(
+            settings.MEDIA_ROOT,
+            'uploads',
+            'sessions',
+            '{}.part'.format(self.id.hex)
+        )
+
+    @property
+    def expired(self):
+        return self.is_created + timezone.timedelta(
+            hours=settings.CONSTANT['VIDEO']['UPLOAD_SESSION_HOURS']
+        ) <= timezone.now()
+
+
+class UploadChunk(models.Model):
+    """
+    Range of bytes [start, end[ received for an upload session. A range is
+    saved once its bytes are written on the disk.
+    """
+    class Meta:
+        verbose_name_plural = 'Upload chunks'
+        ordering = ('start',)
+
+    session = models.ForeignKey(
+        UploadSession,
+        on_delete=models.CASCADE,
+        related_name='chunks',
+    )
+    start = models.PositiveIntegerField(
+        verbose_name='start',
+    )
+    end = models.PositiveIntegerField(
+        verbose_name='end',
+    )
+
+    def __str__(self):
+        return "{} [{}, {}[".format(self.session_id, self.start, self.end)
@@ -1,10 +1,14 @@
 import os
+import posixpath
 from django.conf import settings
+from django.db.models import Q
+from django.urls import reverse
 from django.utils.translation import ugettext_lazy as _
 from rest_framework import serializers
 
+from apiNomad import jobs
 from apiNomad.serializers import UserBasicSerializer
-from . import models, functions
+from . import models, functions, tokens, uploads
 
 
 class GenreBasicSerializer(serializers.ModelSerializer):
@@ -18,6 +22,18 @@ class GenreBasicSerializer(serializers.ModelSerializer):
         ]
 
 
+class RenditionBasicSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = models.Rendition
+        fields = (
+            'name',
+            'width',
+            'height',
+            'status',
+        )
+        read_only_fields = fields
+
+
 class VideoBasicSerializer(serializers.ModelSerializer):
     owner = UserBasicSerializer(
         read_only=True
@@ -29,6 +45,13 @@ class VideoBasicSerializer(serializers.ModelSerializer):
     is_active = serializers.SerializerMethodField()
     is_delete = serializers.SerializerMethodField()
     is_path_file = serializers.SerializerMethodField()
+    renditions = RenditionBasicSerializer(
+        many=True,
+        read_only=True
+    )
+    renditions_url = serializers.SerializerMethodField()
+    poster_url = serializers.SerializerMethodField()
+    thumbnails_url = serializers.SerializerMethodField()
 
     def get_is_active(self, obj):
         return obj.is_active
@@ -37,7 +60,71 @@ class VideoBasicSerializer(serializers.ModelSerializer):
         return obj.is_delete
 
     def get_is_path_file(self, obj):
-        return obj.is_path_file
+        """
+        signed URL of the file, for the owner or once the video is active
+        """
+        # the file of a clip is cut by the worker
+        if not obj.file.name or not self.can_watch(obj):
+            return None
+
+        return self.get_media_url(
+            obj,
+            obj.file.name,
+            posixpath.basename(obj.file.name)
+        )
+
+    def get_renditions_url(self, obj):
+        """
+        signed URL of the HLS master playlist, once a rendition is ready
+        """
+        if not self.can_watch(obj):
+            return None
+
+        # renditions are prefetched with the videos
+        if not any(rendition.status == models.Rendition.READY
+                   for rendition in obj.renditions.all()):
+            return None
+
+        return self.get_media_url(obj, obj.renditions_path, 'master.m3u8')
+
+    def get_poster_url(self, obj):
+        """
+        signed URL of the poster, once the previews are made
+        """
+        if not obj.has_previews or not self.can_watch(obj):
+            return None
+
+        return self.get_media_url(obj, obj.renditions_path, 'poster.jpg')
+
+    def get_thumbnails_url(self, obj):
+        """
+        signed URL of the WebVTT index of the thumbnails sprite, the
+        sprite is found relatively to it
+        """
+        if not obj.has_previews or not self.can_watch(obj):
+            return None
+
+        return self.get_media_url(
+            obj,
+            obj.renditions_path,
+            'thumbnails.vtt'
+        )
+
+    def can_watch(self, obj):
+        request = self.context.get('request')
+        if request is None:
+            return False
+
+        return obj.is_active or obj.owner_id == request.user.id
+
+    def get_media_url(self, obj, path, name):
+        return self.context['request'].build_absolute_uri(reverse(
+            'video:videos_media',
+            kwargs={
+                'token': tokens.sign_media(obj.id, path),
+                'name': name,
+            }
+        ))
 
     def validate(self, data):
         validated_data = super().validate(data)
@@ -48,12 +135,21 @@ class VideoBasicSerializer(serializers.ModelSerializer):
             return data
 
         # validation for first step of video creating
-        file = validated_data.get(
-            'file',
-            getattr(self.instance, 'file', None)
-        )
+        # a video already saved is not read again
+        if 'file' in validated_data.keys():
+            infos_video = functions.getInformationsVideo(
+                validated_data['file']
+            )
+        else:
+            infos_video = functions.getInformationsVideoSaved(self.instance)
 
-        infos_video = functions.getInformationsVideo(file)
+        if not infos_video:
+            error = {
+                'message': (
+                    _("Only mp4 and webm videos are accepted.")
+                )
+            }
+            raise serializers.ValidationError(error)
 
         if infos_video['width'] < \
                 settings.CONSTANT["VIDEO"]["WIDTH"] \
@@ -90,22 +186,40 @@ class VideoBasicSerializer(serializers.ModelSerializer):
 
     def create(self, validated_data):
 
+        # the informations read by validate() are kept on the file
         infos_video = functions.getInformationsVideo(validated_data["file"])
 
         video = models.Video()
 
         video.owner = self.context['request'].user
-        video.file = validated_data['file']
-        video.width = infos_video['width']
-        video.height = infos_video['height']
-        video.size = infos_video['size']
-        video.duration = infos_video['duration']
+        video.sha256 = getattr(validated_data['file'], 'sha256', None)
+        video.source_sha256 = video.sha256
+
+        # a content already uploaded is not stored again, the new video
+        # references the file of the same content, even if it was remuxed
+        # since
+        same_content = None
+        if video.sha256:
+            same_content = models.Video.objects.filter(
+                Q(source_sha256=video.sha256) | Q(sha256=video.sha256)
+            ).order_by('id').first()
+
+        # its renditions, previews and keyframes are not made again either
+        if same_content is not None:
+            video.file = same_content.file.name
+            video.sha256 = same_content.sha256
+            video.media_source = same_content.media_source or same_content.id
+            video.is_faststart = same_content.is_faststart
+            video.has_previews = same_content.has_previews
+        else:
+            video.file = validated_data['file']
+        functions.setInformationsVideo(video, infos_video)
 
         try:
             video.save()
         except Exception as e:
-            if os.path.exists(video.is_path_file()):
-                functions.deleteEmptyRepository(video.is_path_file())
+            if same_content is None and os.path.exists(video.is_path_file):
+                functions.deleteEmptyRepository(video.is_path_file)
 
             error = {
                 'message': (
@@ -116,6 +230,11 @@ class VideoBasicSerializer(serializers.ModelSerializer):
             }
             raise serializers.ValidationError(error)
 
+        if same_content is not None:
+            functions.shareProcessedFiles(video, same_content)
+        else:
+            functions.processNewVideo(video)
+
         return video
 
     class Meta:
@@ -129,4 +248,126 @@ class VideoBasicSerializer(serializers.ModelSerializer):
             'width',
             'height',
             'owner',
+            'state',
+            'sha256',
+            'source_sha256',
+            'media_source',
+            'num_frame',
+            'codec',
+            'bitrate',
+            'fps',
+            'has_audio',
+            'rotation',
+            'is_faststart',
+            'has_previews',
+        ]
+
+
+class VideoClipSerializer(serializers.Serializer):
+    """
+    Range of a video to cut in a new video
+    """
+    start = serializers.FloatField(
+        min_value=0,
+    )
+    end = serializers.FloatField()
+    title = serializers.CharField(
+        max_length=255,
+        required=False,
+    )
+
+    def validate(self, data):
+        video = self.context['video']
+
+        if data['end'] <= data['start'] or data['end'] > video.duration:
+            error = {
+                'end': _("The end of the clip must be after its start and "
+                         "before the end of the video."),
+            }
+            raise serializers.ValidationError(error)
+
+        return data
+
+    def create(self, validated_data):
+        video = self.context['video']
+
+        clip = models.Video.objects.create(
+            owner=self.context['request'].user,
+            title=validated_data.get('title', video.title),
+            description=video.description,
+            width=video.width,
+            height=video.height,
+            size=0,
+            duration=validated_data['end'] - validated_data['start'],
+        )
+        clip.genres.set(video.genres.all())
+
+        jobs.enqueue(
+            'video.make_clip',
+            clip_id=clip.id,
+            video_id=video.id,
+            start=validated_data['start'],
+            end=validated_data['end'],
+        )
+
+        return clip
+
+
+class UploadSessionSerializer(serializers.ModelSerializer):
+    received = serializers.SerializerMethodField()
+    offset = serializers.SerializerMethodField()
+
+    def get_received(self, obj):
+        """
+        ranges of bytes [start, end[ already received
+        """
+        return uploads.merge_ranges(
+            (chunk.start, chunk.end) for chunk in obj.chunks.all()
+        )
+
+    def get_offset(self, obj):
+        """
+        number of bytes received from the start of the file
+        """
+        received = self.get_received(obj)
+        if received and received[0][0] == 0:
+            return received[0][1]
+        return 0
+
+    def validate_filename(self, value):
+        extension = os.path.splitext(value)[1][1:].lower()
+        if extension not in ['mp4', 'webm']:
+            raise serializers.ValidationError(
+                _("Only mp4 and webm videos are accepted.")
+            )
+        return value
+
+    def validate_size(self, value):
+        if value <= 0 or value > settings.CONSTANT['VIDEO']['SIZE']:
+            raise serializers.ValidationError(
+                _("Size of Video is not valide")
+            )
+        return value
+
+    def create(self, validated_data):
+        validated_data['owner'] = self.context['request'].user
+        session = super(UploadSessionSerializer, self).create(validated_data)
+
+        uploads.create_session_file(session)
+
+        return session
+
+    class Meta:
+        model = models.UploadSession
+        fields = (
+            'id',
+            'filename',
+            'size',
+            'is_created',
+            'received',
+            'offset',
+        )
+        read_only_fields = [
+            'id',
+            'is_created',
         ]
@@ -1,19 +1,43 @@
-from django.conf import settings
+from django.db import transaction
 from django.db.models.signals import pre_delete
 from django.dispatch import receiver
 
-from .models import Video
-from .functions import deleteEmptyRepository
+from apiNomad import jobs
+from .models import Video, UploadSession
+from .uploads import delete_session_file
 
 
 @receiver(pre_delete, sender=Video)
 def signal_file_delete_before_delete_video(sender, instance, **kwargs):
     """
-    deletes the video file before its data is deleted from the database
+    deletes the video files, by the worker, once its data is deleted from
+    the database: the job is enqueued when the deletion is committed, it
+    is never run for a deletion rolled back
 
     :param sender: reference model on which the function should be called
     :param instance: data deleted
     :param kwargs:
     :return:
     """
-    deleteEmptyRepository(settings.MEDIA_ROOT + '/' + instance.file.name)
+    arguments = {
+        'video_id': instance.id,
+        'file_name': instance.file.name,
+        'sha256': instance.sha256,
+        'media_source': instance.media_source,
+    }
+    transaction.on_commit(
+        lambda: jobs.enqueue('video.delete_files', **arguments)
+    )
+
+
+@receiver(pre_delete, sender=UploadSession)
+def signal_file_delete_before_delete_upload(sender, instance, **kwargs):
+    """
+    deletes the file of an upload session not completed
+
+    :param sender: reference model on which the function should be called
+    :param instance: data deleted
+    :param kwargs:
+    :return:
+    """
+    delete_session_file(instance)
@@ -0,0 +1,305 @@
+"""
+Responses of the media files with the support of the HTTP ranges.
+
+A player asks the part of the video it needs with a `Range` header: the
+response is a `206 Partial Content` of one range, or a
+`multipart/byteranges` of several ranges. `If-Range` makes sure the
+ranges are taken from the version of the file the player already has.
+
+The bytes don't go through Python when it can be avoided: the transfer is
+given to the front server (`X-Accel-Redirect`, `X-Sendfile`) when
+`MEDIA_SENDFILE` has a backend, else a whole file or a single range is
+given to the `wsgi.file_wrapper` of the server, which sends it with
+`os.sendfile`. Otherwise the file is sent by blocks, the memory used
+doesn't depend on the size of the file nor of the ranges.
+"""
+import mimetypes
+import os
+import re
+from urllib.parse import quote
+from uuid import uuid4
+
+from django.conf import settings
+from django.http import FileResponse, HttpResponse, StreamingHttpResponse
+from django.utils.http import http_date, parse_http_date_safe
+from rest_framework.negotiation import BaseContentNegotiation
+
+# Size of the blocks read from the file and sent to the client
+BLOCK_SIZE = 64 * 1024
+
+# Above this number of ranges the header is ignored and the whole file is
+# sent, as the RFC 7233 allows it
+MAX_RANGES = 32
+
+RANGE = re.compile(r'^\s*(\d*)\s*-\s*(\d*)\s*$')
+
+X_ACCEL_REDIRECT = 'x-accel-redirect'
+X_SENDFILE = 'x-sendfile'
+
+
+class RangeNotSatisfiable(ValueError):
+    """
+    Raised when none of the ranges asked is in the file.
+    """
+    pass
+
+
+class IgnoreClientContentNegotiation(BaseContentNegotiation):
+    """
+    The media are not rendered by DRF, the `Accept` header of the players
+    (`video/*`) must not be refused.
+    """
+    def select_parser(self, request, parsers):
+        return parsers[0]
+
+    def select_renderer(self, request, renderers, format_suffix=None):
+        return renderers[0], renderers[0].media_type
+
+
+def parse_range(header, size):
+    """
+    Read a `Range: bytes=...` header
+
+    :param header: value of the header
+    :param size: size of the file
+    :return: sorted list of (start, end) with end included, overlapping
+             ranges are merged. None if the header can't be read, then
+             the whole file is sent.
+    """
+    if not header or not header.startswith('bytes='):
+        return None
+
+    ranges = []
+    for spec in header[len('bytes='):].split(','):
+        match = RANGE.match(spec)
+        if match is None:
+            return None
+
+        first, last = match.groups()
+        if first:
+            start = int(first)
+            end = int(last) if last else size - 1
+            if last and end < start:
+                return None
+        elif last:
+            # suffix range: the last bytes of the file
+            if int(last) == 0:
+                continue
+            start = max(size - int(last), 0)
+            end = size - 1
+        else:
+            return None
+
+        if start < size:
+            ranges.append((start, min(end, size - 1)))
+
+    if len(ranges) > MAX_RANGES:
+        return None
+    if not ranges:
+        raise RangeNotSatisfiable()
+
+    merged = []
+    for start, end in sorted(ranges):
+        if merged and start <= merged[-1][1] + 1:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+
+    return merged
+
+
+def get_etag(stat, sha256=None):
+    """
+    Strong validator of a file: the hash of its content when it is known,
+    else its date of modification and its size
+    """
+    if sha256:
+        return '"{}"'.format(sha256)
+    return '"{:x}-{:x}"'.format(int(stat.st_mtime * 1000000), stat.st_size)
+
+
+def is_range_valid(request, etag, last_modified):
+    """
+    The ranges of a request are used only if its `If-Range` matches the
+    current version of the file
+    """
+    if_range = request.META.get('HTTP_IF_RANGE')
+    if not if_range:
+        return True
+    if if_range.startswith('"'):
+        return if_range == etag
+
+    return parse_http_date_safe(if_range) == int(last_modified)
+
+
+class RangeFile(object):
+    """
+    A file opened at the start of a range, which can't be read past its
+    end. The server can send it with `os.sendfile` from its `fileno()`
+    and the `Content-Length` of the response.
+    """
+    def __init__(self, path, start, end):
+        self.file = open(path, 'rb')
+        self.file.seek(start)
+        self.remaining = end - start + 1
+
+    def read(self, size=-1):
+        if size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.file.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def fileno(self):
+        return self.file.fileno()
+
+    def close(self):
+        self.file.close()
+
+
+def offload_file(path, content_type):
+    """
+    Response giving the transfer of a file to the front server, which
+    also answers the ranges
+
+    :return: HttpResponse, None if no front server is configured
+    """
+    backend = settings.MEDIA_SENDFILE['BACKEND']
+    if not backend:
+        return None
+
+    response = HttpResponse(content_type=content_type)
+    if backend.lower() == X_ACCEL_REDIRECT:
+        # nginx decodes the URI, the name of the file may have any
+        # character
+        response['X-Accel-Redirect'] = settings.MEDIA_SENDFILE['URL'] + \
+            quote(os.path.relpath(path, settings.MEDIA_ROOT))
+    elif backend.lower() == X_SENDFILE:
+        response['X-Sendfile'] = path
+    else:
+        raise ValueError(
+            'Unknown MEDIA_SENDFILE backend: {}'.format(backend)
+        )
+
+    return response
+
+
+def read_file(file, start, end):
+    """
+    Read the bytes [start, end] of an opened file by blocks
+    """
+    file.seek(start)
+    remaining = end - start + 1
+    while remaining > 0:
+        block = file.read(min(BLOCK_SIZE, remaining))
+        if not block:
+            break
+        remaining -= len(block)
+        yield block
+
+
+def read_ranges(path, parts, closing=b''):
+    """
+    Read the ranges of a file, each one preceded by its headers
+
+    :param parts: list of (headers, start, end)
+    :param closing: bytes sent after the last range
+    """
+    with open(path, 'rb') as file:
+        for headers, start, end in parts:
+            if headers:
+                yield headers
+            yield from read_file(file, start, end)
+    if closing:
+        yield closing
+
+
+def stream_file(request, path, sha256=None):
+    """
+    Response of a media file, whole or by ranges
+
+    :param request: request of the file
+    :param path: path of the file
+    :param sha256: hash of the content of the file if it is known
+    :return: HttpResponse
+    """
+    content_type = mimetypes.guess_type(path)[0] or \
+        'application/octet-stream'
+
+    response = offload_file(path, content_type)
+    if response is not None:
+        return response
+
+    stat = os.stat(path)
+    size = stat.st_size
+    etag = get_etag(stat, sha256)
+
+    if request.META.get('HTTP_IF_NONE_MATCH') == etag:
+        response = HttpResponse(status=304)
+        response['ETag'] = etag
+        return response
+
+    ranges = None
+    if is_range_valid(request, etag, stat.st_mtime):
+        try:
+            ranges = parse_range(request.META.get('HTTP_RANGE'), size)
+        except RangeNotSatisfiable:
+            response = HttpResponse(status=416)
+            response['Content-Range'] = 'bytes */{}'.format(size)
+            return response
+
+    closing = b''
+    if ranges is None:
+        parts = [(None, 0, size - 1)]
+        status = 200
+    elif len(ranges) == 1:
+        parts = [(None, ranges[0][0], ranges[0][1])]
+        status = 206
+    else:
+        boundary = uuid4().hex
+        parts = [
+            (
+                '\r\n--{}\r\nContent-Type: {}\r\n'
+                'Content-Range: bytes {}-{}/{}\r\n\r\n'.format(
+                    boundary, content_type, start, end, size
+                ).encode('ascii'),
+                start,
+                end,
+            )
+            for start, end in ranges
+        ]
+        closing = '\r\n--{}--\r\n'.format(boundary).encode('ascii')
+        status = 206
+
+    length = sum(
+        len(headers or b'') + end - start + 1
+        for headers, start, end in parts
+    ) + len(closing)
+    if closing:
+        content_type = 'multipart/byteranges; boundary={}'.format(boundary)
+
+    if len(parts) == 1:
+        response = FileResponse(
+            RangeFile(path, parts[0][1], parts[0][2]),
+            status=status,
+            content_type=content_type,
+        )
+        response.block_size = BLOCK_SIZE
+    else:
+        response = StreamingHttpResponse(
+            read_ranges(path, parts, closing),
+            status=status,
+            content_type=content_type,
+        )
+    response['Content-Length'] = str(length)
+    response['Accept-Ranges'] = 'bytes'
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(stat.st_mtime)
+    if status == 206 and len(parts) == 1:
+        response['Content-Range'] = 'bytes {}-{}/{}'.format(
+            parts[0][1],
+            parts[0][2],
+            size
+        )
+
+    return response
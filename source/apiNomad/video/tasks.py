@@ -0,0 +1,206 @@
+import logging
+import os
+
+from django.conf import settings
+from django.db.models import Q
+import ffmpeg
+
+from apiNomad import jobs
+from apiNomad.jobs import task
+from . import functions
+from .models import Rendition, UploadSession, Video
+
+logger = logging.getLogger(__name__)
+
+# Number of videos read by a job of the backfill of their informations
+BACKFILL_BATCH_SIZE = 100
+
+
+def save_status(rendition):
+    """
+    Save the status of a rendition, on the same rendition of the videos
+    of the same content sharing it too
+    """
+    rendition.save(update_fields=['status', 'error'])
+
+    Rendition.objects.filter(
+        video__media_source=rendition.video_id,
+        name=rendition.name,
+    ).update(status=rendition.status, error=rendition.error)
+
+
+@task('video.transcode_rendition')
+def transcode_rendition(rendition_id):
+    """
+    Cut a rendition in HLS segments, then add it to the master playlist
+    of its video
+    """
+    rendition = Rendition.objects.select_related('video').filter(
+        pk=rendition_id
+    ).first()
+
+    # the video was deleted in the meantime
+    if rendition is None:
+        return
+
+    rendition.status = Rendition.PROCESSING
+    save_status(rendition)
+
+    try:
+        functions.transcodeRendition(rendition)
+    except (ffmpeg.Error, OSError) as e:
+        rendition.status = Rendition.FAILED
+        rendition.error = getattr(e, 'stderr', None) or str(e)
+        if isinstance(rendition.error, bytes):
+            rendition.error = rendition.error.decode(errors='replace')
+        save_status(rendition)
+        raise
+
+    rendition.status = Rendition.READY
+    rendition.error = None
+    save_status(rendition)
+
+    functions.writeMasterPlaylist(rendition.video)
+
+
+@task('video.delete_files')
+def delete_files(video_id, file_name, sha256=None, media_source=None):
+    """
+    Delete the files of a deleted video: its renditions and its file, if
+    no other video of the same content uses them
+    """
+    folder_id = media_source or video_id
+    if not Video.objects.filter(
+            Q(pk=folder_id) | Q(media_source=folder_id)
+    ).exists():
+        functions.deleteRenditions(folder_id)
+
+    video = Video(id=video_id, file=file_name, sha256=sha256)
+    if sha256 and Video.objects.sharing_file(video).exists():
+        return
+
+    # the file of a clip is only known once it is cut
+    path = settings.MEDIA_ROOT + '/' + file_name
+    if file_name and os.path.isfile(path):
+        functions.deleteEmptyRepository(path)
+
+
+@task('video.make_previews')
+def make_previews(video_id):
+    """
+    Make the poster and the thumbnails of a video
+    """
+    video = Video.objects.filter(pk=video_id).first()
+
+    # the video was deleted in the meantime
+    if video is None:
+        return
+
+    functions.makePreviews(video)
+
+    Video.objects.filter(
+        Q(pk=video_id) | Q(media_source=video_id)
+    ).update(has_previews=True)
+
+
+@task('video.faststart')
+def faststart(video_id):
+    """
+    Remux a MP4 so it can be played while it is downloaded, then queue
+    the jobs reading it: its renditions, previews and keyframes are made
+    from the new file, never from the old one it deletes
+    """
+    video = Video.objects.filter(pk=video_id).first()
+
+    # the video was deleted in the meantime
+    if video is None:
+        return
+
+    if not video.is_faststart:
+        try:
+            functions.faststartVideo(video)
+        except ffmpeg.Error as e:
+            # a file ffmpeg can't remux is kept as it is
+            logger.warning(
+                'Faststart of the video %s failed: %s',
+                video_id,
+                e.stderr.decode(errors='replace') if e.stderr else e
+            )
+
+    functions.processFaststartVideo(video)
+
+
+@task('video.index_keyframes')
+def index_keyframes(video_id):
+    """
+    Save the keyframes of a video, read once from its container
+    """
+    video = Video.objects.filter(pk=video_id).first()
+
+    # the video was deleted in the meantime
+    if video is None:
+        return
+
+    functions.indexKeyframes(video)
+
+
+@task('video.make_clip')
+def make_clip(clip_id, video_id, start, end):
+    """
+    Cut the file of a clip from its video
+    """
+    clip = Video.objects.filter(pk=clip_id).first()
+    video = Video.objects.filter(pk=video_id).first()
+
+    # the clip or its video was deleted in the meantime
+    if clip is None:
+        return
+    if video is None:
+        clip.delete()
+        return
+
+    # a clip that can't be cut would stay without file
+    try:
+        functions.makeClip(clip, video, start, end)
+    except Exception:
+        clip.delete()
+        raise
+
+
+@task('video.purge_uploads')
+def purge_uploads():
+    """
+    Delete the upload sessions expired, with their file
+    """
+    UploadSession.objects.expired().delete()
+
+
+@task('video.backfill_informations')
+def backfill_informations(start=0):
+    """
+    Read again the codec, frame rate, audio and bitrate of the videos
+    saved before they were stored, by batches of videos: each job queues
+    the next batch, a batch interrupted is only read again
+    """
+    videos = list(
+        Video.objects.filter(pk__gt=start, codec='').order_by('pk')[
+            :BACKFILL_BATCH_SIZE
+        ]
+    )
+
+    for video in videos:
+        if not os.path.isfile(video.is_path_file):
+            continue
+
+        infos_video = functions.readInformationsVideo(video.is_path_file)
+        if not infos_video:
+            continue
+
+        infos_video['size'] = video.size
+        functions.setInformationsVideo(video, infos_video)
+        video.save(update_fields=[
+            'num_frame', 'codec', 'bitrate', 'fps', 'has_audio', 'rotation',
+        ])
+
+    if len(videos) == BACKFILL_BATCH_SIZE:
+        jobs.enqueue('video.backfill_informations', start=videos[-1].pk)
@@ -0,0 +1,212 @@
+"""
+Minimal MP4 and WebM files, only made of the headers read by
+video.containers, to test the videos without real media.
+"""
+import math
+import struct
+
+
+def box(box_type, *children):
+    payload = b''.join(children)
+    return struct.pack('>I4s', 8 + len(payload), box_type) + payload
+
+
+def full_box(box_type, *children):
+    return box(box_type, b'\x00\x00\x00\x00', *children)
+
+
+def build_mp4(width=1280, height=720, frames=50, delta=512,
+              timescale=12800, gop=25, sample_size=64, rotation=0):
+    # display matrix of the video track, in 16.16 fixed point
+    cos = int(round(math.cos(math.radians(rotation)))) << 16
+    sin = int(round(math.sin(math.radians(rotation)))) << 16
+    matrix = struct.pack(
+        '>9i',
+        cos, sin, 0,
+        -sin, cos, 0,
+        0, 0, 0x40000000
+    )
+
+    # the samples are in the mdat following the ftyp, by chunks of a GOP
+    chunks = (frames + gop - 1) // gop
+    chunk_offsets = [40 + chunk * gop * sample_size for chunk in range(chunks)]
+    sync_samples = list(range(1, frames + 1, gop))
+
+    video_track = box(
+        b'trak',
+        full_box(
+            b'tkhd',
+            struct.pack('>5I', 0, 0, 1, 0, frames * delta),
+            b'\x00' * 16,
+            matrix,
+            struct.pack('>II', width << 16, height << 16),
+        ),
+        box(
+            b'mdia',
+            full_box(
+                b'mdhd',
+                struct.pack('>4I', 0, 0, timescale, frames * delta),
+                b'\x00' * 4,
+            ),
+            full_box(b'hdlr', b'\x00' * 4, b'vide', b'\x00' * 13),
+            box(
+                b'minf',
+                box(
+                    b'stbl',
+                    full_box(
+                        b'stsd',
+                        struct.pack('>I', 1),
+                        box(
+                            b'avc1',
+                            b'\x00' * 6 + struct.pack('>H', 1),
+                            b'\x00' * 16,
+                            struct.pack('>HH', width, height),
+                            b'\x00' * 50,
+                        ),
+                    ),
+                    full_box(
+                        b'stts',
+                        struct.pack('>III', 1, frames, delta),
+                    ),
+                    full_box(
+                        b'stss',
+                        struct.pack(
+                            '>{0}I'.format(len(sync_samples) + 1),
+                            len(sync_samples),
+                            *sync_samples
+                        ),
+                    ),
+                    full_box(
+                        b'stsc',
+                        struct.pack('>4I', 1, 1, gop, 1),
+                    ),
+                    full_box(
+                        b'stsz',
+                        struct.pack('>II', sample_size, frames),
+                    ),
+                    full_box(
+                        b'stco',
+                        struct.pack(
+                            '>{0}I'.format(chunks + 1),
+                            chunks,
+                            *chunk_offsets
+                        ),
+                    ),
+                ),
+            ),
+        ),
+    )
+    audio_track = box(
+        b'trak',
+        box(
+            b'mdia',
+            full_box(
+                b'mdhd',
+                struct.pack('>4I', 0, 0, 44100, 44100),
+                b'\x00' * 4,
+            ),
+            full_box(b'hdlr', b'\x00' * 4, b'soun', b'\x00' * 13),
+        ),
+    )
+
+    return b''.join([
+        box(b'ftyp', b'isom', b'\x00\x00\x02\x00', b'isomiso2avc1mp41'),
+        box(b'mdat', b'\x00' * max(4096, frames * sample_size)),
+        box(
+            b'moov',
+            full_box(b'mvhd', struct.pack('>4I', 0, 0, 1000, 2000)),
+            video_track,
+            audio_track,
+        ),
+    ])
+
+
+def element(element_id, *children):
+    payload = b''.join(children)
+    return element_id + b'\x01' + len(payload).to_bytes(7, 'big') + payload
+
+
+def uint(element_id, value, size=4):
+    return element(element_id, value.to_bytes(size, 'big'))
+
+
+def seek_head(cues_position):
+    return element(
+        b'\x11\x4d\x9b\x74',
+        element(
+            b'\x4d\xbb',
+            element(b'\x53\xab', b'\x1c\x53\xbb\x6b'),
+            uint(b'\x53\xac', cues_position),
+        ),
+    )
+
+
+def build_webm(width=1280, height=720, duration=2000.0,
+               default_duration=40000000, live=False, cues=False):
+    info = [uint(b'\x2a\xd7\xb1', 1000000)]
+    if duration is not None:
+        info.append(element(b'\x44\x89', struct.pack('>d', duration)))
+
+    video = [
+        uint(b'\xd7', 1, 1),
+        uint(b'\x83', 1, 1),
+        element(b'\x86', b'V_VP9'),
+        element(b'\xe0', uint(b'\xb0', width, 2), uint(b'\xba', height, 2)),
+    ]
+    if default_duration is not None:
+        video.append(uint(b'\x23\xe3\x83', default_duration))
+
+    # a keyframe starts each cluster
+    clusters = []
+    for cluster in range(2):
+        blocks = [uint(b'\xe7', cluster * 1000, 2)]
+        for frame in range(25):
+            header = b'\x81' + struct.pack(
+                '>hB',
+                frame * 40,
+                0x80 if frame == 0 else 0
+            )
+            blocks.append(element(b'\xa3', header, b'\x00' * 16))
+        clusters.append(element(b'\x1f\x43\xb6\x75', *blocks))
+
+    children = [
+        element(b'\x15\x49\xa9\x66', *info),
+        element(b'\x16\x54\xae\x6b', element(b'\xae', *video)),
+    ] + clusters
+
+    if cues:
+        # Cues after the clusters, found with a SeekHead at the start of
+        # the segment. Its size doesn't depend on the positions.
+        seek_head_size = len(seek_head(0))
+        positions = []
+        position = seek_head_size
+        for child in children:
+            positions.append(position)
+            position += len(child)
+        children.append(element(b'\x1c\x53\xbb\x6b', *[
+            element(
+                b'\xbb',
+                uint(b'\xb3', cluster * 1000),
+                element(
+                    b'\xb7',
+                    uint(b'\xf7', 1, 1),
+                    uint(b'\xf1', positions[2 + cluster]),
+                ),
+            )
+            for cluster in range(len(clusters))
+        ]))
+        children.insert(0, seek_head(position))
+
+    segment = b''.join(children)
+
+    if live:
+        # a segment of unknown size
+        segment = b'\x18\x53\x80\x67\x01\xff\xff\xff\xff\xff\xff\xff' + \
+            segment
+    else:
+        segment = element(b'\x18\x53\x80\x67', segment)
+
+    return element(
+        b'\x1a\x45\xdf\xa3',
+        element(b'\x42\x82', b'webm'),
+    ) + segment
@@ -0,0 +1,211 @@
+from unittest import mock
+
+from django.core.files.uploadedfile import TemporaryUploadedFile
+from django.test import SimpleTestCase
+
+from video import containers, functions
+from video.tests.samples import build_mp4, build_webm
+
+
+class ContainersTests(SimpleTestCase):
+
+    def upload(self, data, name='video.mp4'):
+        file = TemporaryUploadedFile(name, 'video/mp4', len(data), None)
+        file.write(data)
+        file.flush()
+        self.addCleanup(file.close)
+        return file
+
+    def test_sniff_container(self):
+        """
+        Ensure the container is recognized from the first bytes
+        """
+        self.assertEqual(
+            containers.sniff_container(build_mp4()[:12]),
+            containers.MP4
+        )
+        self.assertEqual(
+            containers.sniff_container(build_webm()[:12]),
+            containers.WEBM
+        )
+        self.assertEqual(
+            containers.sniff_container(b'<html><body>'),
+            None
+        )
+
+    def test_parse_mp4(self):
+        """
+        Ensure we read the video track of a MP4 with moov after mdat
+        """
+        file = self.upload(build_mp4())
+
+        infos = containers.parse_container(file.temporary_file_path())
+
+        self.assertEqual(infos['container'], containers.MP4)
+        self.assertEqual(infos['width'], 1280)
+        self.assertEqual(infos['height'], 720)
+        self.assertEqual(infos['duration'], 2.0)
+        self.assertEqual(infos['num_frame'], 50)
+        self.assertEqual(infos['codec'], 'h264')
+        self.assertEqual(infos['fps'], 25)
+        self.assertTrue(infos['has_audio'])
+        self.assertEqual(infos['rotation'], 0)
+
+        file = self.upload(build_mp4(rotation=90))
+        infos = containers.parse_container(file.temporary_file_path())
+        self.assertEqual(infos['rotation'], 90)
+
+    def test_parse_webm(self):
+        """
+        Ensure we read the video track of a WebM from its headers
+        """
+        file = self.upload(build_webm(), 'video.webm')
+
+        infos = containers.parse_container(file.temporary_file_path())
+
+        self.assertEqual(infos['container'], containers.WEBM)
+        self.assertEqual(infos['width'], 1280)
+        self.assertEqual(infos['height'], 720)
+        self.assertEqual(infos['duration'], 2.0)
+        self.assertEqual(infos['num_frame'], 50)
+        self.assertEqual(infos['codec'], 'vp9')
+        self.assertEqual(infos['fps'], 25)
+        self.assertFalse(infos['has_audio'])
+
+    def test_parse_webm_recorded_live(self):
+        """
+        Ensure we read a WebM without duration in its headers
+        """
+        file = self.upload(
+            build_webm(duration=None, default_duration=None, live=True),
+            'video.webm'
+        )
+
+        infos = containers.parse_container(file.temporary_file_path())
+
+        self.assertEqual(infos['num_frame'], 50)
+        self.assertAlmostEqual(infos['duration'], 2.0, places=2)
+
+    def test_parse_not_a_video(self):
+        """
+        Ensure a file that is not a MP4 or a WebM is refused
+        """
+        file = self.upload(b'<html><body></body></html>')
+
+        with self.assertRaises(containers.ContainerError):
+            containers.parse_container(file.temporary_file_path())
+
+        file = self.upload(build_mp4()[:2000])
+
+        with self.assertRaises(containers.ContainerError):
+            containers.parse_container(file.temporary_file_path())
+
+    def test_is_faststart(self):
+        """
+        Ensure a MP4 with moov after mdat is detected
+        """
+        data = build_mp4()
+        file = self.upload(data)
+        self.assertFalse(containers.is_faststart(file.temporary_file_path()))
+
+        # ftyp, moov, then mdat
+        mdat = data[32:32 + 4096 + 8]
+        file = self.upload(data[:32] + data[32 + len(mdat):] + mdat)
+        self.assertTrue(containers.is_faststart(file.temporary_file_path()))
+
+        file = self.upload(build_webm(), 'video.webm')
+        self.assertTrue(containers.is_faststart(file.temporary_file_path()))
+
+    def test_parse_mp4_keyframes(self):
+        """
+        Ensure we read the keyframes of a MP4 from its sample tables
+        """
+        file = self.upload(build_mp4(frames=60, gop=25))
+
+        keyframes = containers.parse_keyframes(file.temporary_file_path())
+
+        # 25 frames of 64 bytes by chunk, the media data starts at 40
+        self.assertEqual(keyframes, [(0.0, 40), (1.0, 1640), (2.0, 3240)])
+
+    def test_parse_webm_keyframes(self):
+        """
+        Ensure we read the keyframes of a WebM from its cues, else from
+        its blocks
+        """
+        for data in [build_webm(cues=True), build_webm(live=True)]:
+            file = self.upload(data, 'video.webm')
+
+            keyframes = containers.parse_keyframes(
+                file.temporary_file_path()
+            )
+
+            self.assertEqual([time for time, offset in keyframes], [0, 1])
+            for time, offset in keyframes:
+                # a keyframe can be read from the start of its cluster
+                self.assertEqual(data[offset:offset + 4], b'\x1f\x43\xb6\x75')
+
+    @mock.patch('ffmpeg.probe')
+    def test_keyframes_fallback_on_ffprobe(self, probe):
+        """
+        Ensure ffprobe reads the keyframes the parser can't read
+        """
+        probe.return_value = {
+            'packets': [
+                {'pts_time': '0.000000', 'pos': '48', 'flags': 'K_'},
+                {'pts_time': '0.040000', 'pos': '900', 'flags': '__'},
+                {'pts_time': '2.000000', 'pos': '5000', 'flags': 'K_'},
+            ],
+        }
+        file = self.upload(b'\x00' * 64, 'video.mp4')
+
+        keyframes = functions.getKeyframes(file.temporary_file_path())
+
+        self.assertEqual(keyframes, [(0.0, 48), (2.0, 5000)])
+
+    @mock.patch('ffmpeg.probe')
+    def test_informations_video_without_ffprobe(self, probe):
+        """
+        Ensure ffprobe is not started for a video the parser can read
+        """
+        data = build_mp4()
+        file = self.upload(data)
+
+        infos = functions.getInformationsVideo(file)
+
+        probe.assert_not_called()
+        self.assertEqual(infos['width'], 1280)
+        self.assertEqual(infos['height'], 720)
+        self.assertEqual(infos['size'], len(data))
+
+    @mock.patch('ffmpeg.probe')
+    def test_informations_video_fallback_on_ffprobe(self, probe):
+        """
+        Ensure ffprobe reads the videos the parser can't read
+        """
+        probe.return_value = {
+            'streams': [{
+                'codec_type': 'video',
+                'codec_name': 'h264',
+                'width': 1920,
+                'height': 1080,
+                'duration': '10.0',
+                'nb_frames': '250',
+                'avg_frame_rate': '25/1',
+                'side_data_list': [{'rotation': -90}],
+            }, {
+                'codec_type': 'audio',
+            }],
+            'format': {},
+        }
+        file = self.upload(b'\x00' * 64, 'video.mp4')
+
+        infos = functions.getInformationsVideo(file)
+
+        probe.assert_called_once_with(file.temporary_file_path())
+        self.assertEqual(infos['width'], 1920)
+        self.assertEqual(infos['num_frame'], 250)
+        self.assertEqual(infos['codec'], 'h264')
+        self.assertEqual(infos['fps'], 25)
+        self.assertTrue(infos['has_audio'])
+        self.assertEqual(infos['rotation'], 90)
+        self.assertEqual(infos['size'], 64)
@@ -1,12 +1,13 @@
 import os
 import mock
 from django.core.files import File
+from django.utils import timezone
 
 from rest_framework.test \
     import APIClient, APITransactionTestCase
 
 from apiNomad.factories import UserFactory, AdminFactory
-from video.models import Video
+from video.models import KeyframeIndex, Video
 
 
 class EventTests(APITransactionTestCase):
@@ -52,3 +53,66 @@ class EventTests(APITransactionTestCase):
         self.assertEqual(video.width, 720)
         self.assertEqual(video.height, 1080)
         self.assertEqual(video.size, 20000)
+
+    def test_state_follow_dates(self):
+        """
+        Ensure the state of a video is kept in sync with is_deleted and
+        is_actived when it is saved
+        """
+        path_video = 'media/upload/2019/01/15/video.mp4'
+
+        video = Video.objects.create(
+            owner=self.user,
+            title=self.TITLE,
+            file=path_video,
+            duration=100000,
+            width=720,
+            height=1080,
+            size=20000,
+        )
+
+        self.assertEqual(video.state, Video.INACTIVE)
+
+        video.is_actived = timezone.now()
+        video.save()
+        self.assertEqual(video.state, Video.ACTIVE)
+        self.assertTrue(video.is_active)
+
+        video.is_deleted = timezone.now()
+        video.save()
+        self.assertEqual(video.state, Video.DELETED)
+        self.assertFalse(video.is_active)
+        self.assertTrue(video.is_delete)
+
+        self.assertEqual(
+            Video.objects.get(pk=video.pk).state,
+            Video.DELETED
+        )
+
+    def test_keyframe_index(self):
+        """
+        Ensure the keyframes are saved packed and found by time
+        """
+        video = Video.objects.create(
+            owner=self.user,
+            title=self.TITLE,
+            file='media/upload/2019/01/15/video.mp4',
+            duration=10,
+            width=720,
+            height=1080,
+            size=20000,
+        )
+
+        index = KeyframeIndex(video=video)
+        index.set_keyframes([(0.0, 48), (2.0, 5000), (4.0, 2 ** 40)])
+        index.save()
+
+        index = KeyframeIndex.objects.get(video=video)
+        self.assertEqual(len(index.times), 3 * 8)
+        self.assertEqual(index.find(0), (0.0, 48))
+        self.assertEqual(index.find(3.9), (2.0, 5000))
+        self.assertEqual(index.find(4), (4.0, 2 ** 40))
+        self.assertEqual(index.find(100), (4.0, 2 ** 40))
+
+        index.set_keyframes([])
+        self.assertIsNone(index.find(1))
@@ -0,0 +1,523 @@
+import json
+import os
+import shutil
+import subprocess
+import tempfile
+from io import StringIO
+from unittest import mock, skipUnless
+
+from django.conf import settings
+from django.core.management import call_command
+from django.test import TestCase
+from django.test.utils import override_settings
+import ffmpeg
+
+from apiNomad.factories import AdminFactory
+from apiNomad.jobs import run_job
+from apiNomad.models import Job
+from video import containers, functions
+from video.models import KeyframeIndex, Rendition, Video, content_path
+from video.tests.samples import build_mp4
+
+
+class VideoTasksTests(TestCase):
+
+    def setUp(self):
+        self.admin = AdminFactory()
+
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+
+        settings_media = override_settings(MEDIA_ROOT=media_root)
+        settings_media.enable()
+        self.addCleanup(settings_media.disable)
+
+        self.video = Video.objects.create(
+            title='video test 1',
+            owner=self.admin,
+            duration=2,
+            width=1280,
+            height=720,
+            file='uploads/videos/video.mp4',
+            size=1000,
+        )
+
+    def make_video_file(self):
+        path = self.video.is_path_file
+        os.makedirs(os.path.dirname(path))
+        subprocess.run(
+            ['ffmpeg', '-v', 'error', '-f', 'lavfi', '-i',
+             'testsrc=duration=2:size=1280x720:rate=25', path],
+            check=True
+        )
+
+    def test_rendition_ladder(self):
+        """
+        Ensure a video is never upscaled and keeps its aspect ratio.
+        """
+        ladder = functions.getRenditionLadder(1280, 720)
+
+        self.assertEqual(
+            [(rung['name'], rung['width'], rung['height'])
+             for rung in ladder],
+            [('720p', 1280, 720), ('480p', 854, 480), ('240p', 426, 240)]
+        )
+
+    def test_create_renditions(self):
+        """
+        Ensure a job is queued for each rendition of a new video.
+        """
+        renditions = functions.createRenditions(self.video)
+
+        self.assertEqual(
+            sorted(json.loads(job.arguments)['rendition_id']
+                   for job in Job.objects.filter(
+                       name='video.transcode_rendition'
+                   )),
+            sorted(rendition.id for rendition in renditions)
+        )
+
+    @mock.patch('video.functions.transcodeRendition')
+    def test_transcode_renditions(self, transcode):
+        """
+        Ensure the worker transcodes all the renditions and writes the
+        master playlist.
+        """
+        functions.createRenditions(self.video)
+
+        call_command('run_worker', once=True, threads=1, stdout=StringIO())
+
+        self.assertEqual(transcode.call_count, 3)
+        self.assertEqual(
+            Rendition.objects.filter(status=Rendition.READY).count(),
+            3
+        )
+
+        with open(os.path.join(settings.MEDIA_ROOT,
+                               self.video.renditions_path,
+                               'master.m3u8')) as file:
+            playlist = file.read().splitlines()
+
+        self.assertEqual(playlist[0], '#EXTM3U')
+        self.assertEqual(
+            playlist[2],
+            '#EXT-X-STREAM-INF:BANDWIDTH=2928000,RESOLUTION=1280x720'
+        )
+        self.assertEqual(playlist[3], '720p/index.m3u8')
+        self.assertEqual(len(playlist), 8)
+
+    @mock.patch('video.functions.transcodeRendition')
+    def test_transcode_rendition_error(self, transcode):
+        """
+        Ensure a rendition ffmpeg can't make is kept with its error, and
+        its job is tried again later.
+        """
+        transcode.side_effect = ffmpeg.Error('ffmpeg', b'', b'Invalid data')
+        functions.createRenditions(self.video)
+
+        call_command('run_worker', once=True, threads=1, stderr=StringIO())
+
+        self.assertEqual(
+            set(Rendition.objects.values_list('status', 'error')),
+            {(Rendition.FAILED, 'Invalid data')}
+        )
+        self.assertEqual(
+            set(Job.objects.values_list('status', 'attempts')),
+            {(Job.PENDING, 1)}
+        )
+
+    def test_delete_files(self):
+        """
+        Ensure the files of a video are deleted by the worker once the
+        video is deleted.
+        """
+        path = self.video.is_path_file
+        os.makedirs(os.path.dirname(path))
+        open(path, 'wb').close()
+
+        rendition_folder = os.path.join(
+            settings.MEDIA_ROOT,
+            self.video.renditions_path
+        )
+        os.makedirs(rendition_folder)
+
+        # the job is enqueued when the deletion is committed, never in
+        # the transaction of the tests
+        Video.objects.create(
+            title='video test 2',
+            owner=self.admin,
+            duration=2,
+            width=1280,
+            height=720,
+            size=0,
+        ).delete()
+        self.assertFalse(Job.objects.filter(name='video.delete_files'))
+
+        with mock.patch(
+                'django.db.transaction.on_commit',
+                side_effect=lambda func: func()):
+            self.video.delete()
+        self.assertTrue(os.path.exists(path))
+
+        call_command('run_worker', once=True, threads=1, stdout=StringIO())
+
+        self.assertFalse(os.path.exists(path))
+        self.assertFalse(os.path.exists(rendition_folder))
+
+    def test_delete_files_shared(self):
+        """
+        Ensure the renditions shared by the videos of the same content are
+        deleted with the last of them.
+        """
+        rendition_folder = os.path.join(
+            settings.MEDIA_ROOT,
+            self.video.renditions_path
+        )
+        os.makedirs(rendition_folder)
+
+        copy = Video.objects.create(
+            title='video test 2',
+            owner=self.admin,
+            duration=2,
+            width=1280,
+            height=720,
+            size=0,
+            media_source=self.video.id,
+        )
+
+        with mock.patch(
+                'django.db.transaction.on_commit',
+                side_effect=lambda func: func()):
+            self.video.delete()
+            call_command('run_worker', once=True, threads=1,
+                         stdout=StringIO())
+            self.assertTrue(os.path.exists(rendition_folder))
+
+            copy.delete()
+            call_command('run_worker', once=True, threads=1,
+                         stdout=StringIO())
+        self.assertFalse(os.path.exists(rendition_folder))
+
+    @skipUnless(shutil.which('ffmpeg'), 'ffmpeg is not installed')
+    def test_transcode_rendition_with_ffmpeg(self):
+        """
+        Ensure a rendition is cut in HLS segments.
+        """
+        self.make_video_file()
+
+        functions.createRenditions(self.video)
+        rendition = self.video.renditions.get(name='240p')
+
+        functions.transcodeRendition(rendition)
+
+        folder = os.path.join(settings.MEDIA_ROOT, rendition.path)
+        self.assertTrue(os.path.exists(os.path.join(folder, 'index.m3u8')))
+        self.assertTrue(
+            os.path.exists(os.path.join(folder, 'segment_00000.ts'))
+        )
+
+    def test_previews_layout(self):
+        """
+        Ensure a long video has at most MAX_THUMBNAILS thumbnails, and
+        they are indexed in the WebVTT file.
+        """
+        self.video.duration = 1000
+
+        layout = functions.getPreviewsLayout(self.video)
+
+        self.assertEqual(layout['interval'], 10)
+        self.assertEqual(layout['count'], 100)
+        self.assertEqual((layout['width'], layout['height']), (160, 90))
+        self.assertEqual((layout['columns'], layout['rows']), (10, 10))
+
+        path = os.path.join(settings.MEDIA_ROOT, 'thumbnails.vtt')
+        functions.writeThumbnailsVtt(path, layout, self.video.duration)
+
+        with open(path) as file:
+            lines = file.read().splitlines()
+
+        self.assertEqual(lines[0], 'WEBVTT')
+        self.assertEqual(lines[2], '00:00:00.000 --> 00:00:10.000')
+        self.assertEqual(lines[3], 'sprite.jpg#xywh=0,0,160,90')
+        self.assertEqual(lines[-2], '00:16:30.000 --> 00:16:40.000')
+        self.assertEqual(lines[-1], 'sprite.jpg#xywh=1440,810,160,90')
+
+    @mock.patch('video.functions.makePreviews')
+    def test_make_previews(self, make_previews):
+        """
+        Ensure the previews of a new video are made by the worker.
+        """
+        functions.jobs.enqueue('video.make_previews', video_id=self.video.id)
+
+        call_command('run_worker', once=True, threads=1, stdout=StringIO())
+
+        self.assertEqual(make_previews.call_count, 1)
+        self.video.refresh_from_db()
+        self.assertTrue(self.video.has_previews)
+
+    @skipUnless(shutil.which('ffmpeg'), 'ffmpeg is not installed')
+    def test_make_previews_with_ffmpeg(self):
+        """
+        Ensure the poster and the sprite of a video are made.
+        """
+        self.make_video_file()
+
+        functions.makePreviews(self.video)
+
+        folder = os.path.join(settings.MEDIA_ROOT, self.video.renditions_path)
+        for name in ['poster.jpg', 'sprite.jpg', 'thumbnails.vtt']:
+            self.assertTrue(os.path.exists(os.path.join(folder, name)))
+
+    @mock.patch('video.functions.makePreviews')
+    @mock.patch('video.functions.transcodeRendition')
+    def test_index_keyframes(self, transcode_rendition, make_previews):
+        """
+        Ensure the keyframes of a new video are indexed by the worker.
+        """
+        os.makedirs(os.path.dirname(self.video.is_path_file))
+        with open(self.video.is_path_file, 'wb') as file:
+            file.write(build_mp4())
+        Video.objects.filter(pk=self.video.pk).update(is_faststart=True)
+
+        functions.processNewVideo(self.video)
+
+        call_command('run_worker', once=True, threads=1, stdout=StringIO())
+
+        index = KeyframeIndex.objects.get(video=self.video)
+        self.assertEqual(index.count, 2)
+        self.assertEqual(index.find(1.5), (1.0, 1640))
+
+    @skipUnless(shutil.which('ffmpeg'), 'ffmpeg is not installed')
+    def test_make_clip_with_ffmpeg(self):
+        """
+        Ensure a clip is copied from a keyframe, or reencoded when the
+        keyframe is too far from its start.
+        """
+        self.make_video_file()
+        clip = Video.objects.create(
+            title='clip',
+            owner=self.admin,
+            duration=1,
+            width=1280,
+            height=720,
+            size=0,
+        )
+
+        functions.makeClip(clip, self.video, 0.5, 1.5)
+
+        # copied from the keyframe at the start of the video
+        clip.refresh_from_db()
+        self.assertTrue(os.path.isfile(clip.is_path_file))
+        self.assertEqual(clip.file.name, content_path(clip.sha256, 'mp4'))
+        self.assertAlmostEqual(clip.duration, 1.5, delta=0.2)
+        self.assertEqual(clip.width, 1280)
+        self.assertTrue(
+            Job.objects.filter(name='video.faststart').exists()
+        )
+
+        clip.pk = None
+        clip.save()
+        with self.settings(CONSTANT=dict(settings.CONSTANT, VIDEO=dict(
+                settings.CONSTANT['VIDEO'],
+                CLIP={'MAX_KEYFRAME_SHIFT': 0}))):
+            functions.makeClip(clip, self.video, 0.5, 1.5)
+
+        clip.refresh_from_db()
+        self.assertAlmostEqual(clip.duration, 1.0, delta=0.2)
+
+    def test_make_clip_of_deleted_video(self):
+        """
+        Ensure the clip of a video deleted in the meantime is deleted.
+        """
+        clip = Video.objects.create(
+            title='clip',
+            owner=self.admin,
+            duration=1,
+            width=1280,
+            height=720,
+            size=0,
+        )
+        functions.jobs.enqueue(
+            'video.make_clip',
+            clip_id=clip.id,
+            video_id=self.video.id,
+            start=0,
+            end=1,
+        )
+        self.video.delete()
+        Job.objects.exclude(name='video.make_clip').delete()
+
+        call_command('run_worker', once=True, threads=1, stdout=StringIO())
+
+        self.assertFalse(Video.objects.filter(pk=clip.id).exists())
+
+    def test_make_clip_failure(self):
+        """
+        Ensure a clip that can't be cut is deleted, and the job failed.
+        """
+        clip = Video.objects.create(
+            title='clip',
+            owner=self.admin,
+            duration=1,
+            width=1280,
+            height=720,
+            size=0,
+        )
+        job = functions.jobs.enqueue(
+            'video.make_clip',
+            clip_id=clip.id,
+            video_id=self.video.id,
+            start=0,
+            end=1,
+        )
+
+        with mock.patch.object(
+                functions,
+                'makeClip',
+                side_effect=OSError('No such file')):
+            self.assertFalse(run_job(job))
+
+        self.assertIn('No such file', job.error)
+        self.assertFalse(Video.objects.filter(pk=clip.id).exists())
+
+    @skipUnless(shutil.which('ffmpeg'), 'ffmpeg is not installed')
+    def test_faststart_with_ffmpeg(self):
+        """
+        Ensure the moov box of a MP4 is moved before its media data, for
+        all the videos using the file, and only once.
+        """
+        path = self.video.is_path_file
+        os.makedirs(os.path.dirname(path))
+        subprocess.run(
+            ['ffmpeg', '-v', 'error', '-f', 'lavfi', '-i',
+             'testsrc=duration=2:size=1280x720:rate=25', path],
+            check=True
+        )
+        self.assertFalse(containers.is_faststart(path))
+        same_file = Video.objects.create(
+            title='video test 2',
+            owner=self.admin,
+            duration=2,
+            width=1280,
+            height=720,
+            file=self.video.file.name,
+            size=1000,
+        )
+
+        self.assertTrue(functions.faststartVideo(self.video))
+
+        self.assertFalse(os.path.exists(path))
+        self.assertTrue(containers.is_faststart(self.video.is_path_file))
+        for video in [self.video, same_file]:
+            video.refresh_from_db()
+            self.assertTrue(video.is_faststart)
+            self.assertEqual(
+                video.file.name,
+                content_path(video.sha256, 'mp4')
+            )
+            self.assertEqual(
+                video.size,
+                os.path.getsize(video.is_path_file)
+            )
+
+        self.assertFalse(functions.faststartVideo(self.video))
+
+    @mock.patch('video.functions.faststartVideo')
+    def test_faststart_skips_optimized_video(self, faststart_video):
+        """
+        Ensure a video already faststart is not read again, and its
+        keyframes are indexed after.
+        """
+        Video.objects.filter(pk=self.video.pk).update(is_faststart=True)
+        functions.jobs.enqueue('video.faststart', video_id=self.video.id)
+
+        call_command('run_worker', once=True, threads=1, stdout=StringIO())
+
+        faststart_video.assert_not_called()
+        self.assertTrue(
+            Job.objects.filter(name='video.index_keyframes').exists()
+        )
+
+    @mock.patch('video.functions.makePreviews')
+    @mock.patch('video.functions.transcodeRendition')
+    def test_faststart_before_other_jobs(self, transcode_rendition,
+                                         make_previews):
+        """
+        Ensure the renditions and previews of a new video are queued once
+        its file is remuxed, they never read the file it deletes.
+        """
+        functions.processNewVideo(self.video)
+        self.assertEqual(
+            list(Job.objects.values_list('name', flat=True)),
+            ['video.faststart']
+        )
+        self.assertFalse(self.video.renditions.exists())
+
+        def faststart_video(video):
+            # the renditions and previews are not queued yet
+            self.assertEqual(
+                Job.objects.exclude(name='video.faststart').count(),
+                0
+            )
+            Video.objects.filter(pk=video.pk).update(
+                file='uploads/videos/remuxed.mp4'
+            )
+            video.file = 'uploads/videos/remuxed.mp4'
+            return True
+
+        with mock.patch('video.functions.faststartVideo',
+                        side_effect=faststart_video):
+            call_command('run_worker', once=True, threads=1,
+                         stdout=StringIO())
+
+        self.assertTrue(self.video.renditions.exists())
+        for rendition in transcode_rendition.call_args_list:
+            self.assertEqual(
+                rendition[0][0].video.file.name,
+                'uploads/videos/remuxed.mp4'
+            )
+        self.assertEqual(make_previews.call_count, 1)
+        self.assertEqual(
+            make_previews.call_args[0][0].file.name,
+            'uploads/videos/remuxed.mp4'
+        )
+
+    @mock.patch('video.tasks.BACKFILL_BATCH_SIZE', 1)
+    def test_backfill_informations(self):
+        """
+        Ensure the informations of the videos saved before they were
+        stored are read again, by batches queued one after the other.
+        """
+        path = self.video.is_path_file
+        os.makedirs(os.path.dirname(path))
+        with open(path, 'wb') as file:
+            file.write(build_mp4())
+
+        # a clip not cut yet has no file to read
+        clip = Video.objects.create(
+            title='video test 2',
+            owner=self.admin,
+            duration=2,
+            width=1280,
+            height=720,
+            size=0,
+        )
+
+        call_command('backfill_informations', stdout=StringIO())
+        call_command('run_worker', once=True, threads=1, stdout=StringIO())
+
+        self.video.refresh_from_db()
+        self.assertEqual(self.video.codec, 'h264')
+        self.assertEqual(self.video.fps, 25.0)
+        self.assertTrue(self.video.has_audio)
+        self.assertEqual(self.video.bitrate, 4000)
+
+        self.assertEqual(
+            Job.objects.filter(
+                name='video.backfill_informations',
+                status=Job.DONE,
+            ).count(),
+            3
+        )
+        clip.refresh_from_db()
+        self.assertEqual(clip.codec, '')
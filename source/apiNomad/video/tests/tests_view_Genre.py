@@ -0,0 +1,43 @@
+import json
+
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient, APITestCase
+
+from apiNomad.factories import UserFactory
+from video.models import Genre
+
+
+class GenresTests(APITestCase):
+
+    def setUp(self):
+        self.client = APIClient()
+
+        self.user = UserFactory()
+        self.user.set_password('Test123!')
+        self.user.save()
+
+        for index in range(10):
+            Genre.objects.create(
+                label='genre_{0}'.format(index),
+                description='description genre_{0}'.format(index),
+            )
+
+    def test_list_genres(self):
+        """
+        Ensure we can list all genres in a fixed number of queries.
+        """
+        self.client.force_authenticate(user=self.user)
+
+        # count, genres
+        with self.assertNumQueries(2):
+            response = self.client.get(
+                reverse('video:genre'),
+                format='json',
+            )
+
+        content = json.loads(response.content)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(content['count'], Genre.objects.count())
@@ -0,0 +1,280 @@
+import json
+import os
+import shutil
+import tempfile
+from io import StringIO
+
+from django.core.management import call_command
+from django.urls import reverse
+from django.test.utils import override_settings
+from django.utils import timezone
+
+from rest_framework import status
+from rest_framework.test import APIClient, APITestCase
+
+from apiNomad.factories import AdminFactory, UserFactory
+from video.models import UploadSession, Video
+from video.tests.samples import build_mp4
+
+
+class UploadsTests(APITestCase):
+
+    def setUp(self):
+        self.client = APIClient()
+
+        self.user = UserFactory()
+        self.user.set_password('Test123!')
+        self.user.save()
+
+        self.admin = AdminFactory()
+        self.admin.set_password('Test123!')
+        self.admin.save()
+
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+
+        settings_media = override_settings(MEDIA_ROOT=media_root)
+        settings_media.enable()
+        self.addCleanup(settings_media.disable)
+
+        self.video_data = build_mp4()
+
+    def create_session(self):
+        self.client.force_authenticate(user=self.admin)
+
+        response = self.client.post(
+            reverse('video:uploads'),
+            {
+                'filename': 'video.mp4',
+                'size': len(self.video_data),
+            },
+            format='json',
+        )
+        return json.loads(response.content)
+
+    def put_chunk(self, session_id, start, end):
+        return self.client.put(
+            reverse('video:uploads_id', kwargs={'pk': session_id}),
+            self.video_data[start:end],
+            content_type='application/octet-stream',
+            HTTP_CONTENT_RANGE='bytes {0}-{1}/{2}'.format(
+                start,
+                end - 1,
+                len(self.video_data),
+            ),
+        )
+
+    def test_create_upload_session(self):
+        """
+        Ensure we can start an upload by chunks.
+        """
+        content = self.create_session()
+
+        self.assertEqual(content['filename'], 'video.mp4')
+        self.assertEqual(content['size'], len(self.video_data))
+        self.assertEqual(content['received'], [])
+        self.assertEqual(content['offset'], 0)
+
+        session = UploadSession.objects.get(id=content['id'])
+        self.assertEqual(
+            os.path.getsize(session.path_file),
+            len(self.video_data)
+        )
+
+    def test_create_upload_session_without_permission(self):
+        """
+        Ensure we can't start an upload without permission.
+        """
+        self.client.force_authenticate(user=self.user)
+
+        response = self.client.post(
+            reverse('video:uploads'),
+            {
+                'filename': 'video.mp4',
+                'size': len(self.video_data),
+            },
+            format='json',
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_create_upload_session_invalid_file(self):
+        """
+        Ensure we can't start an upload of a file too big or not a video.
+        """
+        self.client.force_authenticate(user=self.admin)
+
+        response = self.client.post(
+            reverse('video:uploads'),
+            {
+                'filename': 'video.exe',
+                'size': 999999999999,
+            },
+            format='json',
+        )
+        content = json.loads(response.content)
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertTrue('filename' in content.keys())
+        self.assertTrue('size' in content.keys())
+
+    def test_upload_chunks_in_any_order(self):
+        """
+        Ensure we can send the chunks in any order, know the bytes
+        received and create the video at the end.
+        """
+        session_id = self.create_session()['id']
+        size = len(self.video_data)
+
+        response = self.put_chunk(session_id, 1000, size)
+        content = json.loads(response.content)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(content['received'], [[1000, size]])
+        self.assertEqual(content['offset'], 0)
+
+        response = self.client.post(
+            reverse('video:uploads_complete', kwargs={'pk': session_id}),
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        self.put_chunk(session_id, 0, 500)
+        response = self.put_chunk(session_id, 400, 1000)
+        content = json.loads(response.content)
+
+        self.assertEqual(content['received'], [[0, size]])
+        self.assertEqual(content['offset'], size)
+
+        session = UploadSession.objects.get(id=session_id)
+
+        response = self.client.post(
+            reverse('video:uploads_complete', kwargs={'pk': session_id}),
+        )
+        content = json.loads(response.content)
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(content['width'], 1280)
+        self.assertEqual(content['height'], 720)
+        self.assertEqual(content['size'], size)
+
+        video = Video.objects.get(id=content['id'])
+        with open(video.is_path_file, 'rb') as file:
+            self.assertEqual(file.read(), self.video_data)
+
+        # the file of the session is moved and the session deleted
+        self.assertFalse(os.path.exists(session.path_file))
+        self.assertFalse(
+            UploadSession.objects.filter(id=session_id).exists()
+        )
+
+    def test_upload_chunk_invalid_range(self):
+        """
+        Ensure we can't send a chunk out of the file or smaller than its
+        Content-Range.
+        """
+        session_id = self.create_session()['id']
+        url = reverse('video:uploads_id', kwargs={'pk': session_id})
+
+        response = self.client.put(
+            url,
+            b'data',
+            content_type='application/octet-stream',
+            HTTP_CONTENT_RANGE='bytes 0-3/10',
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        response = self.client.put(
+            url,
+            b'data',
+            content_type='application/octet-stream',
+            HTTP_CONTENT_RANGE='bytes 100-199/{0}'.format(
+                len(self.video_data)
+            ),
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        session = UploadSession.objects.get(id=session_id)
+        self.assertEqual(session.chunks.count(), 0)
+
+    def test_upload_chunk_not_a_video(self):
+        """
+        Ensure an upload that doesn't start like a video is refused from
+        its first chunk.
+        """
+        session_id = self.create_session()['id']
+        self.video_data = b'MZ' + b'\x00' * 10 + self.video_data[12:]
+
+        response = self.put_chunk(session_id, 0, 1000)
+
+        self.assertEqual(
+            response.status_code,
+            status.HTTP_415_UNSUPPORTED_MEDIA_TYPE
+        )
+
+    def test_delete_upload_session(self):
+        """
+        Ensure we can cancel an upload and its file is deleted.
+        """
+        session_id = self.create_session()['id']
+        session = UploadSession.objects.get(id=session_id)
+
+        response = self.client.delete(
+            reverse('video:uploads_id', kwargs={'pk': session_id}),
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertFalse(os.path.exists(session.path_file))
+
+    def expire_session(self, session_id):
+        UploadSession.objects.filter(id=session_id).update(
+            is_created=timezone.now() - timezone.timedelta(days=2)
+        )
+
+    def test_complete_expired_upload(self):
+        """
+        Ensure an expired upload can't be completed.
+        """
+        session_id = self.create_session()['id']
+        self.put_chunk(session_id, 0, len(self.video_data))
+        self.expire_session(session_id)
+
+        response = self.client.post(
+            reverse('video:uploads_complete', kwargs={'pk': session_id}),
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(Video.objects.exists())
+
+    def test_purge_expired_uploads(self):
+        """
+        Ensure the expired uploads are deleted with their file, and only
+        them.
+        """
+        expired_id = self.create_session()['id']
+        self.put_chunk(expired_id, 0, 100)
+        self.expire_session(expired_id)
+        expired = UploadSession.objects.get(id=expired_id)
+        self.assertTrue(os.path.exists(expired.path_file))
+
+        session_id = self.create_session()['id']
+
+        call_command('purge_uploads', stdout=StringIO())
+
+        self.assertFalse(
+            UploadSession.objects.filter(id=expired_id).exists()
+        )
+        self.assertFalse(os.path.exists(expired.path_file))
+        self.assertTrue(
+            UploadSession.objects.filter(id=session_id).exists()
+        )
+
+    def test_upload_of_another_user(self):
+        """
+        Ensure we can't send chunks to the upload of another user.
+        """
+        session_id = self.create_session()['id']
+
+        self.client.force_authenticate(user=self.user)
+        response = self.put_chunk(session_id, 0, 100)
+
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
@@ -1,14 +1,32 @@
+import hashlib
 import json
+import os
+import tempfile
+from base64 import b64decode
+from io import StringIO
 from unittest import mock
+from urllib.parse import parse_qs, urlparse
+
 from django.urls import reverse
 from django.conf import settings
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test.utils import override_settings
 from django.utils import timezone
 
 from rest_framework import status
 from rest_framework.test import APIClient, APITestCase
 
+from django.contrib.auth.models import Group
+
 from apiNomad.factories import AdminFactory, UserFactory
-from video.models import Video, Genre
+from apiNomad.models import Job, Profile
+from video import functions
+from video.models import (
+    Video, Genre, KeyframeIndex, Rendition, content_path
+)
+from video.tests.samples import build_mp4
 
 
 class VideosTests(APITestCase):
@@ -92,28 +110,274 @@ class VideosTests(APITestCase):
                 is_deleted=subscription_date
             )
 
-    # TODO: create video test
-    # def test_create_new_video_with_permission(self):
-        # path_video = 'media/upload/2019/01/15/video.mp4'
-
-        # file_mock = mock.MagicMock(spec=File)
-        # file_mock.filename = 'video.mp4'
-        # self.client.force_authenticate(user=self.admin)
-        # with open(__file__, 'rb') as fp:
-        #     data = {
-        #         'file': fp,
-        #     }
-        #
-        #     response = self.client.post(
-        #         reverse('video:videos'),
-        #         data,
-        #         format='json',
-        #         # content_type=client.MULTIPART_CONTENT,
-        #         Content_disposition =
-        #   'form-data; name="file"; filename="video.mp4"'
-        #     )
-        #
-        #     print(response.data)
+    def test_create_new_video_with_permission(self):
+        """
+        Ensure we can upload a new video and that it is read only once.
+        """
+        self.client.force_authenticate(user=self.admin)
+        functions.PROBE_METRICS.clear()
+
+        video_file = SimpleUploadedFile(
+            'video.mp4',
+            build_mp4(),
+            content_type='video/mp4',
+        )
+
+        with tempfile.TemporaryDirectory() as media_root, \
+                override_settings(MEDIA_ROOT=media_root), \
+                self.assertLogs('video.functions', 'INFO') as logs:
+            response = self.client.post(
+                reverse('video:videos'),
+                {'file': video_file},
+                format='multipart',
+            )
+
+        content = json.loads(response.content)
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(content['width'], 1280)
+        self.assertEqual(content['height'], 720)
+        self.assertEqual(content['duration'], 2.0)
+        self.assertEqual(content['num_frame'], 50)
+        self.assertEqual(content['codec'], 'h264')
+        self.assertEqual(content['fps'], 25)
+        self.assertEqual(content['bitrate'], len(build_mp4()) * 8 // 2)
+        self.assertTrue(content['has_audio'])
+        self.assertEqual(content['owner']['id'], self.admin.id)
+        # the renditions are created once the file is remuxed
+        self.assertEqual(content['renditions'], [])
+        self.assertIsNone(content['renditions_url'])
+        self.assertEqual(
+            list(Job.objects.values_list('name', flat=True)),
+            ['video.faststart']
+        )
+
+        self.assertEqual(sum(functions.PROBE_METRICS.values()), 1)
+        self.assertEqual(len(logs.output), 1)
+        self.assertIn(
+            'read by container (process total: 1 by container, 0 by '
+            'ffprobe)',
+            logs.output[0]
+        )
+
+    def test_create_same_video_twice(self):
+        """
+        Ensure a content uploaded twice is stored once, and its file is
+        deleted with the last video using it.
+        """
+        self.client.force_authenticate(user=self.admin)
+        video_data = build_mp4()
+
+        with tempfile.TemporaryDirectory() as media_root, \
+                override_settings(MEDIA_ROOT=media_root):
+            for name in ['video.mp4', 'copy.mp4']:
+                response = self.client.post(
+                    reverse('video:videos'),
+                    {'file': SimpleUploadedFile(name, video_data)},
+                    format='multipart',
+                )
+                self.assertEqual(
+                    response.status_code,
+                    status.HTTP_201_CREATED
+                )
+
+            videos = Video.objects.filter(
+                sha256=hashlib.sha256(video_data).hexdigest()
+            )
+            self.assertEqual(videos.count(), 2)
+
+            first, second = videos
+            self.assertEqual(first.file.name, second.file.name)
+            self.assertTrue(first.file.name.startswith(
+                'uploads/videos/sha256/'
+            ))
+
+            # the deletions are committed at once
+            with mock.patch(
+                    'django.db.transaction.on_commit',
+                    side_effect=lambda func: func()):
+                first.delete()
+                call_command('run_worker', once=True, threads=1,
+                             stdout=StringIO())
+                self.assertTrue(os.path.exists(second.is_path_file))
+
+                second.delete()
+                call_command('run_worker', once=True, threads=1,
+                             stdout=StringIO())
+            self.assertFalse(os.path.exists(second.is_path_file))
+
+    def test_create_same_video_shares_files(self):
+        """
+        Ensure a content uploaded again uses the renditions, previews and
+        keyframes of the first video instead of making them again.
+        """
+        self.client.force_authenticate(user=self.admin)
+        video_data = build_mp4()
+
+        with tempfile.TemporaryDirectory() as media_root, \
+                override_settings(MEDIA_ROOT=media_root):
+            response = self.client.post(
+                reverse('video:videos'),
+                {'file': SimpleUploadedFile('video.mp4', video_data)},
+                format='multipart',
+            )
+            self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+            jobs_count = Job.objects.count()
+
+            response = self.client.post(
+                reverse('video:videos'),
+                {'file': SimpleUploadedFile('copy.mp4', video_data)},
+                format='multipart',
+            )
+            self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+            # no job is queued for the second video
+            self.assertEqual(Job.objects.count(), jobs_count)
+
+            first, second = Video.objects.filter(
+                sha256=hashlib.sha256(video_data).hexdigest()
+            ).order_by('id')
+            self.assertEqual(second.media_source, first.id)
+            self.assertEqual(second.renditions_path, first.renditions_path)
+
+            # the jobs of the first video make the files of both
+            with mock.patch('video.functions.transcodeRendition'), \
+                    mock.patch('video.functions.makePreviews'), \
+                    mock.patch('video.functions.faststartVideo'):
+                call_command('run_worker', once=True, threads=1,
+                             stdout=StringIO())
+
+            second.refresh_from_db()
+            self.assertTrue(second.has_previews)
+            self.assertEqual(
+                list(second.renditions.values_list('name', flat=True)),
+                list(first.renditions.values_list('name', flat=True)),
+            )
+            self.assertFalse(
+                second.renditions.exclude(status=Rendition.READY).exists()
+            )
+            self.assertTrue(
+                KeyframeIndex.objects.filter(video=second).exists()
+            )
+
+    def test_create_same_video_after_faststart(self):
+        """
+        Ensure a content uploaded again is found once its file is remuxed
+        and its SHA-256 changed.
+        """
+        self.client.force_authenticate(user=self.admin)
+        video_data = build_mp4()
+        sha256 = hashlib.sha256(video_data).hexdigest()
+
+        with tempfile.TemporaryDirectory() as media_root, \
+                override_settings(MEDIA_ROOT=media_root):
+            response = self.client.post(
+                reverse('video:videos'),
+                {'file': SimpleUploadedFile('video.mp4', video_data)},
+                format='multipart',
+            )
+            self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+            # the file as remuxed by functions.faststartVideo
+            remuxed = 'f' * 64
+            Video.objects.filter(sha256=sha256).update(
+                file=content_path(remuxed, 'mp4'),
+                sha256=remuxed,
+                is_faststart=True,
+            )
+
+            response = self.client.post(
+                reverse('video:videos'),
+                {'file': SimpleUploadedFile('copy.mp4', video_data)},
+                format='multipart',
+            )
+            self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+            videos = Video.objects.filter(source_sha256=sha256)
+            self.assertEqual(videos.count(), 2)
+            for video in videos:
+                self.assertEqual(video.sha256, remuxed)
+                self.assertEqual(
+                    video.file.name,
+                    content_path(remuxed, 'mp4')
+                )
+
+    def test_create_new_video_not_a_video(self):
+        """
+        Ensure a file that is not a video is refused from its first bytes,
+        before being read.
+        """
+        self.client.force_authenticate(user=self.admin)
+        functions.PROBE_METRICS.clear()
+
+        video_file = SimpleUploadedFile(
+            'video.mp4',
+            b'MZ' + b'\x00' * 4096,
+            content_type='video/mp4',
+        )
+
+        response = self.client.post(
+            reverse('video:videos'),
+            {'file': video_file},
+            format='multipart',
+        )
+
+        self.assertEqual(
+            response.status_code,
+            status.HTTP_415_UNSUPPORTED_MEDIA_TYPE
+        )
+        self.assertEqual(sum(functions.PROBE_METRICS.values()), 0)
+        self.assertEqual(Video.objects.count(), 4)
+
+    def test_create_new_video_too_large(self):
+        """
+        Ensure a video bigger than the size accepted is refused while it
+        is received.
+        """
+        self.client.force_authenticate(user=self.admin)
+
+        video_data = build_mp4()
+        constant = dict(settings.CONSTANT)
+        constant['VIDEO'] = dict(
+            settings.CONSTANT['VIDEO'],
+            SIZE=len(video_data) - 1,
+        )
+
+        video_file = SimpleUploadedFile(
+            'video.mp4',
+            video_data,
+            content_type='video/mp4',
+        )
+
+        with override_settings(CONSTANT=constant):
+            response = self.client.post(
+                reverse('video:videos'),
+                {'file': video_file},
+                format='multipart',
+            )
+
+        self.assertEqual(
+            response.status_code,
+            status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+        )
+        self.assertEqual(Video.objects.count(), 4)
+
+    def test_upload_handler_on_videos_only(self):
+        """
+        Ensure the files sent to the other views are not checked as
+        videos.
+        """
+        response = self.client.post(
+            reverse('token_api'),
+            {
+                'login': self.user.email,
+                'password': 'Test123!',
+                'attachment': SimpleUploadedFile('notes.txt', b'notes'),
+            },
+            format='multipart',
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
 
     def test_list_videos_with_permissions(self):
         """
@@ -134,7 +398,13 @@ class VideosTests(APITestCase):
         attributes = ['id', 'title', 'owner', 'description', 'height',
                       'is_created', 'is_active', 'is_delete', 'width',
                       'size', 'duration', 'is_actived', 'is_deleted',
-                      'file', 'genres', 'is_path_file']
+                      'file', 'genres', 'is_path_file', 'state',
+                      'sha256', 'source_sha256', 'media_source',
+                      'num_frame', 'codec',
+                      'bitrate', 'fps', 'has_audio', 'rotation',
+                      'renditions',
+                      'renditions_url', 'is_faststart', 'has_previews',
+                      'poster_url', 'thumbnails_url']
 
         for key in content['results'][0].keys():
             self.assertTrue(
@@ -215,7 +485,13 @@ class VideosTests(APITestCase):
         attributes = ['id', 'title', 'owner', 'description', 'height',
                       'is_created', 'is_active', 'is_delete', 'width',
                       'size', 'duration', 'is_actived', 'is_deleted',
-                      'file', 'genres', 'is_path_file']
+                      'file', 'genres', 'is_path_file', 'state',
+                      'sha256', 'source_sha256', 'media_source',
+                      'num_frame', 'codec',
+                      'bitrate', 'fps', 'has_audio', 'rotation',
+                      'renditions',
+                      'renditions_url', 'is_faststart', 'has_previews',
+                      'poster_url', 'thumbnails_url']
 
         for key in content['results'][0].keys():
             self.assertTrue(
@@ -231,3 +507,286 @@ class VideosTests(APITestCase):
             'The system failed to return some '
             'attributes : {0}'.format(attributes),
         )
+
+    def test_list_videos_with_cursor(self):
+        """
+        Ensure we can scroll through all videos with a cursor pagination,
+        even when videos share the same creation date.
+        """
+        self.client.force_authenticate(user=self.admin)
+
+        response = self.client.get(
+            reverse('video:videos'),
+            data={
+                'pagination': 'cursor',
+                'limit': 3,
+            },
+        )
+        content = json.loads(response.content)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertFalse('count' in content.keys())
+        self.assertEqual(content['previous'], None)
+        self.assertEqual(len(content['results']), 3)
+
+        ids = [video['id'] for video in content['results']]
+
+        response = self.client.get(content['next'])
+        content = json.loads(response.content)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(content['next'], None)
+        self.assertNotEqual(content['previous'], None)
+        self.assertEqual(len(content['results']), 1)
+
+        ids += [video['id'] for video in content['results']]
+
+        self.assertEqual(
+            ids,
+            list(Video.objects.order_by('is_created', 'id').values_list(
+                'id',
+                flat=True
+            ))
+        )
+
+    def test_list_videos_with_cursor_same_date(self):
+        """
+        Ensure the cursor is a keyset on (is_created, id): the videos
+        created at the same date are paged without any offset, in both
+        directions.
+        """
+        self.client.force_authenticate(user=self.admin)
+        Video.objects.update(is_created=timezone.now())
+        expected = list(Video.objects.order_by('id').values_list(
+            'id',
+            flat=True
+        ))
+
+        ids = []
+        url = reverse('video:videos')
+        data = {'pagination': 'cursor', 'limit': 1}
+        while url:
+            response = self.client.get(url, data=data)
+            content = json.loads(response.content)
+            ids += [video['id'] for video in content['results']]
+            url, data = content['next'], None
+
+            if url:
+                cursor = parse_qs(urlparse(url).query)['cursor'][0]
+                self.assertNotIn('o=', b64decode(cursor).decode())
+
+        self.assertEqual(ids, expected)
+
+        # back from the last page
+        ids = []
+        url = content['previous']
+        while url:
+            response = self.client.get(url)
+            content = json.loads(response.content)
+            ids = [video['id'] for video in content['results']] + ids
+            url = content['previous']
+
+        self.assertEqual(ids, expected[:-1])
+
+    @override_settings(
+        REST_FRAMEWORK_ESTIMATED_COUNT={
+            'THRESHOLD': 3,
+            'CACHE_SECONDS': 300,
+            'EXACT_QUERY_PARAM': 'exact_count',
+        }
+    )
+    def test_list_videos_with_estimated_count(self):
+        """
+        Ensure the count of a big list is estimated from a cached count
+        unless an exact count is asked.
+        """
+        cache.clear()
+        self.client.force_authenticate(user=self.admin)
+
+        response = self.client.get(
+            reverse('video:videos'),
+            data={'limit': 1},
+        )
+        content = json.loads(response.content)
+
+        self.assertEqual(content['count'], 4)
+        self.assertFalse(content['count_estimated'])
+
+        Video.objects.create(
+            title='video test 5',
+            owner=self.user,
+            duration=1415.081748,
+            width=settings.CONSTANT["VIDEO"]["WIDTH"],
+            height=settings.CONSTANT["VIDEO"]["HEIGHT"],
+            file='/upload/videos/2018/10/01/video.mp4',
+            size=settings.CONSTANT["VIDEO"]["SIZE"],
+        )
+
+        # the count cached is used: videos, groups, genres, renditions,
+        # no COUNT(*)
+        with self.assertNumQueries(4):
+            response = self.client.get(
+                reverse('video:videos'),
+                data={'limit': 1},
+            )
+        content = json.loads(response.content)
+
+        self.assertEqual(content['count'], 4)
+        self.assertTrue(content['count_estimated'])
+        self.assertNotEqual(content['next'], None)
+
+        # the last page gives the exact count
+        response = self.client.get(
+            reverse('video:videos'),
+            data={'limit': 2, 'offset': 4},
+        )
+        content = json.loads(response.content)
+
+        self.assertEqual(content['count'], 5)
+        self.assertFalse(content['count_estimated'])
+        self.assertEqual(content['next'], None)
+
+        # a page past the end gives the exact count, not its offset
+        response = self.client.get(
+            reverse('video:videos'),
+            data={'limit': 2, 'offset': 100},
+        )
+        content = json.loads(response.content)
+
+        self.assertEqual(content['count'], 5)
+        self.assertFalse(content['count_estimated'])
+        self.assertEqual(content['results'], [])
+
+        response = self.client.get(
+            reverse('video:videos'),
+            data={'limit': 1, 'exact_count': 'true'},
+        )
+        content = json.loads(response.content)
+
+        self.assertEqual(content['count'], 5)
+        self.assertFalse(content['count_estimated'])
+
+    def test_list_actived_videos(self):
+        """
+        Ensure we can list only videos actived and not deleted.
+        """
+        self.client.force_authenticate(user=self.admin)
+
+        response = self.client.get(
+            reverse('video:videos'),
+            data={
+                "is_actived": True
+            },
+            format='json',
+        )
+
+        content = json.loads(response.content)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(content['count'], 1)
+        self.assertTrue(content['results'][0]['is_active'])
+        self.assertFalse(content['results'][0]['is_delete'])
+
+    def test_list_videos_of_owner(self):
+        """
+        Ensure we can list videos of the user connected without
+        videos deleted.
+        """
+        self.client.force_authenticate(user=self.user)
+
+        response = self.client.get(
+            reverse('video:videos'),
+            data={
+                "param": True
+            },
+            format='json',
+        )
+
+        content = json.loads(response.content)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(content['count'], 2)
+
+        for video in content['results']:
+            self.assertEqual(video['owner']['id'], self.user.id)
+            self.assertFalse(video['is_delete'])
+
+    def test_list_videos_with_filters(self):
+        """
+        Ensure we can filter the videos on their duration, resolution,
+        codec and genre.
+        """
+        Video.objects.filter(pk=self.video_admin.pk).update(
+            duration=30,
+            width=1920,
+            height=1080,
+            codec='vp9',
+        )
+        admin_videos = {self.video_admin.id}
+        other_videos = set(
+            Video.objects.exclude(pk=self.video_admin.pk).values_list(
+                'id',
+                flat=True
+            )
+        )
+
+        self.client.force_authenticate(user=self.admin)
+
+        filters = [
+            ({'max_duration': 60}, admin_videos),
+            ({'min_duration': 60}, other_videos),
+            ({'min_height': 1080, 'min_width': 1920}, admin_videos),
+            ({'max_height': 720}, other_videos),
+            ({'codec': 'vp9'}, admin_videos),
+            ({'genre': self.genre1.id}, admin_videos),
+            ({'genre': self.genre1.id, 'min_duration': 60}, set()),
+        ]
+        for data, videos in filters:
+            response = self.client.get(reverse('video:videos'), data=data)
+
+            content = json.loads(response.content)
+
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertEqual(
+                {video['id'] for video in content['results']},
+                videos,
+                data
+            )
+
+    def test_list_videos_number_of_queries(self):
+        """
+        Ensure the number of queries to list videos doesn't depend on the
+        number of videos returned.
+        """
+        group = Group.objects.create(name='group test')
+
+        for index in range(10):
+            owner = UserFactory()
+            owner.groups.add(group)
+            Profile.objects.create(user=owner)
+
+            video = Video.objects.create(
+                title='video test {0}'.format(index),
+                owner=owner,
+                duration=1415.081748,
+                width=settings.CONSTANT["VIDEO"]["WIDTH"],
+                height=settings.CONSTANT["VIDEO"]["HEIGHT"],
+                file='/upload/videos/2018/10/01/video.mp4',
+                size=settings.CONSTANT["VIDEO"]["SIZE"],
+            )
+            video.genres.add(self.genre1, self.genre2)
+
+        self.client.force_authenticate(user=self.admin)
+
+        # count, videos with owners and profiles, groups, genres,
+        # renditions
+        with self.assertNumQueries(5):
+            response = self.client.get(
+                reverse('video:videos'),
+                format='json',
+            )
+
+        content = json.loads(response.content)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(content['count'], 14)
@@ -0,0 +1,125 @@
+import json
+
+from django.urls import reverse
+from django.conf import settings
+from django.utils import timezone
+
+from rest_framework import status
+from rest_framework.test import APIClient, APITestCase
+
+from apiNomad.factories import AdminFactory, UserFactory
+from apiNomad.models import Job
+from video.models import Video
+
+
+class VideoClipTests(APITestCase):
+
+    def setUp(self):
+        self.client = APIClient()
+
+        self.user = UserFactory()
+        self.user.set_password('Test123!')
+        self.user.save()
+
+        self.admin = AdminFactory()
+        self.admin.set_password('Test123!')
+        self.admin.save()
+
+        self.video = Video.objects.create(
+            title='video test 1',
+            description='description test 1',
+            owner=self.admin,
+            duration=60,
+            width=settings.CONSTANT["VIDEO"]["WIDTH"],
+            height=settings.CONSTANT["VIDEO"]["HEIGHT"],
+            file='uploads/videos/video.mp4',
+            size=settings.CONSTANT["VIDEO"]["SIZE"],
+        )
+
+    def clip(self, video, data):
+        return self.client.post(
+            reverse('video:videos_clip', kwargs={'pk': video.id}),
+            data,
+            format='json',
+        )
+
+    def test_create_clip(self):
+        """
+        Ensure a clip is created at once and cut by the worker, and listed
+        once its file is ready.
+        """
+        self.client.force_authenticate(user=self.admin)
+
+        response = self.clip(self.video, {'start': 10, 'end': 25.5})
+
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+
+        result = json.loads(response.content)
+        clip = Video.objects.get(pk=result['id'])
+        self.assertEqual(result['title'], self.video.title)
+        self.assertEqual(result['duration'], 15.5)
+        self.assertEqual(result['is_path_file'], None)
+        self.assertEqual(clip.owner, self.admin)
+        self.assertEqual(clip.file.name, '')
+
+        job = Job.objects.get(name='video.make_clip')
+        self.assertEqual(json.loads(job.arguments), {
+            'clip_id': clip.id,
+            'video_id': self.video.id,
+            'start': 10,
+            'end': 25.5,
+        })
+
+        response = self.client.get(reverse('video:videos'))
+        ids = [video['id'] for video in json.loads(response.content)[
+            'results'
+        ]]
+        self.assertNotIn(clip.id, ids)
+        self.assertIn(self.video.id, ids)
+
+    def test_create_clip_invalid_range(self):
+        """
+        Ensure a clip must be a range of its video.
+        """
+        self.client.force_authenticate(user=self.admin)
+
+        for data in [{'start': 10, 'end': 5}, {'start': -1, 'end': 5},
+                     {'start': 10, 'end': 61}, {'start': 10}]:
+            response = self.clip(self.video, data)
+
+            self.assertEqual(
+                response.status_code,
+                status.HTTP_400_BAD_REQUEST
+            )
+
+        self.assertFalse(Job.objects.exists())
+
+    def test_create_clip_without_permission(self):
+        """
+        Ensure a user can't clip a video without permission.
+        """
+        self.video.is_actived = timezone.now()
+        self.video.save()
+        self.client.force_authenticate(user=self.user)
+
+        response = self.clip(self.video, {'start': 10, 'end': 20})
+
+        content = {'detail': 'You are not authorized to clip this video.'}
+        self.assertEqual(json.loads(response.content), content)
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_create_clip_of_clip_not_ready(self):
+        """
+        Ensure a clip whose file is not cut yet can't be clipped.
+        """
+        self.client.force_authenticate(user=self.admin)
+
+        clip = json.loads(
+            self.clip(self.video, {'start': 10, 'end': 20}).content
+        )
+        response = self.clip(
+            Video.objects.get(pk=clip['id']),
+            {'start': 0, 'end': 5}
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
@@ -136,6 +136,24 @@ class VideosTests(APITestCase):
 
         self.assertEqual(response.status_code, status.HTTP_200_OK)
 
+    def test_retrieve_video_number_of_queries(self):
+        """
+        Ensure we retrieve a video with its relations in a fixed number
+        of queries.
+        """
+        self.client.force_authenticate(user=self.user)
+
+        # video with owner and profile, groups, genres, renditions
+        with self.assertNumQueries(4):
+            response = self.client.get(
+                reverse(
+                    'video:videos_id',
+                    kwargs={'pk': self.video_admin.id},
+                )
+            )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
     @override_settings(
         TIME_ZONE='UTC'
     )
@@ -0,0 +1,99 @@
+import json
+
+from django.urls import reverse
+from django.conf import settings
+
+from rest_framework import status
+from rest_framework.test import APIClient, APITestCase
+
+from apiNomad.factories import AdminFactory, UserFactory
+from video.models import KeyframeIndex, Video
+
+
+class VideoKeyframeTests(APITestCase):
+
+    def setUp(self):
+        self.client = APIClient()
+
+        self.user = UserFactory()
+        self.user.set_password('Test123!')
+        self.user.save()
+
+        self.admin = AdminFactory()
+        self.admin.set_password('Test123!')
+        self.admin.save()
+
+        self.video = Video.objects.create(
+            title='video test 1',
+            owner=self.admin,
+            duration=6,
+            width=settings.CONSTANT["VIDEO"]["WIDTH"],
+            height=settings.CONSTANT["VIDEO"]["HEIGHT"],
+            file='uploads/videos/video.mp4',
+            size=settings.CONSTANT["VIDEO"]["SIZE"],
+        )
+
+        index = KeyframeIndex(video=self.video)
+        index.set_keyframes([(0.0, 48), (2.0, 5000), (4.0, 9000)])
+        index.save()
+
+    def get_keyframe(self, video, **params):
+        return self.client.get(
+            reverse('video:videos_keyframe', kwargs={'pk': video.id}),
+            params
+        )
+
+    def test_keyframe(self):
+        """
+        Ensure we get the last keyframe before a time in one query.
+        """
+        self.client.force_authenticate(user=self.admin)
+
+        with self.assertNumQueries(1):
+            response = self.get_keyframe(self.video, time='3.5')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            json.loads(response.content),
+            {'time': 2.0, 'offset': 5000}
+        )
+
+    def test_keyframe_invalid_time(self):
+        """
+        Ensure the time asked must be a positive number.
+        """
+        self.client.force_authenticate(user=self.admin)
+
+        for params in [{}, {'time': 'start'}, {'time': '-1'},
+                       {'time': 'nan'}]:
+            response = self.get_keyframe(self.video, **params)
+
+            self.assertEqual(
+                response.status_code,
+                status.HTTP_400_BAD_REQUEST
+            )
+
+    def test_keyframe_not_indexed(self):
+        """
+        Ensure we get a 404 while the keyframes are not indexed.
+        """
+        KeyframeIndex.objects.all().delete()
+        self.client.force_authenticate(user=self.admin)
+
+        response = self.get_keyframe(self.video, time='1')
+
+        content = {'detail': 'The keyframes of this video are not indexed.'}
+        self.assertEqual(json.loads(response.content), content)
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_keyframe_without_permission(self):
+        """
+        Ensure a user can't seek in an inactive video of someone else.
+        """
+        self.client.force_authenticate(user=self.user)
+
+        response = self.get_keyframe(self.video, time='1')
+
+        content = {'detail': 'You are not authorized to watch this video.'}
+        self.assertEqual(json.loads(response.content), content)
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
@@ -0,0 +1,358 @@
+import json
+import os
+import shutil
+import tempfile
+from unittest import mock
+
+from django.urls import reverse
+from django.conf import settings
+from django.test import RequestFactory
+from django.test.utils import override_settings
+from django.utils import timezone
+
+from rest_framework import status
+from rest_framework.test import APIClient, APITestCase
+
+from apiNomad.factories import AdminFactory, UserFactory
+from video import streaming, tokens
+from video.models import Video
+
+
+class VideoStreamTests(APITestCase):
+
+    def setUp(self):
+        self.client = APIClient()
+
+        self.user = UserFactory()
+        self.user.set_password('Test123!')
+        self.user.save()
+
+        self.admin = AdminFactory()
+        self.admin.set_password('Test123!')
+        self.admin.save()
+
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+
+        settings_media = override_settings(MEDIA_ROOT=media_root)
+        settings_media.enable()
+        self.addCleanup(settings_media.disable)
+
+        self.video_data = os.urandom(300 * 1024)
+        os.makedirs(os.path.join(media_root, 'uploads/videos'))
+        with open(os.path.join(media_root, 'uploads/videos/video.mp4'),
+                  'wb') as file:
+            file.write(self.video_data)
+
+        self.video = Video.objects.create(
+            title='video test 1',
+            owner=self.admin,
+            duration=1415.081748,
+            width=settings.CONSTANT["VIDEO"]["WIDTH"],
+            height=settings.CONSTANT["VIDEO"]["HEIGHT"],
+            file='uploads/videos/video.mp4',
+            size=len(self.video_data),
+        )
+
+    def get_video(self, **headers):
+        response = self.client.get(
+            reverse('video:videos_stream', kwargs={'pk': self.video.id}),
+            **headers
+        )
+        if response.streaming:
+            response.data = b''.join(response.streaming_content)
+        return response
+
+    def activate_video(self):
+        self.video.is_actived = timezone.now()
+        self.video.save()
+
+    def test_stream_whole_video(self):
+        """
+        Ensure we can get the whole file of a video.
+        """
+        self.client.force_authenticate(user=self.admin)
+
+        response = self.get_video(HTTP_ACCEPT='video/*')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data, self.video_data)
+        self.assertEqual(response['Content-Type'], 'video/mp4')
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+        self.assertEqual(
+            response['Content-Length'],
+            str(len(self.video_data))
+        )
+
+    def test_stream_range(self):
+        """
+        Ensure we can get a range of bytes of a video.
+        """
+        self.client.force_authenticate(user=self.admin)
+
+        response = self.get_video(HTTP_RANGE='bytes=100000-199999')
+
+        self.assertEqual(response.status_code, status.HTTP_206_PARTIAL_CONTENT)
+        self.assertEqual(response.data, self.video_data[100000:200000])
+        self.assertEqual(
+            response['Content-Range'],
+            'bytes 100000-199999/{}'.format(len(self.video_data))
+        )
+        self.assertEqual(response['Content-Length'], '100000')
+
+        response = self.get_video(HTTP_RANGE='bytes=-100')
+
+        self.assertEqual(response.status_code, status.HTTP_206_PARTIAL_CONTENT)
+        self.assertEqual(response.data, self.video_data[-100:])
+
+    def test_stream_multiple_ranges(self):
+        """
+        Ensure we can get several ranges of a video in one response.
+        """
+        self.client.force_authenticate(user=self.admin)
+
+        response = self.get_video(HTTP_RANGE='bytes=0-9, 1000-1099')
+
+        self.assertEqual(response.status_code, status.HTTP_206_PARTIAL_CONTENT)
+        self.assertTrue(
+            response['Content-Type'].startswith('multipart/byteranges')
+        )
+        self.assertEqual(
+            response['Content-Length'],
+            str(len(response.data))
+        )
+
+        boundary = response['Content-Type'].split('boundary=')[1]
+        parts = response.data.split(
+            '\r\n--{}'.format(boundary).encode('ascii')
+        )
+        self.assertEqual(len(parts), 4)
+        self.assertEqual(
+            parts[1].split(b'\r\n\r\n', 1)[1],
+            self.video_data[0:10]
+        )
+        self.assertTrue(b'Content-Range: bytes 1000-1099/' in parts[2])
+        self.assertEqual(
+            parts[2].split(b'\r\n\r\n', 1)[1],
+            self.video_data[1000:1100]
+        )
+
+    def test_stream_range_not_satisfiable(self):
+        """
+        Ensure a range out of the video is refused.
+        """
+        self.client.force_authenticate(user=self.admin)
+
+        response = self.get_video(HTTP_RANGE='bytes=999999999-')
+
+        self.assertEqual(
+            response.status_code,
+            status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE
+        )
+        self.assertEqual(
+            response['Content-Range'],
+            'bytes */{}'.format(len(self.video_data))
+        )
+
+    def test_stream_if_range(self):
+        """
+        Ensure the ranges are only sent for the version of the file
+        given by If-Range.
+        """
+        self.client.force_authenticate(user=self.admin)
+
+        etag = self.get_video()['ETag']
+
+        response = self.get_video(HTTP_RANGE='bytes=0-9', HTTP_IF_RANGE=etag)
+        self.assertEqual(response.status_code, status.HTTP_206_PARTIAL_CONTENT)
+
+        response = self.get_video(
+            HTTP_RANGE='bytes=0-9',
+            HTTP_IF_RANGE='"another-version"'
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data, self.video_data)
+
+    def test_stream_inactive_video_without_permission(self):
+        """
+        Ensure only the owner can watch a video not activated.
+        """
+        self.client.force_authenticate(user=self.user)
+
+        response = self.get_video()
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+        self.activate_video()
+
+        response = self.get_video(HTTP_RANGE='bytes=0-9')
+        self.assertEqual(response.status_code, status.HTTP_206_PARTIAL_CONTENT)
+
+    def test_stream_video_not_ready(self):
+        """
+        Ensure a video without file yet (a clip being cut) can't be
+        watched.
+        """
+        self.client.force_authenticate(user=self.admin)
+        Video.objects.filter(pk=self.video.id).update(file='')
+
+        response = self.get_video()
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+
+    def test_stream_video_file_missing(self):
+        """
+        Ensure a video whose file is missing is not found.
+        """
+        self.client.force_authenticate(user=self.admin)
+        os.remove(self.video.is_path_file)
+
+        response = self.get_video()
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_stream_with_sendfile(self):
+        """
+        Ensure a single range is given to the server as a file limited to
+        the range, it can be sent with os.sendfile.
+        """
+        request = RequestFactory().get('/', HTTP_RANGE='bytes=100-199')
+
+        response = streaming.stream_file(request, self.video.is_path_file)
+
+        self.assertEqual(response.status_code, status.HTTP_206_PARTIAL_CONTENT)
+        self.assertIsNotNone(response.file_to_stream)
+        self.assertEqual(
+            response.file_to_stream.read(),
+            self.video_data[100:200]
+        )
+        response.close()
+
+    def test_stream_with_x_accel_redirect(self):
+        """
+        Ensure the transfer is given to nginx once the permissions are
+        checked.
+        """
+        self.client.force_authenticate(user=self.user)
+
+        with override_settings(MEDIA_SENDFILE={
+            'BACKEND': 'x-accel-redirect',
+            'URL': '/protected-media/',
+        }):
+            response = self.get_video()
+            self.assertEqual(
+                response.status_code,
+                status.HTTP_403_FORBIDDEN
+            )
+
+            self.activate_video()
+            response = self.get_video()
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            response['X-Accel-Redirect'],
+            '/protected-media/uploads/videos/video.mp4'
+        )
+        self.assertEqual(response['Content-Type'], 'video/mp4')
+        self.assertEqual(response.content, b'')
+
+    def test_x_accel_redirect_quoted(self):
+        """
+        Ensure the path given to nginx is quoted, whatever the name of the
+        file.
+        """
+        path = os.path.join(settings.MEDIA_ROOT, 'uploads/videos/été 1?.mp4')
+
+        with override_settings(MEDIA_SENDFILE={
+            'BACKEND': 'x-accel-redirect',
+            'URL': '/protected-media/',
+        }):
+            response = streaming.offload_file(path, 'video/mp4')
+
+        self.assertEqual(
+            response['X-Accel-Redirect'],
+            '/protected-media/uploads/videos/%C3%A9t%C3%A9%201%3F.mp4'
+        )
+
+    def test_stream_with_x_sendfile(self):
+        """
+        Ensure the transfer is given to Apache with the path of the file.
+        """
+        self.client.force_authenticate(user=self.admin)
+
+        with override_settings(MEDIA_SENDFILE={
+            'BACKEND': 'x-sendfile',
+            'URL': None,
+        }):
+            response = self.get_video()
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['X-Sendfile'], self.video.is_path_file)
+
+    def test_signed_media_url(self):
+        """
+        Ensure the URL of a video given by the API is enough to watch it,
+        without any query.
+        """
+        self.client.force_authenticate(user=self.admin)
+
+        response = self.client.get(
+            reverse('video:videos_id', kwargs={'pk': self.video.id}),
+        )
+        url = json.loads(response.content)['is_path_file']
+
+        self.client.force_authenticate(user=None)
+
+        with self.assertNumQueries(0):
+            response = self.client.get(url, HTTP_RANGE='bytes=0-9')
+
+        self.assertEqual(response.status_code, status.HTTP_206_PARTIAL_CONTENT)
+        self.assertEqual(
+            b''.join(response.streaming_content),
+            self.video_data[0:10]
+        )
+
+    def test_signed_media_url_without_permission(self):
+        """
+        Ensure a user doesn't get the URL of a video they can't watch.
+        """
+        self.client.force_authenticate(user=self.user)
+
+        response = self.client.get(
+            reverse('video:videos_id', kwargs={'pk': self.video.id}),
+        )
+
+        self.assertIsNone(json.loads(response.content)['is_path_file'])
+
+    def test_signed_media_url_invalid(self):
+        """
+        Ensure a media URL altered, expired or used for another file is
+        refused.
+        """
+        token = tokens.sign_media(self.video.id, self.video.file.name)
+        altered = token[:-1] + ('A' if token[-1] != 'A' else 'B')
+
+        for url in [
+            reverse(
+                'video:videos_media',
+                kwargs={'token': altered, 'name': 'video.mp4'}
+            ),
+            reverse(
+                'video:videos_media',
+                kwargs={'token': token, 'name': 'other.mp4'}
+            ),
+        ]:
+            response = self.client.get(url)
+            self.assertEqual(
+                response.status_code,
+                status.HTTP_403_FORBIDDEN
+            )
+
+        url = reverse(
+            'video:videos_media',
+            kwargs={'token': token, 'name': 'video.mp4'}
+        )
+        expiry = tokens.get_expiry(settings.MEDIA_SIGNED_URLS['LIFETIME'])
+
+        with mock.patch('time.time') as mock_time:
+            mock_time.return_value = expiry + 1
+            response = self.client.get(url)
+
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
@@ -0,0 +1,94 @@
+"""
+Signed URLs of the media files.
+
+The token of a media URL carries the id of the video, the path it gives
+access to and its expiry, signed with the SECRET_KEY. The media endpoint
+checks the signature and the expiry only: authorizing each range or
+segment request of a player costs no query.
+
+A token gives access to a file, or to all the files of a folder when its
+path ends with a `/` (the segments of a playlist are requested relatively
+to its URL).
+"""
+import os
+import posixpath
+import time
+
+from django.conf import settings
+from django.core import signing
+
+SALT = 'video.media'
+
+
+class MediaTokenError(Exception):
+    """
+    Raised when a media token is not valid, expired, or doesn't give
+    access to the path requested.
+    """
+    pass
+
+
+def get_expiry(lifetime):
+    """
+    Expiry of the tokens created now, rounded to the lifetime: the URL of
+    a media stays the same during a lifetime and can be cached, and it is
+    valid for one to two lifetimes.
+    """
+    return (int(time.time()) // lifetime + 2) * lifetime
+
+
+def sign_media(video_id, path, lifetime=None):
+    """
+    Token giving access to a media file or folder
+
+    :param video_id: id of the video of the media
+    :param path: path of a file, or of a folder ending with `/`, relative
+                 to MEDIA_ROOT
+    :param lifetime: seconds, MEDIA_SIGNED_URLS['LIFETIME'] by default
+    :return: token
+    """
+    lifetime = lifetime or settings.MEDIA_SIGNED_URLS['LIFETIME']
+
+    return signing.dumps(
+        {
+            'i': video_id,
+            'p': path,
+            'e': get_expiry(lifetime),
+        },
+        salt=SALT,
+    )
+
+
+def unsign_media(token, name):
+    """
+    Path of the file requested with a media token
+
+    :param token: token of the URL
+    :param name: file requested in the URL, relative to the token
+    :return: path of the file relative to MEDIA_ROOT
+    """
+    try:
+        payload = signing.loads(token, salt=SALT)
+    except signing.BadSignature:
+        raise MediaTokenError('Invalid media token.')
+
+    if payload['e'] < time.time():
+        raise MediaTokenError('Expired media token.')
+
+    path = payload['p']
+    if not path.endswith('/'):
+        if name != posixpath.basename(path):
+            raise MediaTokenError('The token is not valid for this file.')
+        return path
+
+    name = posixpath.normpath(name)
+    if name.startswith(('.', '/')):
+        raise MediaTokenError('The token is not valid for this file.')
+    return path + name
+
+
+def media_path(token, name):
+    """
+    Absolute path of the file requested with a media token
+    """
+    return os.path.join(settings.MEDIA_ROOT, unsign_media(token, name))
@@ -0,0 +1,114 @@
+"""
+Upload handler checking the videos while they are received.
+
+A file too big or not a MP4/WebM is refused as soon as it is detected:
+from the Content-Length of the request before reading anything, else from
+the bytes received so far, and from the signature of the container in
+the first bytes of the file. The rest of the request is never written on
+the disk.
+
+The SHA-256 of the files is computed while they are received, the
+content of a video is never read again to be hashed.
+
+The handler is installed by the view of the videos only, its errors are
+answered by the API.
+"""
+import hashlib
+
+from django.conf import settings
+from django.core.files.uploadhandler import TemporaryFileUploadHandler
+from django.utils.translation import ugettext_lazy as _
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+from . import containers
+
+# Bytes needed to recognize the container of a file
+SNIFF_SIZE = 12
+
+# Room given to the multipart boundaries and to the other fields when the
+# Content-Length of the whole request is compared to the size of a video
+MULTIPART_OVERHEAD = 64 * 1024
+
+
+class VideoTooLarge(APIException):
+    status_code = status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+    default_detail = _("Size of Video is not valide")
+    default_code = 'video_too_large'
+
+
+class VideoTypeNotSupported(APIException):
+    status_code = status.HTTP_415_UNSUPPORTED_MEDIA_TYPE
+    default_detail = _("Only mp4 and webm videos are accepted.")
+    default_code = 'video_type_not_supported'
+
+
+class VideoUploadHandler(TemporaryFileUploadHandler):
+    """
+    Write the uploaded files in a temporary file, like Django does, and
+    stop the upload of a file that can't be a valid video.
+    """
+
+    def handle_raw_input(self, input_data, META, content_length, boundary,
+                         encoding=None):
+        if content_length and content_length > \
+                settings.CONSTANT['VIDEO']['SIZE'] + MULTIPART_OVERHEAD:
+            raise VideoTooLarge()
+
+        return super(VideoUploadHandler, self).handle_raw_input(
+            input_data,
+            META,
+            content_length,
+            boundary,
+            encoding
+        )
+
+    def new_file(self, *args, **kwargs):
+        super(VideoUploadHandler, self).new_file(*args, **kwargs)
+
+        if self.content_length and \
+                self.content_length > settings.CONSTANT['VIDEO']['SIZE']:
+            raise VideoTooLarge()
+
+        self.received = 0
+        self.header = b''
+        self.sha256 = hashlib.sha256()
+
+    def receive_data_chunk(self, raw_data, start):
+        self.received += len(raw_data)
+
+        if self.received > settings.CONSTANT['VIDEO']['SIZE']:
+            self.abort()
+            raise VideoTooLarge()
+
+        if self.header is not None:
+            self.header += raw_data[:SNIFF_SIZE]
+
+            if len(self.header) >= SNIFF_SIZE:
+                if containers.sniff_container(self.header) is None:
+                    self.abort()
+                    raise VideoTypeNotSupported()
+                self.header = None
+
+        self.sha256.update(raw_data)
+
+        return super(VideoUploadHandler, self).receive_data_chunk(
+            raw_data,
+            start
+        )
+
+    def file_complete(self, file_size):
+        # a file smaller than a container signature is not a video
+        if self.header is not None:
+            self.abort()
+            raise VideoTypeNotSupported()
+
+        file = super(VideoUploadHandler, self).file_complete(file_size)
+        file.sha256 = self.sha256.hexdigest()
+        return file
+
+    def abort(self):
+        """
+        Delete the temporary file of the upload
+        """
+        self.file.close()
@@ -0,0 +1,140 @@
+"""
+Uploads of videos by chunks.
+
+The file of an upload session is created with its final size, every
+chunk received is written directly at its offset. Once all the bytes are
+received, the file is moved (not copied) to the storage of the videos.
+"""
+import hashlib
+import os
+import re
+
+from django.core.files.uploadedfile import UploadedFile
+
+from . import containers
+
+# Size of the blocks read from the request and written on the disk
+BLOCK_SIZE = 64 * 1024
+
+CONTENT_RANGE = re.compile(r'^bytes (\d+)-(\d+)/(\d+)$')
+
+
+class UploadRangeError(ValueError):
+    """
+    Raised when a chunk doesn't match the upload session.
+    """
+    pass
+
+
+class UploadTypeError(ValueError):
+    """
+    Raised when the first chunk of an upload is not a MP4 or a WebM.
+    """
+    pass
+
+
+class SessionUploadedFile(UploadedFile):
+    """
+    The file of a complete upload session, seen as a file uploaded in a
+    temporary file: the storage moves it instead of copying it.
+    """
+    def __init__(self, path, name, size):
+        super(SessionUploadedFile, self).__init__(
+            open(path, 'rb'),
+            name,
+            None,
+            size,
+        )
+        self.path = path
+        # the chunks are received in any order, the content is hashed
+        # once complete
+        self.sha256 = hash_file(path)
+
+    def temporary_file_path(self):
+        return self.path
+
+
+def parse_content_range(header, size):
+    """
+    Read a `Content-Range: bytes start-end/total` header
+
+    :return: (start, end) with end excluded
+    """
+    match = CONTENT_RANGE.match(header or '')
+    if match is None:
+        raise UploadRangeError('Invalid Content-Range header.')
+
+    start, last, total = (int(value) for value in match.groups())
+    if total != size or start > last or last >= size:
+        raise UploadRangeError('Content-Range is out of the file.')
+
+    return start, last + 1
+
+
+def create_session_file(session):
+    os.makedirs(os.path.dirname(session.path_file), exist_ok=True)
+
+    # sparse file of the final size, chunks are written at their place
+    with open(session.path_file, 'wb') as file:
+        file.truncate(session.size)
+
+
+def write_chunk(session, stream, start, end):
+    """
+    Write the bytes of a request at their place in the file of the
+    session, without keeping the chunk in memory.
+    """
+    fd = os.open(session.path_file, os.O_WRONLY)
+    try:
+        position = start
+        while position < end:
+            data = stream.read(min(BLOCK_SIZE, end - position))
+            if not data:
+                raise UploadRangeError(
+                    'The body is smaller than the Content-Range.'
+                )
+            # the start of the file tells its container, an upload that
+            # is not a video is refused from its first chunk
+            if position == 0 and containers.sniff_container(data) is None:
+                raise UploadTypeError('Only mp4 and webm videos are accepted.')
+            written = 0
+            while written < len(data):
+                written += os.pwrite(fd, data[written:], position + written)
+            position += len(data)
+    finally:
+        os.close(fd)
+
+
+def merge_ranges(ranges):
+    """
+    Merge the ranges [start, end[ that overlap or follow each other
+
+    :param ranges: iterable of (start, end)
+    :return: sorted list of [start, end]
+    """
+    merged = []
+    for start, end in sorted(ranges):
+        if merged and start <= merged[-1][1]:
+            merged[-1][1] = max(merged[-1][1], end)
+        else:
+            merged.append([start, end])
+    return merged
+
+
+def hash_file(path):
+    """
+    SHA-256 of a file, read by blocks
+
+    :param path: path of the file
+    :return: hex digest
+    """
+    sha256 = hashlib.sha256()
+    with open(path, 'rb') as file:
+        for block in iter(lambda: file.read(BLOCK_SIZE), b''):
+            sha256.update(block)
+    return sha256.hexdigest()
+
+
+def delete_session_file(session):
+    if os.path.exists(session.path_file):
+        os.remove(session.path_file)
@@ -19,6 +19,41 @@ urlpatterns = format_suffix_patterns(
             views.VideoId.as_view(),
             name='videos_id',
         ),
+        url(
+            r'^(?P<pk>\d+)/stream$',
+            views.VideoStream.as_view(),
+            name='videos_stream',
+        ),
+        url(
+            r'^(?P<pk>\d+)/keyframe$',
+            views.VideoKeyframe.as_view(),
+            name='videos_keyframe',
+        ),
+        url(
+            r'^(?P<pk>\d+)/clip$',
+            views.VideoClip.as_view(),
+            name='videos_clip',
+        ),
+        url(
+            r'^media/(?P<token>[\w:.-]+)/(?P<name>.+)$',
+            views.VideoMedia.as_view(),
+            name='videos_media',
+        ),
+        url(
+            r'^uploads$',
+            views.Upload.as_view(),
+            name='uploads',
+        ),
+        url(
+            r'^uploads/(?P<pk>[0-9a-f-]+)$',
+            views.UploadId.as_view(),
+            name='uploads_id',
+        ),
+        url(
+            r'^uploads/(?P<pk>[0-9a-f-]+)/complete$',
+            views.UploadComplete.as_view(),
+            name='uploads_complete',
+        ),
         url(
             r'^genres$',
             views.Genre.as_view(),
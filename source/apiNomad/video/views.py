@@ -1,11 +1,16 @@
+import os
+
 from rest_framework.parsers \
     import MultiPartParser, \
     FormParser, \
     FileUploadParser
+from rest_framework.permissions import AllowAny
 from rest_framework.response import Response
 
-from . import models, serializers
+from . import filters, models, serializers, streaming, tokens, uploads
+from .uploadhandler import VideoUploadHandler
 from rest_framework import generics, status
+from django.conf import settings
 from django.utils.translation import ugettext_lazy as _
 from apiNomad.setup import service_init_database
 
@@ -65,33 +70,33 @@ class Video(generics.ListCreateAPIView):
     """
     parser_classes = (MultiPartParser, FormParser, FileUploadParser)
     serializer_class = serializers.VideoBasicSerializer
+    filterset_class = filters.VideoFilter
+    cursor_ordering = ('is_created', 'id')
+
+    def initialize_request(self, request, *args, **kwargs):
+        # the videos are checked while they are received on this view
+        # only, its errors are the ones of the API
+        request.upload_handlers = [VideoUploadHandler(request)]
+        return super(Video, self).initialize_request(
+            request,
+            *args,
+            **kwargs
+        )
 
     def get_queryset(self):
         # service_init_database()
 
+        queryset = models.Video.objects.for_serializer().ready()
+
         if 'param' in self.request.query_params.keys():
-            queryset = models.Video.objects.filter(
-                owner=self.request.user
+            queryset = queryset.filter(
+                owner=self.request.user,
+                state__in=[models.Video.INACTIVE, models.Video.ACTIVE],
             )
-            list_exclude = list()
-            for video in queryset:
-                if video.is_delete:
-                    list_exclude.append(video)
-        else:
-            queryset = models.Video.objects.all()
-            list_exclude = list()
-
-            if 'is_deleted' in self.request.query_params.keys():
-                for video in queryset:
-                    if not video.is_delete:
-                        list_exclude.append(video)
-            elif 'is_actived' in self.request.query_params.keys():
-                for video in queryset:
-                    if not video.is_active:
-                        list_exclude.append(video)
-
-        queryset = queryset.\
-            exclude(pk__in=[video.pk for video in list_exclude])
+        elif 'is_deleted' in self.request.query_params.keys():
+            queryset = queryset.filter(state=models.Video.DELETED)
+        elif 'is_actived' in self.request.query_params.keys():
+            queryset = queryset.filter(state=models.Video.ACTIVE)
 
         return queryset
 
@@ -127,7 +132,7 @@ class VideoId(generics.RetrieveUpdateDestroyAPIView):
     serializer_class = serializers.VideoBasicSerializer
 
     def get_queryset(self):
-        return models.Video.objects.filter()
+        return models.Video.objects.for_serializer()
 
     def patch(self, request, *args, **kwargs):
 
@@ -147,4 +152,297 @@ class VideoId(generics.RetrieveUpdateDestroyAPIView):
         return Response(content, status=status.HTTP_403_FORBIDDEN)
 
     def delete(self, request, *args, **kwargs):
-        return self.destroy(request, *args, **kwargs)
+        if self.request.user.has_perm('video.delete_video'):
+            return self.destroy(request, *args, **kwargs)
+
+        content = {
+            'detail': _("You do not have permission to perform this action."),
+        }
+        return Response(content, status=status.HTTP_403_FORBIDDEN)
+
+
+class VideoStream(generics.GenericAPIView):
+    """
+    get:
+    Return the file of a video, whole or by ranges of bytes with the
+    `Range` header.
+    """
+    content_negotiation_class = streaming.IgnoreClientContentNegotiation
+
+    def get_queryset(self):
+        return models.Video.objects.all()
+
+    def get(self, request, *args, **kwargs):
+        video = self.get_object()
+
+        if video.owner_id != request.user.id and not video.is_active:
+            content = {
+                'detail': _("You are not authorized to watch this video."),
+            }
+            return Response(content, status=status.HTTP_403_FORBIDDEN)
+
+        if not video.file.name:
+            content = {
+                'detail': _("The file of this video is not ready."),
+            }
+            return Response(content, status=status.HTTP_409_CONFLICT)
+
+        if not os.path.isfile(video.is_path_file):
+            content = {
+                'detail': _("Not found."),
+            }
+            return Response(content, status=status.HTTP_404_NOT_FOUND)
+
+        return streaming.stream_file(
+            request,
+            video.is_path_file,
+            video.sha256
+        )
+
+
+class VideoKeyframe(generics.GenericAPIView):
+    """
+    get:
+    Return the last keyframe at or before the `time` (seconds) of a video,
+    with its byte offset in the file: a player or a cut can start from it
+    without reading the file.
+    """
+
+    def get_queryset(self):
+        return models.Video.objects.select_related('keyframe_index')
+
+    def get(self, request, *args, **kwargs):
+        video = self.get_object()
+
+        if video.owner_id != request.user.id and not video.is_active:
+            content = {
+                'detail': _("You are not authorized to watch this video."),
+            }
+            return Response(content, status=status.HTTP_403_FORBIDDEN)
+
+        try:
+            time = float(request.query_params.get('time', ''))
+        except ValueError:
+            time = -1
+        if not 0 <= time < float('inf'):
+            content = {
+                'time': _("A positive number of seconds is required."),
+            }
+            return Response(content, status=status.HTTP_400_BAD_REQUEST)
+
+        index = getattr(video, 'keyframe_index', None)
+        keyframe = index.find(time) if index is not None else None
+        if keyframe is None:
+            content = {
+                'detail': _("The keyframes of this video are not indexed."),
+            }
+            return Response(content, status=status.HTTP_404_NOT_FOUND)
+
+        return Response({
+            'time': keyframe[0],
+            'offset': keyframe[1],
+        })
+
+
+class VideoClip(generics.GenericAPIView):
+    """
+    post:
+    Create a new video from the range [start, end] (seconds) of a video.
+    The clip is created at once, its file is cut by the worker: it is
+    listed once its file is ready.
+    """
+
+    def get_queryset(self):
+        return models.Video.objects.all()
+
+    def post(self, request, *args, **kwargs):
+        video = self.get_object()
+
+        if not request.user.has_perm('video.add_video') or \
+                (video.owner_id != request.user.id and not video.is_active):
+            content = {
+                'detail': _("You are not authorized to clip this video."),
+            }
+            return Response(content, status=status.HTTP_403_FORBIDDEN)
+
+        if not video.file.name:
+            content = {
+                'detail': _("The file of this video is not ready."),
+            }
+            return Response(content, status=status.HTTP_409_CONFLICT)
+
+        serializer = serializers.VideoClipSerializer(
+            data=request.data,
+            context={'request': request, 'video': video},
+        )
+        serializer.is_valid(raise_exception=True)
+        clip = serializer.save()
+
+        clip = models.Video.objects.for_serializer().get(pk=clip.pk)
+        return Response(
+            serializers.VideoBasicSerializer(
+                clip,
+                context={'request': request}
+            ).data,
+            status=status.HTTP_202_ACCEPTED
+        )
+
+
+class VideoMedia(generics.GenericAPIView):
+    """
+    get:
+    Return a media file from its signed URL, whole or by ranges of bytes.
+    The URL is checked without any query, the token is enough.
+    """
+    authentication_classes = ()
+    permission_classes = (AllowAny,)
+    content_negotiation_class = streaming.IgnoreClientContentNegotiation
+
+    def get(self, request, token, name, *args, **kwargs):
+        try:
+            path = tokens.media_path(token, name)
+        except tokens.MediaTokenError as err:
+            content = {
+                'detail': str(err),
+            }
+            return Response(content, status=status.HTTP_403_FORBIDDEN)
+
+        if not os.path.isfile(path):
+            content = {
+                'detail': _("Not found."),
+            }
+            return Response(content, status=status.HTTP_404_NOT_FOUND)
+
+        return streaming.stream_file(request, path)
+
+
+class Upload(generics.CreateAPIView):
+    """
+    post:
+    Start the upload by chunks of a new video.
+    """
+    serializer_class = serializers.UploadSessionSerializer
+
+    def post(self, request, *args, **kwargs):
+        if self.request.user.has_perm("video.add_video"):
+            return self.create(request, *args, **kwargs)
+
+        content = {
+            'detail': _("You are not authorized to upload a video."),
+        }
+        return Response(content, status=status.HTTP_403_FORBIDDEN)
+
+
+class UploadId(generics.RetrieveDestroyAPIView):
+    """
+    get:
+    Return the ranges of bytes already received by an upload.
+
+    put:
+    Send a chunk of the video, placed in the file by its `Content-Range`
+    header. Chunks can be sent in any order or in parallel.
+
+    delete:
+    Cancel an upload.
+    """
+    serializer_class = serializers.UploadSessionSerializer
+
+    def get_queryset(self):
+        return models.UploadSession.objects.filter(
+            owner=self.request.user
+        ).prefetch_related('chunks')
+
+    def put(self, request, *args, **kwargs):
+        session = self.get_object()
+
+        if session.expired:
+            content = {
+                'detail': _("This upload has expired."),
+            }
+            return Response(content, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            start, end = uploads.parse_content_range(
+                request.META.get('HTTP_CONTENT_RANGE'),
+                session.size
+            )
+            if end - start > settings.CONSTANT['VIDEO']['CHUNK_SIZE']:
+                raise uploads.UploadRangeError('The chunk is too big.')
+            if request.stream is None:
+                raise uploads.UploadRangeError('The chunk is empty.')
+
+            uploads.write_chunk(session, request.stream, start, end)
+        except uploads.UploadRangeError as err:
+            content = {
+                'detail': str(err),
+            }
+            return Response(content, status=status.HTTP_400_BAD_REQUEST)
+        except uploads.UploadTypeError as err:
+            content = {
+                'detail': str(err),
+            }
+            return Response(
+                content,
+                status=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE
+            )
+
+        models.UploadChunk.objects.create(
+            session=session,
+            start=start,
+            end=end,
+        )
+
+        serializer = self.get_serializer(self.get_object())
+        return Response(serializer.data)
+
+
+class UploadComplete(generics.GenericAPIView):
+    """
+    post:
+    Create the video of an upload once all its bytes are received.
+    """
+    serializer_class = serializers.VideoBasicSerializer
+
+    def get_queryset(self):
+        return models.UploadSession.objects.filter(
+            owner=self.request.user
+        )
+
+    def post(self, request, *args, **kwargs):
+        session = self.get_object()
+
+        if session.expired:
+            content = {
+                'detail': _("This upload has expired."),
+            }
+            return Response(content, status=status.HTTP_400_BAD_REQUEST)
+
+        received = uploads.merge_ranges(
+            session.chunks.values_list('start', 'end')
+        )
+        if received != [[0, session.size]]:
+            content = {
+                'detail': _("The upload is not complete."),
+                'received': received,
+            }
+            return Response(content, status=status.HTTP_400_BAD_REQUEST)
+
+        # the file of the session is moved to the videos, not copied
+        file = uploads.SessionUploadedFile(
+            session.path_file,
+            session.filename,
+            session.size,
+        )
+        try:
+            serializer = self.get_serializer(data={
+                'file': file,
+                'genres': [],
+            })
+            serializer.is_valid(raise_exception=True)
+            serializer.save()
+        finally:
+            file.close()
+
+        session.delete()
+
+        return Response(serializer.data, status=status.HTTP_201_CREATED)